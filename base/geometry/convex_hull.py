@@ -1,5 +1,4 @@
 import numpy as np
-from sklearn.linear_model import LinearRegression
 import typing as tp
 
 
@@ -38,6 +37,8 @@ def get_lower_bound(points: np.ndarray, is_sorted: bool = False) -> np.ndarray:
 
 
 def put_line(points: np.ndarray) -> tp.Tuple[float, float]:
+    from sklearn.linear_model import LinearRegression
+
     model = LinearRegression().fit(points.T[0].reshape(len(points), 1),
                                    points.T[1])
     return model.coef_[0], model.intercept_
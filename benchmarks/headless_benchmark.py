@@ -0,0 +1,52 @@
+"""
+Compares StrategyRunner.run_simulation in the default logging setup
+with the headless mode on the same synthetic data.
+
+Run from the repository root:
+    python -m benchmarks.headless_benchmark [--days 30]
+"""
+import argparse
+import tempfile
+import typing as tp
+from pathlib import Path
+from time import perf_counter
+
+from base.config_parser import ConfigParser
+from benchmarks.synthetic import synthetic_market_data
+from logger.logger import Logger
+from strategies.strategy_runner import StrategyRunner
+from trading import TimeRange, Timestamp
+from trading_system.trading_statistics import TradingStatistics
+
+
+def run_once(headless: bool, time_range: TimeRange,
+             logs_path: Path) -> tp.Tuple[float, TradingStatistics]:
+    base_config = ConfigParser.load_config(Path('configs/base.json'))
+    simulator_config = ConfigParser.load_config(Path('configs/simulator.json'))
+    Logger.set_default_config(base_config['default_logger'])
+    runner = StrategyRunner(base_config=base_config,
+                            simulator_config=simulator_config,
+                            exchange_config={},
+                            headless=headless)
+    start = perf_counter()
+    stats = runner.run_simulation(time_range=time_range, logs_path=logs_path)
+    return perf_counter() - start, stats
+
+
+def run(days: int) -> tp.Dict[str, float]:
+    from_ts = Timestamp.from_iso_format('2021-01-01 00:00:00')
+    time_range = TimeRange(from_ts, from_ts + days * 24 * 60 * 60)
+    with synthetic_market_data(), tempfile.TemporaryDirectory() as logs_dir:
+        default, default_stats = run_once(False, time_range, Path(logs_dir))
+        headless, headless_stats = run_once(True, time_range, Path(logs_dir))
+    if default_stats.final_balance != headless_stats.final_balance:
+        raise RuntimeError('headless run diverged from the default one')
+    return {'default, s': default, 'headless, s': headless,
+            'speedup': default / headless}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--days', type=int, default=30)
+    results = run(parser.parse_args().days)
+    print('  '.join(f'{name}: {value:.2f}' for name, value in results.items()))
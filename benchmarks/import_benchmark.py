@@ -0,0 +1,62 @@
+"""
+Import time of the entry points, each measured in a fresh interpreter.
+
+Heavy libraries (HEAVY_MODULES) take up to a second each to import and
+most runs never use them: simulations on cached candles need no ccxt or
+requests, only some detectors and reports need pandas, sklearn, plotly
+or rich. They are imported inside the functions using them, so that
+workers and CLI tools start fast.
+Exits with 1 if an entry point takes longer than the budget
+or imports one of them at import time.
+
+Run from the repository root:
+    python -m benchmarks.import_benchmark [--repeat 5] [--budget 0.5]
+"""
+import argparse
+import subprocess
+import sys
+import typing as tp
+from pathlib import Path
+from time import perf_counter
+
+ROOT = Path(__file__).parents[1]
+ENTRY_POINTS = ['strategies.strategy_runner', 'strategies.worker_pool']
+HEAVY_MODULES = ['ccxt', 'pandas', 'sklearn', 'plotly', 'rich', 'requests']
+
+
+def measure_import_time(module: str, repeat: int = 5) -> float:
+    """ Best wall time of a fresh interpreter importing module, minus an empty one. """
+
+    def run(code: str) -> float:
+        start = perf_counter()
+        subprocess.run([sys.executable, '-c', code], check=True, cwd=ROOT)
+        return perf_counter() - start
+
+    empty = min(run('pass') for _ in range(repeat))
+    return min(run(f'import {module}') for _ in range(repeat)) - empty
+
+
+def get_heavy_imports(module: str) -> tp.List[str]:
+    """ Heavy modules which importing module imports too. """
+    code = f'import sys, {module}; print(" ".join(sys.modules))'
+    output = subprocess.run([sys.executable, '-c', code], check=True, cwd=ROOT,
+                            capture_output=True, text=True).stdout
+    modules = set(output.split())
+    return [heavy for heavy in HEAVY_MODULES if heavy in modules]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=0.5, help='seconds per entry point')
+    args = parser.parse_args()
+
+    failed = False
+    for entry_point in ENTRY_POINTS:
+        seconds = measure_import_time(entry_point, args.repeat)
+        heavy = get_heavy_imports(entry_point)
+        print(f'{entry_point:<40}{seconds:>8.3f} s'
+              + (f'  imports {", ".join(heavy)}' if heavy else ''))
+        failed |= seconds > args.budget or bool(heavy)
+    sys.exit(int(failed))
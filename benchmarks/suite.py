@@ -0,0 +1,265 @@
+"""
+Offline benchmark suite on deterministic synthetic candles.
+
+Measures ticks per second of StrategyRunner.run_simulation for every shipped
+strategy, per candle cost of every handler in trading_system/indicators,
+cost of a Simulator tick against the number of active orders,
+load times of an event log and of the visualizer built from it
+and import times of the entry points.
+
+Results are saved as a JSON baseline and later runs are compared with it,
+a metric worse than the baseline by more than the tolerance is a regression.
+
+Run from the repository root:
+    python -m benchmarks.suite [--days 7] [--only runner handlers]
+        [--save baseline.json] [--compare baseline.json] [--tolerance 0.2]
+"""
+import argparse
+import importlib
+import inspect
+import json
+import pkgutil
+import platform
+import sys
+import tempfile
+import typing as tp
+from pathlib import Path
+from time import perf_counter, perf_counter_ns
+
+from base.config_parser import ConfigParser
+from benchmarks.import_benchmark import ENTRY_POINTS, measure_import_time
+from benchmarks.synthetic import synthetic_market_data
+from logger.logger import Logger
+from strategies.strategy_base import StrategyBase
+from strategies.strategy_runner import StrategyRunner
+from trading import TimeRange, Timestamp
+from trading_interface.simulator.simulator import Simulator
+from trading_system.candles_handler import CandlesHandler
+from trading_system.trading_system import Handlers
+from trading_system.trading_system_handler import TradingSystemHandler
+
+# Name -> value, unit and whether higher values are better
+ResultsT = tp.Dict[str, tp.Dict[str, tp.Any]]
+
+GROUPS = ['runner', 'handlers', 'simulator', 'logs', 'imports']
+ORDER_COUNTS = [0, 10, 100, 1000]
+# Values of handler parameters without defaults
+HANDLER_PARAMS = {'window_size': 14}
+FROM_TS = Timestamp.from_iso_format('2021-01-01 00:00:00')
+
+
+def _result(value: float, unit: str, higher_is_better: bool) -> tp.Dict[str, tp.Any]:
+    return {'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+
+
+def _load_configs() -> tp.Tuple[tp.Any, tp.Any]:
+    base_config = ConfigParser.load_config(Path('configs/base.json'))
+    simulator_config = ConfigParser.load_config(Path('configs/simulator.json'))
+    Logger.set_default_config(base_config['default_logger'])
+    return base_config, simulator_config
+
+
+def get_strategies() -> tp.List[tp.Tuple[str, str]]:
+    """ Directory and class name of every strategy with a config. """
+    strategies = []
+    for config_path in sorted(Path('strategies').glob('*/config.json')):
+        directory = config_path.parent.name
+        module = importlib.import_module(f'strategies.{directory}.{directory}')
+        for name, cls in inspect.getmembers(module, inspect.isclass):
+            if issubclass(cls, StrategyBase) and cls.__module__ == module.__name__:
+                strategies.append((directory, name))
+    return strategies
+
+
+def get_indicator_handlers() -> tp.List[tp.Type[TradingSystemHandler]]:
+    package = importlib.import_module('trading_system.indicators')
+    handlers = []
+    for module_info in pkgutil.iter_modules(package.__path__):
+        module = importlib.import_module(f'{package.__name__}.{module_info.name}')
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            if issubclass(cls, TradingSystemHandler) and cls.__module__ == module.__name__:
+                handlers.append(cls)
+    return handlers
+
+
+def bench_runner(time_range: TimeRange) -> ResultsT:
+    """ Headless simulation ticks per second of every strategy. """
+    results: ResultsT = {}
+    for directory, name in get_strategies():
+        base_config, simulator_config = _load_configs()
+        base_config['strategy'] = {'name': name, 'dir': directory}
+        runner = StrategyRunner(base_config=base_config,
+                                simulator_config=simulator_config,
+                                exchange_config={},
+                                headless=True)
+        iteration = runner._do_trading_iteration
+        ticks = 0
+
+        def counted_iteration() -> None:
+            nonlocal ticks
+            ticks += 1
+            iteration()
+
+        runner._do_trading_iteration = counted_iteration  # type: ignore
+        start = perf_counter()
+        try:
+            runner.run_simulation(time_range=time_range, pretty_print=False)
+        except Exception as e:
+            print(f'runner/{directory} failed: {e!r}', file=sys.stderr)
+            continue
+        results[f'runner/{directory}'] = _result(ticks / (perf_counter() - start), 'ticks/s', True)
+    return results
+
+
+def bench_handlers(time_range: TimeRange) -> ResultsT:
+    """ Mean cost of a handler update per candle, dependencies are not counted. """
+    base_config, simulator_config = _load_configs()
+    results: ResultsT = {}
+    for handler_type in get_indicator_handlers():
+        ti = Simulator(time_range, base_config['trading_interface'], simulator_config)
+        signature = inspect.signature(handler_type)
+        params = {name: HANDLER_PARAMS[name] for name, param in signature.parameters.items()
+                  if name != 'trading_interface' and param.default is inspect.Parameter.empty}
+        handler = handler_type(trading_interface=ti, **params)
+        handlers = Handlers().add(CandlesHandler(ti)).add(handler)
+        handler = handlers[handler.get_name()]
+        total_ns = 0
+        candle_timestamps: tp.Set[int] = set()
+        while ti.is_alive():
+            for other in handlers.values():
+                if other is not handler:
+                    other.update()
+            start = perf_counter_ns()
+            handler.update()
+            total_ns += perf_counter_ns() - start
+            candle_timestamps.update(candle.ts for candle in ti.get_last_n_candles(1))
+        results[f'handlers/{handler_type.__name__}'] = \
+            _result(total_ns / 1e3 / max(len(candle_timestamps), 1), 'us/candle', False)
+    return results
+
+
+def bench_simulator(time_range: TimeRange) -> ResultsT:
+    """ Cost of a Simulator tick, which fills orders, with orders that never fill. """
+    base_config, simulator_config = _load_configs()
+    results: ResultsT = {}
+    for count in ORDER_COUNTS:
+        ti = Simulator(time_range, base_config['trading_interface'], simulator_config)
+        for i in range(count):
+            if i % 2:
+                ti.buy(1., 0.)
+            else:
+                ti.sell(1., float('inf'))
+        ticks = 0
+        start = perf_counter()
+        while ti.is_alive():
+            ticks += 1
+        results[f'simulator/fill_{count}_orders'] = \
+            _result((perf_counter() - start) * 1e6 / ticks, 'us/tick', False)
+    return results
+
+
+def bench_logs(time_range: TimeRange) -> ResultsT:
+    """ Load times of the event log of a default run and of its visualizer. """
+    # Imported here, the visualizer pulls plotly in
+    from visualizer.visualize_log import create_visualizer_from_log, load_decomposed_log
+
+    base_config, simulator_config = _load_configs()
+    with tempfile.TemporaryDirectory() as logs_dir:
+        StrategyRunner(base_config=base_config,
+                       simulator_config=simulator_config,
+                       exchange_config={},
+                       headless=False).run_simulation(time_range=time_range,
+                                                      logs_path=Path(logs_dir),
+                                                      pretty_print=False)
+        Logger.end_run()
+        log_path = max(Path(logs_dir).rglob('*.dump'), key=lambda path: path.stat().st_size)
+        start = perf_counter()
+        decomposed_log = load_decomposed_log(log_path)
+        loaded = perf_counter()
+        create_visualizer_from_log(decomposed_log)
+        finished = perf_counter()
+    return {'logs/load': _result(loaded - start, 's', False),
+            'logs/visualizer': _result(finished - loaded, 's', False)}
+
+
+def bench_imports(time_range: TimeRange) -> ResultsT:
+    return {f'imports/{module}': _result(measure_import_time(module), 's', False)
+            for module in ENTRY_POINTS}
+
+
+def run(days: int, groups: tp.List[str]) -> ResultsT:
+    time_range = TimeRange(FROM_TS, FROM_TS + days * 24 * 60 * 60)
+    benchmarks = {'runner': bench_runner, 'handlers': bench_handlers,
+                  'simulator': bench_simulator, 'logs': bench_logs,
+                  'imports': bench_imports}
+    results: ResultsT = {}
+    with synthetic_market_data():
+        for group in groups:
+            results.update(benchmarks[group](time_range))
+    return results
+
+
+def save(results: ResultsT, path: Path, days: int) -> None:
+    baseline = {
+        'meta': {'python': platform.python_version(),
+                 'machine': platform.machine(),
+                 'days': days},
+        'results': results,
+    }
+    path.write_text(json.dumps(baseline, indent=2, sort_keys=True))
+
+
+def compare(results: ResultsT, baseline: ResultsT,
+            tolerance: float) -> tp.List[tp.Tuple[str, float, float, float, bool]]:
+    """
+    Name, baseline and current values, relative change and whether it is a regression,
+    for every metric present in both. Positive changes are improvements.
+    """
+    rows = []
+    for name in sorted(results.keys() & baseline.keys()):
+        current, previous = results[name]['value'], baseline[name]['value']
+        if previous == 0:
+            continue
+        change = current / previous - 1
+        if not results[name]['higher_is_better']:
+            change = previous / current - 1 if current else float('inf')
+        rows.append((name, previous, current, change, change < -tolerance))
+    return rows
+
+
+def print_results(results: ResultsT) -> None:
+    for name, result in results.items():
+        print(f'{name:<56}{result["value"]:>14.3f} {result["unit"]}')
+
+
+def print_comparison(rows: tp.List[tp.Tuple[str, float, float, float, bool]]) -> None:
+    print(f'{"benchmark":<56}{"baseline":>14}{"current":>14}{"change":>10}')
+    for name, previous, current, change, regression in rows:
+        print(f'{name:<56}{previous:>14.3f}{current:>14.3f}{change * 100:>9.1f}%'
+              f'{"  REGRESSION" if regression else ""}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--only', nargs='+', choices=GROUPS, default=GROUPS)
+    parser.add_argument('--save', type=Path)
+    parser.add_argument('--compare', type=Path)
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed relative slowdown, 0.2 is 20%%')
+    args = parser.parse_args()
+
+    results = run(args.days, args.only)
+    print_results(results)
+    if args.save is not None:
+        save(results, args.save, args.days)
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text())
+        if baseline['meta']['days'] != args.days:
+            print(f'Baseline simulated {baseline["meta"]["days"]} days, '
+                  f'values are not comparable', file=sys.stderr)
+        rows = compare(results, baseline['results'], args.tolerance)
+        print_comparison(rows)
+        if any(regression for *_, regression in rows):
+            sys.exit(1)
@@ -0,0 +1,41 @@
+"""
+Deterministic synthetic market data for offline benchmarks.
+"""
+import typing as tp
+from contextlib import contextmanager
+from unittest import mock
+
+import numpy as np
+
+from market_data_api.market_data_downloader import MarketDataDownloader
+from trading import AssetPair, Candle, Timeframe, TimeRange
+
+
+def generate_candles(time_range: TimeRange, timeframe: Timeframe,
+                     seed: int = 0, start_price: float = 10.,
+                     volatility: float = 0.002) -> tp.List[Candle]:
+    """ Geometric random walk candles aligned to timeframe. """
+    step = timeframe.to_seconds()
+    first_ts = time_range.from_ts - time_range.from_ts % step
+    count = max(0, (time_range.to_ts - first_ts) // step + 1)
+    rng = np.random.default_rng(seed)
+    closes = start_price * np.exp(np.cumsum(rng.normal(0, volatility, count)))
+    opens = np.concatenate([[start_price], closes[:-1]])
+    spread = np.abs(rng.normal(0, volatility, count)) * closes
+    highs = np.maximum(opens, closes) + spread
+    lows = np.minimum(opens, closes) - spread
+    volumes = rng.uniform(100, 1000, count)
+    return [Candle(first_ts + i * step, float(o), float(c), float(lo), float(hi), float(v))
+            for i, (o, c, lo, hi, v) in enumerate(zip(opens, closes, lows, highs, volumes))]
+
+
+@contextmanager
+def synthetic_market_data(seed: int = 0) -> tp.Iterator[None]:
+    """ Serves MarketDataDownloader.get_candles from generate_candles. """
+
+    def get_candles(asset_pair: AssetPair, timeframe: Timeframe,
+                    time_range: TimeRange) -> tp.List[Candle]:
+        return generate_candles(time_range, timeframe, seed=seed)
+
+    with mock.patch.object(MarketDataDownloader, 'get_candles', staticmethod(get_candles)):
+        yield
@@ -0,0 +1,139 @@
+"""
+Micro-benchmark of the core value types.
+
+Compares slotted immutable Candle/Order with their former plain __dict__
+versions: memory per million objects, construction, hashing and the
+defensive copy that immutable orders no longer need.
+
+Run from the repository root:
+    python -m benchmarks.value_types_benchmark [--count 1000000]
+"""
+import argparse
+import gc
+import tracemalloc
+import typing as tp
+from copy import copy
+from time import perf_counter
+
+from trading import Asset, AssetPair, Candle, Direction, Order
+
+
+class DictCandle:
+    """ Former Candle layout, kept here as a reference point. """
+
+    def __init__(self, ts: int, open: float, close: float,
+                 low: float, high: float, volume: float):
+        self.ts = ts
+        self.open = open
+        self.close = close
+        self.low = low
+        self.high = high
+        self.volume = volume
+
+    def __hash__(self) -> int:
+        return hash((self.ts, self.open, self.close, self.low, self.high, self.volume))
+
+
+class DictOrder:
+    """ Former Order layout, kept here as a reference point. """
+
+    def __init__(self, order_id: str, asset_pair: tp.Any, amount: float,
+                 price: float, timestamp: int, direction: Direction):
+        self.order_id = order_id
+        self.asset_pair = asset_pair
+        self.amount = amount
+        self.price = price
+        self.timestamp = timestamp
+        self.direction = direction
+
+    def __hash__(self) -> int:
+        return hash(self.order_id)
+
+
+class DictAssetPair:
+    def __init__(self, amount_asset: str, price_asset: str):
+        self.amount_asset = amount_asset
+        self.price_asset = price_asset
+
+
+def make_candles(cls: tp.Any, count: int) -> tp.List[tp.Any]:
+    return [cls(i, 1.0 + i, 2.0 + i, 0.5 + i, 2.5 + i, 10.0) for i in range(count)]
+
+
+def make_orders(cls: tp.Any, asset_pair: tp.Any,
+                ids: tp.List[str]) -> tp.List[tp.Any]:
+    return [cls(order_id, asset_pair, 1.0, 2.0, i, Direction.BUY)
+            for i, order_id in enumerate(ids)]
+
+
+def measure_memory(func: tp.Callable[[], tp.Any]) -> int:
+    """ Returns bytes still allocated by the result of func. """
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return allocated
+
+
+def measure_time(func: tp.Callable[[], tp.Any]) -> tp.Tuple[float, tp.Any]:
+    gc.collect()
+    start = perf_counter()
+    result = func()
+    return perf_counter() - start, result
+
+
+def bench_candles(candle_cls: tp.Any, count: int) -> tp.Dict[str, float]:
+    memory = measure_memory(lambda: make_candles(candle_cls, count))
+    construct, candles = measure_time(lambda: make_candles(candle_cls, count))
+    # PriceSimulator hashes every candle up to three times
+    hashing, _ = measure_time(lambda: [hash(c) + hash(c) + hash(c) for c in candles])
+    return {'memory, MB': memory / 2 ** 20, 'construct, s': construct, 'hash x3, s': hashing}
+
+
+def bench_orders(order_cls: tp.Any, asset_pair: tp.Any,
+                 ids: tp.List[str]) -> tp.Dict[str, float]:
+    memory = measure_memory(lambda: make_orders(order_cls, asset_pair, ids))
+    construct, orders = measure_time(lambda: make_orders(order_cls, asset_pair, ids))
+    # TradingSystem and Simulator used to copy every order 3-4 times
+    copying, _ = measure_time(lambda: [copy(o) for o in orders])
+    hashing, _ = measure_time(lambda: set(orders))
+    return {'memory, MB': memory / 2 ** 20, 'construct, s': construct,
+            'copy, s': copying, 'hash (set), s': hashing}
+
+
+def bench_asset_pairs(pair_factory: tp.Callable[[], tp.Any], count: int) -> tp.Dict[str, float]:
+    memory = measure_memory(lambda: [pair_factory() for _ in range(count)])
+    construct, _ = measure_time(lambda: [pair_factory() for _ in range(count)])
+    return {'memory, MB': memory / 2 ** 20, 'construct, s': construct}
+
+
+def run(count: int) -> tp.Dict[str, tp.Dict[str, float]]:
+    """ Metrics of every case scaled to a million objects. """
+    ids = [str(i) for i in range(count)]
+    results = {
+        'dict Candle': bench_candles(DictCandle, count),
+        'slotted Candle': bench_candles(Candle, count),
+        'dict Order': bench_orders(DictOrder, DictAssetPair('WAVES', 'USDN'), ids),
+        'slotted Order': bench_orders(Order, AssetPair(Asset('WAVES'), Asset('USDN')), ids),
+        # Interned pairs are looked up instead of being allocated per order
+        'dict AssetPair': bench_asset_pairs(lambda: DictAssetPair('WAVES', 'USDN'), count),
+        'interned AssetPair': bench_asset_pairs(lambda: AssetPair('WAVES', 'USDN'), count),
+    }
+    scale = 1_000_000 / count
+    return {label: {name: value * scale for name, value in metrics.items()}
+            for label, metrics in results.items()}
+
+
+def print_results(results: tp.Dict[str, tp.Dict[str, float]]) -> None:
+    print('Per million objects:')
+    for label, metrics in results.items():
+        formatted = '  '.join(f'{name}: {value:8.3f}' for name, value in metrics.items())
+        print(f'{label:>16}  {formatted}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=1_000_000)
+    print_results(run(parser.parse_args().count))
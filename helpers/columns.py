@@ -0,0 +1,44 @@
+import numpy as np
+import typing as tp
+
+
+class Columns:
+    """ Growable set of NumPy columns, appending a row is amortized O(1). """
+
+    def __init__(self, dtypes: tp.Dict[str, tp.Any], capacity: int = 1024) -> None:
+        self._columns = {name: np.empty(capacity, dtype=dtype)
+                         for name, dtype in dtypes.items()}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def get_names(self) -> tp.List[str]:
+        return list(self._columns)
+
+    def append(self, *values: tp.Any) -> None:
+        if self._size == len(next(iter(self._columns.values()))):
+            self._reserve(max(1, 2 * self._size))
+        for column, value in zip(self._columns.values(), values):
+            column[self._size] = value
+        self._size += 1
+
+    def extend(self, other: 'Columns') -> None:
+        """ Appends all rows of other, which must have the same columns. """
+        if self._size + len(other) > len(next(iter(self._columns.values()))):
+            self._reserve(max(2 * self._size, self._size + len(other)))
+        for name, column in self._columns.items():
+            column[self._size:self._size + len(other)] = other.get(name)
+        self._size += len(other)
+
+    def get(self, name: str) -> np.ndarray:
+        return self._columns[name][:self._size]
+
+    def shrink(self) -> None:
+        """ Drops unused capacity, e.g. before columns are sent to another process. """
+        self._columns = {name: column[:self._size].copy()
+                         for name, column in self._columns.items()}
+
+    def _reserve(self, capacity: int) -> None:
+        for name, column in self._columns.items():
+            self._columns[name] = np.resize(column, capacity)
@@ -30,11 +30,11 @@ class LimitOrder():
             if take_profit is not None and sgn * cur_price > sgn * take_profit:
                 self.ts.create_order(order.asset_pair, -sgn * order.amount)
                 self.orders.remove((order, take_profit, stop_loss))
-                self.logger.info(f'Take-profit trigger at price {cur_price}')
+                self.logger.info('Take-profit trigger at price %s', cur_price)
             if stop_loss is not None and sgn * cur_price < sgn * stop_loss:
                 self.ts.create_order(order.asset_pair, -sgn * order.amount)
                 self.orders.remove((order, take_profit, stop_loss))
-                self.logger.info(f'Stop-loss trigger at price {cur_price}')
+                self.logger.info('Stop-loss trigger at price %s', cur_price)
 
     def buy(
             self,
@@ -0,0 +1,136 @@
+"""
+Low-overhead profiling of calls by component.
+
+Durations go to log-scale histograms with 8 buckets per power of two,
+so quantiles are within 1/16 of the real value, memory does not grow with
+the number of calls, and profiles of different processes merge exactly.
+"""
+import math
+import typing as tp
+from io import StringIO
+from time import perf_counter_ns
+
+T = tp.TypeVar('T')
+
+_SUB_BITS = 3
+_LINEAR = 2 << _SUB_BITS
+_BUCKETS = _LINEAR + 64 * (1 << _SUB_BITS)
+
+
+def _get_bucket(ns: int) -> int:
+    if ns < _LINEAR:
+        return max(ns, 0)
+    shift = ns.bit_length() - _SUB_BITS - 1
+    return _LINEAR + (shift - 1) * (1 << _SUB_BITS) + (ns >> shift) - (1 << _SUB_BITS)
+
+
+def _get_bucket_value(bucket: int) -> float:
+    """ Middle of the bucket in nanoseconds. """
+    if bucket < _LINEAR:
+        return float(bucket)
+    shift, mantissa = divmod(bucket - _LINEAR, 1 << _SUB_BITS)
+    shift += 1
+    return ((mantissa + (1 << _SUB_BITS)) + 0.5) * (1 << shift)
+
+
+class ComponentProfile:
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ns = 0
+        self.buckets = [0] * _BUCKETS
+
+    def add(self, ns: int) -> None:
+        self.count += 1
+        self.total_ns += ns
+        self.buckets[_get_bucket(ns)] += 1
+
+    def merge(self, other: 'ComponentProfile') -> None:
+        self.count += other.count
+        self.total_ns += other.total_ns
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+    def get_quantile(self, q: float) -> float:
+        """ Approximate duration in nanoseconds which q of calls did not exceed. """
+        if self.count == 0:
+            return 0.
+        target = max(1, math.ceil(q * self.count))
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return _get_bucket_value(bucket)
+        return _get_bucket_value(_BUCKETS - 1)
+
+
+class Profiler:
+    """
+    Wall time, call count and p50/p99 latency per component.
+    Components are timed by replacing their methods with wrappers, see wrap_method,
+    so nothing is paid when profiling is off.
+    Times are inclusive: a call made inside another timed call counts for both.
+    """
+
+    def __init__(self) -> None:
+        self.components: tp.Dict[str, ComponentProfile] = {}
+
+    def get_component(self, key: str) -> ComponentProfile:
+        component = self.components.get(key)
+        if component is None:
+            component = self.components[key] = ComponentProfile()
+        return component
+
+    def wrap(self, key: str, function: tp.Callable[..., T]) -> tp.Callable[..., T]:
+        component = self.get_component(key)
+
+        def timed(*args: tp.Any, **kwargs: tp.Any) -> T:
+            start = perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                component.add(perf_counter_ns() - start)
+
+        return timed
+
+    def wrap_method(self, obj: tp.Any, name: str, key: str) -> None:
+        """ Times calls of obj.name made through the instance. """
+        setattr(obj, name, self.wrap(key, getattr(obj, name)))
+
+    def merge(self, other: 'Profiler') -> 'Profiler':
+        """ Adds calls of other in place and returns self. """
+        for key, component in other.components.items():
+            self.get_component(key).merge(component)
+        return self
+
+    def get_summary(self) -> tp.List[tp.Dict[str, tp.Any]]:
+        """ One row per called component, the most time consuming first, times in microseconds. """
+        rows = [{
+            'component': key,
+            'calls': component.count,
+            'total': component.total_ns / 1e3,
+            'mean': component.total_ns / component.count / 1e3 if component.count else 0.,
+            'p50': component.get_quantile(0.5) / 1e3,
+            'p99': component.get_quantile(0.99) / 1e3,
+        } for key, component in self.components.items() if component.count > 0]
+        return sorted(rows, key=lambda row: row['total'], reverse=True)
+
+    def pretty_print(self) -> None:
+        from rich.console import Console
+        from rich.table import Table
+
+        table = Table(title='Profile')
+        table.add_column('Component')
+        for column in ['Calls', 'Total, ms', 'Mean, µs', 'p50, µs', 'p99, µs']:
+            table.add_column(column, justify='right')
+        for row in self.get_summary():
+            table.add_row(row['component'], str(row['calls']), f'{row["total"] / 1e3:.1f}',
+                          f'{row["mean"]:.1f}', f'{row["p50"]:.1f}', f'{row["p99"]:.1f}')
+        Console().print(table)
+
+    def __str__(self) -> str:
+        str_io = StringIO()
+        str_io.write(f'{"component":<48}{"calls":>10}{"total, ms":>12}'
+                     f'{"mean, us":>12}{"p50, us":>12}{"p99, us":>12}\n')
+        for row in self.get_summary():
+            str_io.write(f'{row["component"]:<48}{row["calls"]:>10}{row["total"] / 1e3:>12.1f}'
+                         f'{row["mean"]:>12.1f}{row["p50"]:>12.1f}{row["p99"]:>12.1f}\n')
+        return str_io.getvalue()
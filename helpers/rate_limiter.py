@@ -0,0 +1,23 @@
+import threading
+from time import monotonic, sleep
+
+
+class RateLimiter:
+    """
+    Spaces calls of acquire at least 1 / rate seconds apart,
+    across all threads sharing the limiter. rate <= 0 means no limit.
+    """
+
+    def __init__(self, rate: float):
+        self._interval = 1 / rate if rate > 0 else 0.
+        self._next_time = 0.
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """ Blocks until the caller may proceed. """
+        with self._lock:
+            now = monotonic()
+            start = max(now, self._next_time)
+            self._next_time = start + self._interval
+        if start > now:
+            sleep(start - now)
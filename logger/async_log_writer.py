@@ -0,0 +1,100 @@
+import logging
+import queue
+import threading
+
+import typing as tp
+
+_Item = tp.Tuple[logging.LogRecord, tp.Tuple[logging.Handler, ...]]
+
+
+class AsyncLogWriter:
+    """
+    Moves writing of log records off the calling thread.
+    Records are put to a bounded queue and written to their handlers
+    by a background thread. If the queue is full, records are dropped
+    instead of blocking the caller.
+    """
+
+    def __init__(self, max_queue_size: int = 10000):
+        self._queue: 'queue.Queue[tp.Optional[_Item]]' = queue.Queue(maxsize=max_queue_size)
+        self._queue_handlers: tp.Dict[tp.Tuple[logging.Handler, ...], QueueHandler] = {}
+        self._thread: tp.Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.max_queue_depth = 0
+        self.dropped_records = 0
+        self.written_records = 0
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name='AsyncLogWriter', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """ Writes all queued records and stops the writer thread. """
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        for handlers in self._queue_handlers:
+            for handler in handlers:
+                handler.flush()
+
+    def get_handler(self, handlers: tp.Sequence[logging.Handler]) -> logging.Handler:
+        """ Returns handler forwarding records to given handlers through the queue. """
+        key = tuple(handlers)
+        if key not in self._queue_handlers:
+            self._queue_handlers[key] = QueueHandler(self, key)
+        return self._queue_handlers[key]
+
+    def enqueue(self, record: logging.LogRecord,
+                handlers: tp.Tuple[logging.Handler, ...]) -> None:
+        try:
+            self._queue.put_nowait((record, handlers))
+        except queue.Full:
+            with self._lock:
+                self.dropped_records += 1
+            return
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+    def get_metrics(self) -> tp.Dict[str, int]:
+        return {
+            'queue_depth': self._queue.qsize(),
+            'max_queue_depth': self.max_queue_depth,
+            'dropped_records': self.dropped_records,
+            'written_records': self.written_records,
+        }
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            record, handlers = item
+            for handler in handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+            self.written_records += 1
+
+
+class QueueHandler(logging.Handler):
+    """ Formats the message in the calling thread and passes record to AsyncLogWriter. """
+
+    def __init__(self, writer: AsyncLogWriter,
+                 handlers: tp.Tuple[logging.Handler, ...]):
+        super().__init__(level=min((h.level for h in handlers), default=logging.NOTSET))
+        self._writer = writer
+        self._handlers = handlers
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            # Arguments may change before the writer gets to the record
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+                record.exc_info = None
+            self._writer.enqueue(record, self._handlers)
+        except Exception:
+            self.handleError(record)
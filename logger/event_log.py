@@ -0,0 +1,410 @@
+"""
+Append-only binary log of visualization events with a time index.
+
+File layout:
+    file header:  MAGIC, format version
+    chunk:        chunk header, event type name, payload
+    chunk:        ...
+    index:        chunk header with _INDEX flag, payload
+    trailer:      index offset, MAGIC
+
+Every chunk is a pickled list of events of one type in time order,
+optionally zlib-compressed. Chunk headers hold the time span of the chunk,
+so a reader finds the chunks of a type and a time range from the index
+and decodes only them.
+The index is written on close. Chunks are self-contained, so a log cut off
+by a crash is indexed by scanning chunk headers, up to the last complete chunk.
+
+Logs of version 1 have no index and their chunks mix event types,
+they are read by scanning all chunks.
+"""
+
+import importlib
+import pickle
+import queue
+import struct
+import threading
+import zlib
+from os import getpid
+from time import monotonic
+from pathlib import Path
+
+import typing as tp
+
+
+MAGIC = b'CTEVLOG'
+VERSION = 2
+_FILE_HEADER = struct.Struct('>7sB')
+# flags, event count, first ts, last ts, payload length, type name length
+_CHUNK_HEADER = struct.Struct('>BIqqIH')
+# flags, event count, first ts, last ts, payload length
+_V1_CHUNK_HEADER = struct.Struct('>BIqqI')
+# Event type of chunks of version 1 logs, which hold events of any type
+_ANY_TYPE = ''
+# index offset, MAGIC
+_TRAILER = struct.Struct('>Q7s')
+_COMPRESSED = 1
+_INDEX = 2
+# Shortest period of writing buffered events by the writer thread, in seconds
+_MIN_FLUSH_INTERVAL = 0.01
+
+EventT = tp.Dict[str, tp.Any]
+
+
+def get_event_type_name(event_type: type) -> str:
+    return f'{event_type.__module__}:{event_type.__qualname__}'
+
+
+def _resolve_event_type(name: str) -> type:
+    module_name, qualname = name.split(':')
+    obj: tp.Any = importlib.import_module(module_name)
+    for attr in qualname.split('.'):
+        obj = getattr(obj, attr)
+    return tp.cast(type, obj)
+
+
+class ChunkInfo(tp.NamedTuple):
+    event_type: str
+    events_count: int
+    first_ts: int
+    last_ts: int
+    flags: int
+    offset: int
+    length: int
+
+
+class EventLogWriter:
+    """
+    Buffers events into per-type chunks and writes them from a background thread.
+    At most max_pending_chunks chunks wait for the writer,
+    append blocks when the writer falls behind, so memory stays bounded.
+    With flush_interval set, the writer thread writes buffered events at least
+    that often (in seconds), even when no events come,
+    so the log of a running session can be tailed.
+    """
+
+    def __init__(self, path: Path,
+                 chunk_size: int = 4096,
+                 compression: bool = True,
+                 max_pending_chunks: int = 16,
+                 flush_interval: tp.Optional[float] = None):
+        self.path = path
+        self.pid = getpid()
+        self._chunk_size = chunk_size
+        self._compression = compression
+        self._flush_interval = flush_interval
+        self._last_flush = monotonic()
+        self._buffers: tp.Dict[type, tp.List[EventT]] = {}
+        # Guards buffers, chunks are queued under it, so chunks of a type stay in time order
+        self._lock = threading.Lock()
+        self._queue: 'queue.Queue[tp.Optional[tp.Tuple[type, tp.List[EventT]]]]' = \
+            queue.Queue(maxsize=max_pending_chunks)
+        self._index: tp.List[ChunkInfo] = []
+        self._file = open(path, 'wb')
+        self._file.write(_FILE_HEADER.pack(MAGIC, VERSION))
+        self._file.flush()
+        self._error: tp.Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run,
+                                        name=f'EventLogWriter-{path.name}',
+                                        daemon=True)
+        self._thread.start()
+
+    def append(self, event: EventT) -> None:
+        event_type = event['event_type']
+        with self._lock:
+            buffer = self._buffers.get(event_type)
+            if buffer is None:
+                buffer = self._buffers[event_type] = []
+            buffer.append(event)
+            if len(buffer) >= self._chunk_size:
+                self._put_chunk(event_type, self._buffers.pop(event_type))
+
+    def flush(self) -> None:
+        """ Hands buffered events to the writer thread. """
+        with self._lock:
+            self._last_flush = monotonic()
+            for event_type in list(self._buffers):
+                self._put_chunk(event_type, self._buffers.pop(event_type))
+
+    def close(self) -> None:
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is None:
+            self._write_index()
+        self._file.close()
+        if self._error is not None:
+            raise RuntimeError('Event log writer failed') from self._error
+
+    def _put_chunk(self, event_type: type, events: tp.List[EventT]) -> None:
+        if self._error is not None:
+            raise RuntimeError('Event log writer failed') from self._error
+        self._queue.put((event_type, events))
+
+    def _run(self) -> None:
+        while True:
+            try:
+                # A failed writer only drains the queue
+                item = self._queue.get(timeout=None if self._error is not None
+                                       else self._get_flush_timeout())
+            except queue.Empty:
+                item = None
+            else:
+                if item is None:
+                    return
+            if self._error is not None:
+                continue
+            try:
+                if item is not None:
+                    self._write_chunk(*item)
+                if self._get_flush_timeout() == 0:
+                    self._write_buffers()
+            except BaseException as e:  # reported to the producer
+                self._error = e
+
+    def _get_flush_timeout(self) -> tp.Optional[float]:
+        """ Seconds until buffered events are due to be written. """
+        if self._flush_interval is None:
+            return None
+        interval = max(self._flush_interval, _MIN_FLUSH_INTERVAL)
+        return max(0., self._last_flush + interval - monotonic())
+
+    def _write_buffers(self) -> None:
+        """
+        Writes buffered events from the writer thread once queued chunks are written.
+        The lock is not waited for, the producer holding it may wait for the queue.
+        """
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if not self._queue.empty():
+                return
+            self._last_flush = monotonic()
+            buffers = list(self._buffers.items())
+            self._buffers = {}
+        finally:
+            self._lock.release()
+        for event_type, events in buffers:
+            self._write_chunk(event_type, events)
+
+    def _write_chunk(self, event_type: type, events: tp.List[EventT]) -> None:
+        payload = pickle.dumps(events, protocol=pickle.HIGHEST_PROTOCOL)
+        flags = 0
+        if self._compression:
+            payload = zlib.compress(payload, 1)
+            flags |= _COMPRESSED
+        type_name = get_event_type_name(event_type).encode()
+        self._file.write(_CHUNK_HEADER.pack(
+            flags, len(events), events[0]['ts'], events[-1]['ts'],
+            len(payload), len(type_name)))
+        self._file.write(type_name)
+        self._index.append(ChunkInfo(
+            type_name.decode(), len(events), events[0]['ts'], events[-1]['ts'],
+            flags, self._file.tell(), len(payload)))
+        self._file.write(payload)
+        self._file.flush()
+
+    def _write_index(self) -> None:
+        offset = self._file.tell()
+        payload = pickle.dumps([tuple(info) for info in self._index],
+                               protocol=pickle.HIGHEST_PROTOCOL)
+        self._file.write(_CHUNK_HEADER.pack(
+            _INDEX, len(self._index), 0, 0, len(payload), 0))
+        self._file.write(payload)
+        self._file.write(_TRAILER.pack(offset, MAGIC))
+
+
+class EventLogReader:
+    """
+    Reads a log written by EventLogWriter.
+    events(event_type, from_ts, to_ts) decodes only chunks of the given type
+    overlapping the time range.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._version: tp.Optional[int] = None
+        self._index: tp.Optional[tp.List[ChunkInfo]] = None
+
+    @staticmethod
+    def is_event_log(path: Path) -> bool:
+        """ Whether path is an event log of a version the reader supports. """
+        with open(path, 'rb') as f:
+            header = f.read(_FILE_HEADER.size)
+        if len(header) < _FILE_HEADER.size:
+            return False
+        magic, version = _FILE_HEADER.unpack(header)
+        return magic == MAGIC and 1 <= version <= VERSION
+
+    def get_version(self) -> int:
+        if self._version is None:
+            with open(self.path, 'rb') as f:
+                header = f.read(_FILE_HEADER.size)
+            magic, version = _FILE_HEADER.unpack(header) \
+                if len(header) == _FILE_HEADER.size else (None, None)
+            if magic != MAGIC or not 1 <= version <= VERSION:
+                raise ValueError(f'{self.path} is not an event log '
+                                 f'of version 1 to {VERSION}')
+            self._version = version
+        return self._version
+
+    def is_indexed(self) -> bool:
+        """ Whether chunks hold a single event type, so events() decodes only chunks of it. """
+        return self.get_version() > 1
+
+    def get_index(self) -> tp.List[ChunkInfo]:
+        if self._index is None:
+            with open(self.path, 'rb') as f:
+                if not self.is_indexed():
+                    self._index = self._scan_v1_chunks(f)
+                else:
+                    index = self._read_index(f)
+                    self._index = index if index is not None else self._scan_chunks(f)
+        return self._index
+
+    def is_complete(self) -> bool:
+        """ Whether the writer was closed, logs of running sessions are not. """
+        if not self.is_indexed():
+            # Only closed logs of version 1 are left
+            return True
+        with open(self.path, 'rb') as f:
+            return self._read_index(f) is not None
+
+    def get_event_types(self) -> tp.List[type]:
+        if not self.is_indexed():
+            return list(dict.fromkeys(event['event_type'] for event in self))
+        names = dict.fromkeys(info.event_type for info in self.get_index())
+        return [_resolve_event_type(name) for name in names]
+
+    def events(self, event_type: type,
+               from_ts: tp.Optional[int] = None,
+               to_ts: tp.Optional[int] = None) -> tp.Iterator[EventT]:
+        """ Events of event_type with from_ts <= ts <= to_ts in time order. """
+        name = get_event_type_name(event_type)
+        chunks = [info for info in self.get_index()
+                  if info.event_type in (name, _ANY_TYPE)
+                  and (from_ts is None or info.last_ts >= from_ts)
+                  and (to_ts is None or info.first_ts <= to_ts)]
+        with open(self.path, 'rb') as f:
+            for info in chunks:
+                events = self._read_chunk(f, info)
+                if info.event_type == name and \
+                        (from_ts is None or info.first_ts >= from_ts) and \
+                        (to_ts is None or info.last_ts <= to_ts):
+                    yield from events
+                    continue
+                for event in events:
+                    if event['event_type'] == event_type and \
+                            (from_ts is None or event['ts'] >= from_ts) and \
+                            (to_ts is None or event['ts'] <= to_ts):
+                        yield event
+
+    def chunks(self) -> tp.Iterator[tp.List[EventT]]:
+        """ All chunks in the order they were written. """
+        index = self.get_index()
+        with open(self.path, 'rb') as f:
+            for info in index:
+                yield self._read_chunk(f, info)
+
+    def __iter__(self) -> tp.Iterator[EventT]:
+        for chunk in self.chunks():
+            yield from chunk
+
+    @staticmethod
+    def _read_chunk(f: tp.BinaryIO, info: ChunkInfo) -> tp.List[EventT]:
+        f.seek(info.offset)
+        payload = f.read(info.length)
+        if info.flags & _COMPRESSED:
+            payload = zlib.decompress(payload)
+        events: tp.List[EventT] = pickle.loads(payload)
+        return events
+
+    @staticmethod
+    def _read_index(f: tp.BinaryIO) -> tp.Optional[tp.List[ChunkInfo]]:
+        size = f.seek(0, 2)
+        if size < _FILE_HEADER.size + _CHUNK_HEADER.size + _TRAILER.size:
+            return None
+        f.seek(size - _TRAILER.size)
+        offset, magic = _TRAILER.unpack(f.read(_TRAILER.size))
+        if magic != MAGIC:
+            return None
+        f.seek(offset)
+        flags, _count, _first_ts, _last_ts, length, _type_len = \
+            _CHUNK_HEADER.unpack(f.read(_CHUNK_HEADER.size))
+        if not flags & _INDEX:
+            return None
+        return [ChunkInfo(*info) for info in pickle.loads(f.read(length))]
+
+    @staticmethod
+    def _scan_chunks(f: tp.BinaryIO) -> tp.List[ChunkInfo]:
+        """ Restores index of a log which writing was interrupted. """
+        size = f.seek(0, 2)
+        f.seek(_FILE_HEADER.size)
+        index: tp.List[ChunkInfo] = []
+        while True:
+            header = f.read(_CHUNK_HEADER.size)
+            if len(header) < _CHUNK_HEADER.size:
+                return index
+            flags, count, first_ts, last_ts, length, type_len = \
+                _CHUNK_HEADER.unpack(header)
+            if flags & _INDEX:
+                return index
+            type_name = f.read(type_len).decode()
+            offset = f.tell()
+            if offset + length > size:
+                # Incomplete chunk of an interrupted run
+                return index
+            index.append(ChunkInfo(type_name, count, first_ts, last_ts,
+                                   flags, offset, length))
+            f.seek(offset + length)
+
+    @staticmethod
+    def _scan_v1_chunks(f: tp.BinaryIO) -> tp.List[ChunkInfo]:
+        """ Chunks of a version 1 log, which hold events of any type. """
+        size = f.seek(0, 2)
+        f.seek(_FILE_HEADER.size)
+        index: tp.List[ChunkInfo] = []
+        while True:
+            header = f.read(_V1_CHUNK_HEADER.size)
+            if len(header) < _V1_CHUNK_HEADER.size:
+                return index
+            flags, count, first_ts, last_ts, length = _V1_CHUNK_HEADER.unpack(header)
+            offset = f.tell()
+            if offset + length > size:
+                return index
+            index.append(ChunkInfo(_ANY_TYPE, count, first_ts, last_ts,
+                                   flags, offset, length))
+            f.seek(offset + length)
+
+
+class EventLogTailer:
+    """ Follows a log while it is written, read_new returns events of newly completed chunks. """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.finished = False
+        self._offset = _FILE_HEADER.size
+
+    def read_new(self) -> tp.List[EventT]:
+        events: tp.List[EventT] = []
+        if self.finished:
+            return events
+        with open(self.path, 'rb') as f:
+            size = f.seek(0, 2)
+            f.seek(self._offset)
+            while True:
+                header = f.read(_CHUNK_HEADER.size)
+                if len(header) < _CHUNK_HEADER.size:
+                    return events
+                flags, count, first_ts, last_ts, length, type_len = \
+                    _CHUNK_HEADER.unpack(header)
+                if flags & _INDEX:
+                    self.finished = True
+                    return events
+                type_name = f.read(type_len).decode()
+                offset = f.tell()
+                if offset + length > size:
+                    return events
+                events.extend(EventLogReader._read_chunk(f, ChunkInfo(
+                    type_name, count, first_ts, last_ts, flags, offset, length)))
+                self._offset = offset + length
@@ -1,42 +1,142 @@
 import logging
-import pickle
+import weakref
 
 from datetime import datetime
+from os import getpid
 from pathlib import Path
 
+from logger.async_log_writer import AsyncLogWriter
 from logger.clock import Clock
+from logger.event_log import EventLogWriter
 from logger.log_events import LogEvent
 
 import typing as tp
 from helpers.typing.common_types import Config
 from base.config_parser import ConfigParser
 
+DEFAULT_CONFIG_PATH = Path('configs/base.json')
 TRADING = logging.WARNING + 5
 logging.addLevelName(TRADING, "TRADING")
 
 
 class Logger:
+    def __new__(cls, name: str, config: tp.Optional[Config] = None) -> 'Logger':
+        if cls._headless and cls is Logger:
+            return super().__new__(NullLogger)
+        return super().__new__(cls)
+
     def __init__(self, name: str, config: tp.Optional[Config] = None):
-        self.config: Config = Logger._default_config if config is None else config
+        self.config: Config = Logger.get_default_config() if config is None else config
         self.logger = logging.getLogger(name)
         self.logger.setLevel(logging.INFO)
+        # Left disabled if all loggers of the name were dropped in headless mode
+        self.logger.disabled = False
+        self._register_handlers()
+        if not self.config["system_time"]:
+            self.logger.addFilter(Logger._timestamp_filter)
+        Logger._instances.add(self)
+
+    def __reduce__(self) -> tp.Tuple[tp.Any, ...]:
+        """ Recreated by name in another process, e.g. in a worker of a pool. """
+        return Logger, (self.logger.name, self.config)
+
+    def _register_handlers(self) -> None:
+        """ Handlers are added to the underlying logger once per run. """
+        name = self.logger.name
+        if name in Logger._registered_handlers:
+            return
+        handlers: tp.List[logging.Handler] = []
         if self.config["file_output"]:
-            self.logger.addHandler(self._get_trading_file_handler())
-            self.logger.addHandler(self._get_info_file_handler())
+            handlers.append(self._get_trading_file_handler())
+            handlers.append(self._get_info_file_handler())
         if self.config["std_output"]:
-            self.logger.addHandler(self.__get_stream_handler())
-        if not self.config["system_time"]:
-            self.logger.addFilter(Logger.TimestampFilter())
+            handlers.append(self.__get_stream_handler())
+        if handlers and Logger._async_writer is not None:
+            handlers = [Logger._async_writer.get_handler(handlers)]
+        for handler in handlers:
+            self.logger.addHandler(handler)
+        Logger._registered_handlers[name] = handlers
 
     def __getattr__(self, item: str) -> tp.Any:
         if item == 'logger':
             raise AttributeError
         return getattr(self.logger, item)
 
+    @classmethod
+    def start_run(cls, async_output: bool = False,
+                  max_queue_size: int = 10000) -> None:
+        """
+        Registers handlers of the new run, log files are chosen
+        by the current log file name and logs path.
+        With async_output records are written by a background thread.
+        """
+        cls.end_run()
+        if async_output:
+            cls._async_writer = AsyncLogWriter(max_queue_size)
+            cls._async_writer.start()
+        for logger in list(cls._instances):
+            logger._register_handlers()
+
+    @classmethod
+    def end_run(cls) -> None:
+        """ Writes pending records, detaches and closes handlers of the run. """
+        if cls._async_writer is not None:
+            cls._async_writer.stop()
+            cls._async_writer = None
+        for name, handlers in cls._registered_handlers.items():
+            logger = logging.getLogger(name)
+            for handler in handlers:
+                logger.removeHandler(handler)
+        cls._registered_handlers.clear()
+        for file_handler in cls._file_handlers.values():
+            file_handler.close()
+        cls._file_handlers.clear()
+
+    @classmethod
+    def get_async_writer_metrics(cls) -> tp.Optional[tp.Dict[str, int]]:
+        """ Queue depth and dropped records of the async writer, if it is used. """
+        if cls._async_writer is None:
+            return None
+        return cls._async_writer.get_metrics()
+
     @classmethod
     def set_default_config(cls, cfg: Config) -> None:
         cls._default_config = cfg
 
+    @classmethod
+    def get_default_config(cls) -> Config:
+        """
+        Config of loggers created without one. If set_default_config was not called,
+        default_logger of configs/base.json is read on the first call, not at import.
+        """
+        if cls._default_config is None:
+            cls._default_config = ConfigParser.load_config(DEFAULT_CONFIG_PATH)['default_logger']
+        return cls._default_config
+
+    @classmethod
+    def set_headless(cls, headless: bool) -> None:
+        """
+        In headless mode loggers do nothing and no events are stored for visualizer,
+        loggers created in it are NullLogger. Leaving it restores
+        the event capture set before entering it.
+        """
+        if headless and not cls._headless:
+            cls._capture_before_headless = (cls._capture_events, cls._captured_event_types)
+            cls._capture_events = False
+        elif not headless and cls._headless:
+            cls._capture_events, cls._captured_event_types = cls._capture_before_headless
+        cls._headless = headless
+        for logger in list(cls._instances):
+            logger.logger.disabled = headless
+
+    @classmethod
+    def is_headless(cls) -> bool:
+        return cls._headless
+
+    @classmethod
+    def set_event_log_config(cls, cfg: Config) -> None:
+        cls._event_log_config = cfg
+
     @classmethod
     def set_clock(cls, clock: Clock) -> None:
         cls._clock = clock
@@ -75,15 +175,27 @@ class Logger:
 
     @staticmethod
     def __get_stream_handler() -> logging.StreamHandler:
-        stream_handler = logging.StreamHandler()
-        stream_handler.setLevel(logging.INFO)
-        stream_handler.setFormatter(logging.Formatter(*Logger._log_format))
-        return stream_handler
+        if Logger._stream_handler is None:
+            stream_handler = logging.StreamHandler()
+            stream_handler.setLevel(logging.INFO)
+            stream_handler.setFormatter(logging.Formatter(*Logger._log_format))
+            Logger._stream_handler = stream_handler
+        return Logger._stream_handler
 
     @classmethod
     def store_log(cls) -> None:
-        with open(cls.create_log_file('dump', 'dump'), 'wb') as f:
-            pickle.dump(cls._dump_logs, f)
+        """ Writes the rest of the event log and closes it. """
+        if cls._event_log is not None and cls._event_log.pid == getpid():
+            cls._event_log.close()
+        cls._event_log = None
+
+    @classmethod
+    def _get_event_log(cls) -> EventLogWriter:
+        # Forked workers must not reuse the writer thread of the parent
+        if cls._event_log is None or cls._event_log.pid != getpid():
+            cls._event_log = EventLogWriter(
+                cls.create_log_file('dump', 'dump'), **cls._event_log_config)
+        return cls._event_log
 
     @staticmethod
     def create_log_file(log_type: str, ext: str) -> Path:
@@ -98,11 +210,35 @@ class Logger:
         if self.isEnabledFor(TRADING):
             self._log(TRADING, msg, args, **kwargs)
 
+    @classmethod
+    def set_event_capture(cls, enabled: bool,
+                          event_types: tp.Optional[tp.Iterable[tp.Type[LogEvent]]] = None) -> None:
+        """
+        Enables or disables storing events for visualizer.
+        If event_types is given, only events of these types are stored.
+        """
+        cls._capture_events = enabled
+        cls._captured_event_types = None if event_types is None else frozenset(event_types)
+
+    @classmethod
+    def is_captured(cls, event_type: tp.Type[LogEvent]) -> bool:
+        return cls._capture_events and (cls._captured_event_types is None
+                                        or event_type in cls._captured_event_types)
+
+    def is_event_enabled(self, event_type: tp.Type[LogEvent],
+                         level: int = TRADING) -> bool:
+        """
+        Returns False if the event would be neither stored nor logged,
+        so callers may skip creating it.
+        """
+        return self.is_captured(event_type) or self.isEnabledFor(level)
+
     @staticmethod
     def to_visualize(log_event: LogEvent) -> None:
-        log_event.obj['ts'] = Logger._clock.get_timestamp()
-        log_event.obj['event_type'] = log_event.__class__
-        Logger._dump_logs.append(log_event.obj)
+        obj = log_event.obj
+        obj['ts'] = Logger._clock.get_timestamp()
+        obj['event_type'] = log_event.__class__
+        Logger._get_event_log().append(obj)
 
     def trading_event(self, event: LogEvent,
                       *args: tp.Any, **kwargs: tp.Any) -> None:
@@ -114,7 +250,8 @@ class Logger:
 
     def log_event(self, event: LogEvent, level: int = TRADING,
                   *args: tp.Any, **kwargs: tp.Any) -> None:
-        self.to_visualize(event)
+        if self.is_captured(type(event)):
+            self.to_visualize(event)
         if self.isEnabledFor(level):
             self._log(level, event.msg, args, **kwargs)
 
@@ -129,11 +266,81 @@ class Logger:
             return True
 
     _clock = Clock()
+    _headless = False
     _log_format = (f'[%(asctime)s] [%(levelname)s] [%(name)s] %(message)s',
                    '%m-%d %H:%M:%S')
     _file_handlers: tp.Dict[Path, logging.FileHandler] = {}
-    _dump_logs: tp.List[LogEvent] = []
+    _stream_handler: tp.Optional[logging.StreamHandler] = None
+    _timestamp_filter = TimestampFilter()
+    _registered_handlers: tp.Dict[str, tp.List[logging.Handler]] = {}
+    _instances: 'weakref.WeakSet[Logger]' = weakref.WeakSet()
+    _async_writer: tp.Optional[AsyncLogWriter] = None
+    _event_log: tp.Optional[EventLogWriter] = None
+    _capture_events = True
+    _captured_event_types: tp.Optional[tp.FrozenSet[tp.Type[LogEvent]]] = None
+    _capture_before_headless: tp.Tuple[bool, tp.Optional[tp.FrozenSet[tp.Type[LogEvent]]]] = (True, None)
+    _event_log_config: Config = {
+        'chunk_size': 4096,
+        'compression': True,
+        'max_pending_chunks': 16,
+        'flush_interval': 5,
+    }
     _file_name: tp.Optional[str] = None
     _logs_path = Path('logs')
-    _default_config: Config = ConfigParser.load_config(
-        Path('configs/base.json'))['default_logger']
+    _default_config: tp.Optional[Config] = None
+
+
+def _forwarded(name: str) -> tp.Callable[..., None]:
+    def method(self: 'NullLogger', *args: tp.Any, **kwargs: tp.Any) -> None:
+        if not Logger._headless:
+            getattr(self.get_regular(), name)(*args, **kwargs)
+    return method
+
+
+class NullLogger(Logger):
+    """
+    Logger created in headless mode. Calls are no-ops while the mode lasts,
+    afterwards they go to a regular logger of the same name, created on first use.
+    """
+
+    def __init__(self, name: str, config: tp.Optional[Config] = None):
+        self._name = name
+        self._config = config
+        self._regular: tp.Optional[Logger] = None
+
+    def __reduce__(self) -> tp.Tuple[tp.Any, ...]:
+        return Logger, (self._name, self._config)
+
+    def get_regular(self) -> Logger:
+        if self._regular is None:
+            self._regular = Logger(self._name, self._config)
+        return self._regular
+
+    debug = _forwarded('debug')
+    info = _forwarded('info')
+    warning = _forwarded('warning')
+    error = _forwarded('error')
+    exception = _forwarded('exception')
+    critical = _forwarded('critical')
+    log = _forwarded('log')
+    trading = _forwarded('trading')
+    trading_event = _forwarded('trading_event')
+    info_event = _forwarded('info_event')
+    log_event = _forwarded('log_event')
+
+    def is_event_enabled(self, event_type: tp.Type[LogEvent], level: int = TRADING) -> bool:
+        return not Logger._headless and self.get_regular().is_event_enabled(event_type, level)
+
+    def isEnabledFor(self, level: int) -> bool:
+        return not Logger._headless and self.get_regular().isEnabledFor(level)
+
+    def __getattr__(self, item: str) -> tp.Any:
+        if item.startswith('_'):
+            raise AttributeError(item)
+        if Logger._headless:
+            return _skip
+        return getattr(self.get_regular(), item)
+
+
+def _skip(*args: tp.Any, **kwargs: tp.Any) -> None:
+    pass
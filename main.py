@@ -15,6 +15,7 @@ if __name__ == '__main__':
     waves_config = ConfigParser.load_config(Path('configs/waves.json'))['testnet']
     simulator_config = ConfigParser.load_config(Path('configs/simulator.json'))
     Logger.set_default_config(base_config['default_logger'])
+    Logger.set_event_log_config(base_config['event_log'])
 
     MarketDataDownloader.init(base_config['market_data_downloader'])
 
@@ -0,0 +1,139 @@
+"""
+Columnar candles: float64 arrays of shape (n, 6) with columns ts, open, close, low, high, volume.
+Batches of the market data API are decoded, merged and gap-filled as arrays,
+Candle objects are created once at the end.
+"""
+import time
+import typing as tp
+import warnings
+
+import numpy as np
+
+from trading import Candle
+
+TS, OPEN, CLOSE, LOW, HIGH, VOLUME = range(6)
+_FIELDS = ('open', 'close', 'low', 'high', 'volume')
+
+
+def parse_iso_times(times: tp.Sequence[str]) -> np.ndarray:
+    """
+    Timestamps of ISO times in seconds, as Timestamp.from_iso_format gives them:
+    times with a zone are converted to UTC, naive ones are in local time.
+    """
+    if not times:
+        return np.empty(0, dtype=np.int64)
+    with warnings.catch_warnings():
+        # Times with a zone are converted to UTC, numpy warns it drops the zone
+        warnings.simplefilter('ignore')
+        timestamps = np.array(times, dtype='datetime64[ms]').astype('datetime64[s]').astype(np.int64)
+    # Times of one batch share the format
+    if _has_zone(times[0]):
+        return timestamps
+    return _local_to_utc(timestamps)
+
+
+def _has_zone(iso_time: str) -> bool:
+    return iso_time.endswith('Z') or '+' in iso_time[10:] or '-' in iso_time[10:]
+
+
+def _local_to_utc(timestamps: np.ndarray) -> np.ndarray:
+    """ Local offsets are taken once per hour, zone transitions happen at whole hours. """
+    hours, inverse = np.unique(timestamps // 3600 * 3600, return_inverse=True)
+    local_hours = np.array([time.mktime(time.gmtime(hour)[:8] + (-1,)) for hour in hours.tolist()],
+                           dtype=np.int64)
+    return timestamps - (hours - local_hours)[inverse]
+
+
+def decode_batch(candles_data: tp.List[tp.Dict[str, tp.Any]]) -> np.ndarray:
+    """ Candles of an API response, missing values are NaN. """
+    values = np.empty((len(candles_data), 6), dtype=np.float64)
+    if not candles_data:
+        return values
+    rows = [candle['data'] for candle in candles_data]
+    values[:, TS] = parse_iso_times([row['time'] for row in rows])
+    for column, field in enumerate(_FIELDS, start=OPEN):
+        values[:, column] = np.array([row[field] for row in rows], dtype=np.float64)
+    return values
+
+
+def merge(batches: tp.List[np.ndarray]) -> np.ndarray:
+    """ Candles of all batches ordered by timestamp, of equal timestamps the last one is kept. """
+    if not batches:
+        return np.empty((0, 6), dtype=np.float64)
+    values = np.concatenate(batches)
+    values = values[np.argsort(values[:, TS], kind='stable')]
+    is_last = np.append(values[1:, TS] != values[:-1, TS], True)
+    return values[is_last]
+
+
+def fill_gaps(values: np.ndarray) -> np.ndarray:
+    """
+    Drops empty candles before the first full one, an empty candle after it
+    becomes a flat one at the previous close with zero volume.
+    """
+    is_full = ~np.isnan(values[:, OPEN])
+    if not is_full.any():
+        return values[:0]
+    values = values[np.argmax(is_full):]
+    is_full = is_full[len(is_full) - len(values):]
+    if is_full.all():
+        return values
+    last_full = np.maximum.accumulate(np.where(is_full, np.arange(len(values)), 0))
+    close = values[last_full, CLOSE]
+    gaps = ~is_full
+    values = values.copy()
+    for column in (OPEN, CLOSE, LOW, HIGH):
+        values[gaps, column] = close[gaps]
+    values[gaps, VOLUME] = 0.
+    return values
+
+
+def align(values: np.ndarray, timestamps: np.ndarray) -> np.ndarray:
+    """
+    Candles at timestamps, so streams of several pairs step on one clock.
+    A missing candle is a flat one at the previous close with zero volume,
+    before the first candle it is flat at its open.
+    """
+    result = np.empty((len(timestamps), 6), dtype=np.float64)
+    result[:, TS] = timestamps
+    if not len(values):
+        result[:, OPEN:] = np.nan
+        return result
+    index = np.searchsorted(values[:, TS], timestamps, 'right') - 1
+    previous = values[np.maximum(index, 0)]
+    flat = np.where(index >= 0, previous[:, CLOSE], values[0, OPEN])
+    for column in (OPEN, CLOSE, LOW, HIGH):
+        result[:, column] = flat
+    result[:, VOLUME] = 0.
+    exact = (index >= 0) & (previous[:, TS] == timestamps)
+    result[exact] = previous[exact]
+    return result
+
+
+def aggregate(values: np.ndarray, seconds: int) -> np.ndarray:
+    """
+    Candles of a coarser timeframe of seconds, aligned to multiples of it.
+    The last candle is partial if values end inside its period.
+    """
+    if not len(values):
+        return values
+    keys = values[:, TS] // seconds * seconds
+    starts = np.flatnonzero(np.append(True, keys[1:] != keys[:-1]))
+    ends = np.append(starts[1:], len(values)) - 1
+    result = np.empty((len(starts), 6), dtype=np.float64)
+    result[:, TS] = keys[starts]
+    result[:, OPEN] = values[starts, OPEN]
+    result[:, CLOSE] = values[ends, CLOSE]
+    result[:, LOW] = np.minimum.reduceat(values[:, LOW], starts)
+    result[:, HIGH] = np.maximum.reduceat(values[:, HIGH], starts)
+    result[:, VOLUME] = np.add.reduceat(values[:, VOLUME], starts)
+    return result
+
+
+def from_candles(candles: tp.List[Candle]) -> np.ndarray:
+    return np.array([(c.ts, c.open, c.close, c.low, c.high, c.volume) for c in candles],
+                    dtype=np.float64).reshape(-1, 6)
+
+
+def to_candles(values: np.ndarray) -> tp.List[Candle]:
+    return [Candle(int(ts), o, c, lo, hi, v) for ts, o, c, lo, hi, v in values.tolist()]
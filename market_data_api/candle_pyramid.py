@@ -0,0 +1,53 @@
+import typing as tp
+
+import numpy as np
+
+from market_data_api import candle_columns
+from trading import Timeframe, TimeRange
+
+
+class CandlePyramid:
+    """
+    Candles of a time range in the base timeframe and every coarser timeframe
+    that is a multiple of it. A level is aggregated on first request from the
+    coarsest level already built that divides it, and kept.
+    """
+
+    def __init__(self, base_timeframe: Timeframe, time_range: TimeRange, values: np.ndarray):
+        """ values are candle_columns arrays of base_timeframe candles of time_range. """
+        self.base_timeframe = base_timeframe
+        self.time_range = time_range
+        self.levels: tp.Dict[int, np.ndarray] = {base_timeframe.to_seconds(): values}
+
+    def supports(self, timeframe: Timeframe) -> bool:
+        return timeframe.to_seconds() % self.base_timeframe.to_seconds() == 0
+
+    def get(self, timeframe: Timeframe) -> np.ndarray:
+        seconds = timeframe.to_seconds()
+        if not self.supports(timeframe):
+            raise ValueError(f'{timeframe} is not a multiple of {self.base_timeframe}')
+        level = self.levels.get(seconds)
+        if level is None:
+            source = max(s for s in self.levels if seconds % s == 0)
+            level = self.levels[seconds] = candle_columns.aggregate(self.levels[source], seconds)
+        return level
+
+    def get_range(self, timeframe: Timeframe, time_range: TimeRange) -> np.ndarray:
+        """ A view of candles of timeframe starting inside time_range. """
+        level = self.get(timeframe)
+        timestamps = level[:, candle_columns.TS]
+        return level[np.searchsorted(timestamps, time_range.from_ts, 'left'):
+                     np.searchsorted(timestamps, time_range.to_ts, 'right')]
+
+    @staticmethod
+    def get_base_range(base_timeframe: Timeframe, timeframe: Timeframe,
+                       time_range: TimeRange) -> TimeRange:
+        """ Range of base candles which candles of timeframe starting inside time_range consist of. """
+        seconds = timeframe.to_seconds()
+        from_ts = -(-time_range.from_ts // seconds) * seconds
+        to_ts = time_range.to_ts // seconds * seconds + seconds - base_timeframe.to_seconds()
+        return TimeRange(from_ts, max(from_ts, to_ts))
+
+    def covers(self, time_range: TimeRange) -> bool:
+        return self.time_range.from_ts <= time_range.from_ts and \
+            time_range.to_ts <= self.time_range.to_ts
@@ -0,0 +1,97 @@
+"""
+Local caches of MarketDataDownloader, so backtests on downloaded data run offline.
+"""
+import json
+import os
+import typing as tp
+from pathlib import Path
+from time import time
+from uuid import uuid4
+
+import numpy as np
+
+from market_data_api import candle_columns
+from trading import AssetPair, Candle, Timeframe, TimeRange
+
+
+def _write_atomic(path: Path, write: tp.Callable[[tp.BinaryIO], None]) -> None:
+    """ Readers never see a partial file, concurrent writers leave one of the versions. """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f'.{path.name}.{uuid4().hex}')
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+class MarketsCache:
+    """ Market ids by symbol and the time they were fetched, in a JSON file. """
+
+    def __init__(self, path: Path, ttl: int):
+        """ ttl is in seconds, older markets are stale. """
+        self.path = path
+        self.ttl = ttl
+
+    def load(self, allow_stale: bool = False) -> tp.Optional[tp.Dict[str, str]]:
+        try:
+            with open(self.path) as f:
+                cached = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if not allow_stale and time() - cached['fetched_at'] > self.ttl:
+            return None
+        market_ids: tp.Dict[str, str] = cached['markets']
+        return market_ids
+
+    def store(self, market_ids: tp.Dict[str, str]) -> None:
+        data = json.dumps({'fetched_at': time(), 'markets': market_ids}, sort_keys=True)
+
+        def write(f: tp.BinaryIO) -> None:
+            f.write(data.encode())
+
+        _write_atomic(self.path, write)
+
+
+class CandlesCache:
+    """
+    Candles of finished downloads, one file per asset pair, timeframe and time range.
+    A range inside a stored one is served from it.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def get(self, asset_pair: AssetPair, timeframe: Timeframe,
+            time_range: TimeRange) -> tp.Optional[tp.List[Candle]]:
+        values = self.get_columns(asset_pair, timeframe, time_range)
+        return None if values is None else candle_columns.to_candles(values)
+
+    def get_columns(self, asset_pair: AssetPair, timeframe: Timeframe,
+                    time_range: TimeRange) -> tp.Optional[np.ndarray]:
+        """ Stored candles as candle_columns arrays. """
+        prefix = self._get_prefix(asset_pair, timeframe)
+        for path in self.path.glob(f'{prefix}_*.npy'):
+            from_ts, to_ts = map(int, path.stem[len(prefix) + 1:].split('_'))
+            if from_ts <= time_range.from_ts and time_range.to_ts <= to_ts:
+                try:
+                    values = np.load(path)
+                except (OSError, ValueError):
+                    continue
+                timestamps = values[:, candle_columns.TS]
+                return values[np.searchsorted(timestamps, time_range.from_ts, 'left'):
+                              np.searchsorted(timestamps, time_range.to_ts, 'right')]
+        return None
+
+    def put(self, asset_pair: AssetPair, timeframe: Timeframe,
+            time_range: TimeRange, candles: tp.List[Candle]) -> None:
+        self.put_columns(asset_pair, timeframe, time_range, candle_columns.from_candles(candles))
+
+    def put_columns(self, asset_pair: AssetPair, timeframe: Timeframe,
+                    time_range: TimeRange, values: np.ndarray) -> None:
+        """ Stores candles given as candle_columns arrays. """
+        path = self.path / f'{self._get_prefix(asset_pair, timeframe)}_' \
+                           f'{time_range.from_ts}_{time_range.to_ts}.npy'
+        _write_atomic(path, lambda f: np.save(f, values))
+
+    @staticmethod
+    def _get_prefix(asset_pair: AssetPair, timeframe: Timeframe) -> str:
+        return f'{str(asset_pair).replace("/", "-")}_{timeframe}'
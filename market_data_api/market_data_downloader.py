@@ -1,68 +1,261 @@
-import ccxt
-import requests
+import bisect
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from copy import copy
+from pathlib import Path
 from retry import retry
+from time import time
 import typing as tp
 
+import numpy as np
+
+from helpers.rate_limiter import RateLimiter
 from helpers.typing.common_types import Config
+from helpers.typing.utils import require
 from logger.logger import Logger
+from market_data_api import candle_columns
+from market_data_api.candle_pyramid import CandlePyramid
+from market_data_api.market_data_cache import CandlesCache, MarketsCache
 
-from trading import Candle, AssetPair, Timeframe, TimeRange, Timestamp
+from trading import Candle, AssetPair, Timeframe, TimeRange
 
 
 class MarketDataDownloader:
     _Config: Config = None
-    _Exchange = None
-    _Logger = None
+    _Exchange: tp.Any = None
+    _Logger: tp.Optional[Logger] = None
+    # Market ids by symbol, loaded on the first lookup
+    _Markets: tp.Optional[tp.Dict[str, str]] = None
+    _MarketsCache: tp.Optional[MarketsCache] = None
+    _MarketsLock = threading.Lock()
+    _CandlesCache: tp.Optional[CandlesCache] = None
+    _RateLimiter = RateLimiter(0)
+    _Session: tp.Any = None
+    # Recently downloaded candles: asset pair, timeframe, time range, candles
+    _Memory: tp.List[tp.Tuple[str, str, TimeRange, tp.List[Candle]]] = []
+    _MemorySize = 0
+    # Recently used pyramids of base timeframe candles by asset pair
+    _Pyramids: tp.List[tp.Tuple[str, CandlePyramid]] = []
+    _PyramidsSize = 4
 
     @staticmethod
     def init(config: Config) -> None:
+        """
+        Makes no network calls, markets are loaded on the first market id lookup.
+        With cache_path in config markets are kept there for markets_ttl
+        and candles of finished ranges are stored there too,
+        so later runs on them work offline.
+        Candles are requested by at most max_connections concurrent connections
+        and max_requests_per_second requests per second, 0 means no limit.
+        With base_timeframe only candles of it are downloaded and stored,
+        candles of its multiples are aggregated from them.
+        """
         MarketDataDownloader._Config = config
-        MarketDataDownloader._Exchange = ccxt.wavesexchange()
+        MarketDataDownloader._Pyramids = []
+        MarketDataDownloader._Exchange = None
+        MarketDataDownloader._Markets = None
+        MarketDataDownloader._Session = None
+        MarketDataDownloader._RateLimiter = RateLimiter(config.get('max_requests_per_second', 0))
         MarketDataDownloader._Logger = Logger("MarketDataDownloader")
-        # TODO: delete this :)
-        MarketDataDownloader._Exchange.verify = False
-        MarketDataDownloader._Exchange.load_markets()
+        cache_path = config.get('cache_path')
+        if cache_path is None:
+            MarketDataDownloader._MarketsCache = None
+            MarketDataDownloader._CandlesCache = None
+            return
+        MarketDataDownloader._MarketsCache = MarketsCache(
+            Path(cache_path) / 'markets.json',
+            ttl=Timeframe(config.get('markets_ttl', '1d')).to_seconds())
+        MarketDataDownloader._CandlesCache = CandlesCache(Path(cache_path) / 'candles')
+
+    @staticmethod
+    def _get_exchange() -> tp.Any:
+        if MarketDataDownloader._Exchange is None:
+            import ccxt
+
+            MarketDataDownloader._Exchange = ccxt.wavesexchange()
+            # TODO: delete this :)
+            MarketDataDownloader._Exchange.verify = False
+        return MarketDataDownloader._Exchange
+
+    @staticmethod
+    def _get_market_id(asset_pair: AssetPair) -> str:
+        symbol = str(asset_pair)
+        # Download threads look ids up concurrently, markets are loaded by one of them
+        with MarketDataDownloader._MarketsLock:
+            markets = MarketDataDownloader._Markets
+            if markets is None or symbol not in markets:
+                # A missing symbol may be a market listed after markets were cached
+                markets = MarketDataDownloader._Markets = \
+                    MarketDataDownloader._load_markets(refresh=markets is not None)
+        return markets[symbol]
+
+    @staticmethod
+    def _load_markets(refresh: bool) -> tp.Dict[str, str]:
+        """ Fresh cached markets or downloaded ones, stale cached ones if the exchange is down. """
+        cache = MarketDataDownloader._MarketsCache
+        if cache is not None and not refresh:
+            markets = cache.load()
+            if markets is not None:
+                return markets
+        import ccxt
+
+        try:
+            markets = {symbol: market['id'] for symbol, market in
+                       MarketDataDownloader._get_exchange().load_markets(reload=refresh).items()}
+        except ccxt.NetworkError:
+            stale = cache.load(allow_stale=True) if cache is not None else None
+            if stale is None:
+                raise
+            require(MarketDataDownloader._Logger).warning('Exchange is not available, using stale markets')
+            return stale
+        if cache is not None:
+            cache.store(markets)
+        return markets
+
+    @staticmethod
+    def set_memory_cache_size(size: int) -> None:
+        """
+        Keeps candles of the last size downloads in memory,
+        candles of a range inside one of them are served without downloading.
+        """
+        MarketDataDownloader._MemorySize = size
+        del MarketDataDownloader._Memory[:max(0, len(MarketDataDownloader._Memory) - size)]
 
     @staticmethod
     def get_candles(asset_pair: AssetPair, timeframe: Timeframe, time_range: TimeRange) -> tp.List[Candle]:
-        MarketDataDownloader._Logger.info(f"Loading candles in range {time_range}")
-        candles: tp.List[Candle] = []
-        current_ts = time_range.from_ts
-
-        while current_ts <= time_range.to_ts:
-            candles_data = MarketDataDownloader._load_candles_batch(
-                asset_pair=asset_pair,
-                timeframe=timeframe,
-                time_range=TimeRange(
-                    current_ts,
-                    min(current_ts + timeframe.to_seconds() * MarketDataDownloader._Config['candles_per_request'],
-                        time_range.to_ts)))
-            for candle in candles_data:
-                candle_data = candle['data']
-                new_candle = Candle(
-                    ts=Timestamp.from_iso_format(candle_data['time']),
-                    open=candle_data['open'],
-                    close=candle_data['close'],
-                    low=candle_data['low'],
-                    high=candle_data['high'],
-                    volume=candle_data['volume'])
-                candles.append(new_candle)
-
-            if not candles_data:
-                break
-            current_ts = candles[-1].ts + 1
-
-        return MarketDataDownloader._fill_gaps(candles)
+        if MarketDataDownloader._MemorySize > 0:
+            cached = MarketDataDownloader._get_from_memory(asset_pair, timeframe, time_range)
+            if cached is not None:
+                return cached
+        base_timeframe = MarketDataDownloader._get_base_timeframe(timeframe)
+        if base_timeframe is None:
+            values = MarketDataDownloader._load_columns(asset_pair, timeframe, time_range)
+        else:
+            values = MarketDataDownloader._get_pyramid(
+                asset_pair, base_timeframe,
+                CandlePyramid.get_base_range(base_timeframe, timeframe, time_range)
+            ).get_range(timeframe, time_range)
+        candles = candle_columns.to_candles(values)
+        MarketDataDownloader._remember(asset_pair, timeframe, time_range, candles)
+        return copy(candles)
+
+    @staticmethod
+    def _get_base_timeframe(timeframe: Timeframe) -> tp.Optional[Timeframe]:
+        """ Configured base timeframe if candles of timeframe are aggregated from it. """
+        base = (MarketDataDownloader._Config or {}).get('base_timeframe')
+        if base is None or timeframe.to_seconds() % Timeframe(base).to_seconds() != 0:
+            return None
+        return Timeframe(base)
+
+    @staticmethod
+    def _is_finished(timeframe: Timeframe, time_range: TimeRange) -> bool:
+        """ Candles of an unfinished range are still to change, they are not kept. """
+        return time_range.to_ts + timeframe.to_seconds() < time()
+
+    @staticmethod
+    def _get_pyramid(asset_pair: AssetPair, base_timeframe: Timeframe,
+                     base_range: TimeRange) -> CandlePyramid:
+        """ Only pyramids of finished ranges are kept. """
+        pyramids = MarketDataDownloader._Pyramids
+        finished = MarketDataDownloader._is_finished(base_timeframe, base_range)
+        for i, (pair, pyramid) in enumerate(pyramids):
+            if finished and pair == str(asset_pair) and \
+                    str(pyramid.base_timeframe) == str(base_timeframe) and pyramid.covers(base_range):
+                pyramids.append(pyramids.pop(i))
+                return pyramid
+        pyramid = CandlePyramid(base_timeframe, base_range, MarketDataDownloader._load_columns(
+            asset_pair, base_timeframe, base_range))
+        if not finished:
+            return pyramid
+        pyramids.append((str(asset_pair), pyramid))
+        del pyramids[:max(0, len(pyramids) - MarketDataDownloader._PyramidsSize)]
+        return pyramid
+
+    @staticmethod
+    def _load_columns(asset_pair: AssetPair, timeframe: Timeframe,
+                      time_range: TimeRange) -> np.ndarray:
+        """ Candles as candle_columns arrays, from the disk cache or downloaded. """
+        candles_cache = MarketDataDownloader._CandlesCache
+        if candles_cache is not None:
+            stored = candles_cache.get_columns(asset_pair, timeframe, time_range)
+            if stored is not None:
+                return stored
+        require(MarketDataDownloader._Logger).info(f"Loading candles in range {time_range}")
+        chunks = MarketDataDownloader._split_range(timeframe, time_range)
+
+        def load_chunk(chunk: TimeRange) -> tp.List[tp.Dict[str, tp.Any]]:
+            return MarketDataDownloader._load_candles_batch(
+                asset_pair=asset_pair, timeframe=timeframe, time_range=chunk)
+
+        workers = min(len(chunks), MarketDataDownloader._get_max_connections())
+        with ThreadPoolExecutor(max_workers=max(workers, 1),
+                                thread_name_prefix='CandlesDownload') as executor:
+            batches = list(executor.map(load_chunk, chunks))
+
+        # Chunks may overlap at their bounds, the later candle wins
+        values = candle_columns.fill_gaps(
+            candle_columns.merge([candle_columns.decode_batch(batch) for batch in batches]))
+        if candles_cache is not None and MarketDataDownloader._is_finished(timeframe, time_range):
+            candles_cache.put_columns(asset_pair, timeframe, time_range, values)
+        return values
+
+    @staticmethod
+    def _split_range(timeframe: Timeframe, time_range: TimeRange) -> tp.List[TimeRange]:
+        """ Consecutive chunks of candles_per_request candles, independent of each other. """
+        length = timeframe.to_seconds() * MarketDataDownloader._Config['candles_per_request']
+        return [TimeRange(from_ts, min(from_ts + length - 1, time_range.to_ts))
+                for from_ts in range(time_range.from_ts, time_range.to_ts + 1, length)]
+
+    @staticmethod
+    def _get_max_connections() -> int:
+        max_connections: int = MarketDataDownloader._Config.get('max_connections', 4)
+        return max_connections
+
+    @staticmethod
+    def _get_session() -> tp.Any:
+        """ Session shared by download threads, it keeps at most max_connections connections. """
+        if MarketDataDownloader._Session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            max_connections = MarketDataDownloader._get_max_connections()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections, pool_block=True)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            MarketDataDownloader._Session = session
+        return MarketDataDownloader._Session
+
+    @staticmethod
+    def _remember(asset_pair: AssetPair, timeframe: Timeframe,
+                  time_range: TimeRange, candles: tp.List[Candle]) -> None:
+        if MarketDataDownloader._MemorySize > 0:
+            MarketDataDownloader._Memory.append((str(asset_pair), str(timeframe), time_range, candles))
+            MarketDataDownloader.set_memory_cache_size(MarketDataDownloader._MemorySize)
+
+    @staticmethod
+    def _get_from_memory(asset_pair: AssetPair, timeframe: Timeframe,
+                         time_range: TimeRange) -> tp.Optional[tp.List[Candle]]:
+        memory = MarketDataDownloader._Memory
+        for i, (pair, frame, cached_range, candles) in enumerate(memory):
+            if pair == str(asset_pair) and frame == str(timeframe) and \
+                    cached_range.from_ts <= time_range.from_ts and \
+                    time_range.to_ts <= cached_range.to_ts:
+                memory.append(memory.pop(i))
+                timestamps = [candle.ts for candle in candles]
+                return candles[bisect.bisect_left(timestamps, time_range.from_ts):
+                               bisect.bisect_right(timestamps, time_range.to_ts)]
+        return None
 
     @staticmethod
     @retry(RuntimeError, tries=15, delay=3)
     def _load_candles_batch(asset_pair: AssetPair, timeframe: Timeframe,
                             time_range: TimeRange) -> tp.List[tp.Dict[str, tp.Any]]:
-        asset_pair_id = MarketDataDownloader._Exchange.markets[str(asset_pair)]['id']
-        response = requests.get(
+        asset_pair_id = MarketDataDownloader._get_market_id(asset_pair)
+        MarketDataDownloader._RateLimiter.acquire()
+        response = MarketDataDownloader._get_session().get(
             f'{MarketDataDownloader._Config["market_data_host"]}/v0/candles/{asset_pair_id}',
-            params={  # type: ignore
+            params={
                 'interval': timeframe.to_string(),
                 'timeStart': MarketDataDownloader._to_milliseconds(time_range.from_ts),
                 'timeEnd': MarketDataDownloader._to_milliseconds(time_range.to_ts),
@@ -75,20 +268,7 @@ class MarketDataDownloader:
     def _to_milliseconds(ts: int) -> int:
         return ts * 1000
 
-    @staticmethod
-    def _fill_gaps(candles: tp.List[Candle]) -> tp.List[Candle]:
-        while candles and candles[0].open is None:
-            candles = candles[1:]
-        for index in range(1, len(candles)):
-            if candles[index].open is None:
-                candles[index].open = candles[index - 1].close
-                candles[index].high = candles[index - 1].close
-                candles[index].low = candles[index - 1].close
-                candles[index].close = candles[index - 1].close
-                candles[index].volume = 0
-        return candles
-
     @staticmethod
     def get_orderbook(asset_pair: AssetPair, depth: int = 50) -> tp.Dict[str, tp.Any]:
-        return MarketDataDownloader._Exchange.fetch_order_book(symbol=str(asset_pair),
+        return MarketDataDownloader._get_exchange().fetch_order_book(symbol=str(asset_pair),
                                                                params={'depth': str(depth)})
@@ -43,8 +43,8 @@ class AdaptableGridStrategy(GridStrategy):  # type: ignore
                 self.__rel_diff(new_base, self.base_price) >  # type: ignore
                 self.threshold))
         if condition:
-            self.logger.info(f'Updating grid: new base price = {new_base}, '
-                             f'new interval = {new_interval}')
+            self.logger.info('Updating grid: new base price = %s, '
+                             'new interval = %s', new_base, new_interval)
             self.base_price = new_base
             self.interval = new_interval
             self.ts.cancel_all()
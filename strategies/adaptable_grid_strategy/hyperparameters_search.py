@@ -1,23 +1,17 @@
-import json
 import typing as tp
 from itertools import product
 from pathlib import Path
 
-from numpy import prod
 from rich.console import Console
 
 from base.config_parser import ConfigParser
 from market_data_api.market_data_downloader import MarketDataDownloader
-from strategies.strategy_runner import StrategyRunner
+from strategies.hyperparameter_search import SuccessiveHalvingSearch
+from strategies.result_cache import ResultCache
 from trading import TimeRange
 from trading_system.trading_statistics import TradingStatistics
 
 
-def generate_config(config: tp.Dict[str, tp.Any]) -> None:
-    with open('strategies/adaptable_grid_strategy/config.json', 'w') as f:
-        json.dump(config, f)
-
-
 def grid_generator(
         grids: tp.List[tp.Dict[str, tp.List[tp.Any]]]
         ) -> tp.Generator[tp.Dict[str, tp.Any], None, None]:
@@ -32,8 +26,10 @@ time_range = TimeRange.from_iso_format(
     from_ts='2020-10-01 00:00:00',
     to_ts='2021-05-09 00:00:00')
 base_config = ConfigParser.load_config(Path('configs/base.json'))
+base_config['strategy'] = {'name': 'AdaptableGridStrategy', 'dir': 'adaptable_grid_strategy'}
+base_config['trading_interface']['asset_pair'] = ['USDT', 'USDN']
+simulator_config = ConfigParser.load_config(Path('configs/simulator.json'))
 MarketDataDownloader.init(base_config['market_data_downloader'])
-strategy_runner = StrategyRunner(base_config=base_config)
 console = Console()
 
 fee = 0.1
@@ -52,25 +48,28 @@ param_grids: tp.List[tp.Dict[str, tp.List[tp.Any]]] = [{
   'timeout_only': [True],
   'handle_filled_orders': [True, False]
 }]
-total = sum(prod(list(
-    map(len, param_grid.values()))) for param_grid in param_grids)
-best_profit = float('-inf')
-best_stats: tp.Optional[TradingStatistics] = None
-best_params: tp.Dict[str, tp.List[tp.Any]] = {}
 
-for i, params_dict in enumerate(grid_generator(param_grids)):
-    generate_config(params_dict)
-    stats = strategy_runner.run_strategy(time_range=time_range)
-    profit = stats.calc_absolute_delta() - fee * stats.filled_order_count
-    console.print(f'Checked {i + 1} out of {total}')
-    if profit > best_profit:
-        best_profit = profit
-        best_stats = stats
-        best_params = params_dict
 
-color = 'green' if best_profit > 0 else 'red'
+def profit_with_fee(stats: TradingStatistics) -> float:
+    return stats.calc_absolute_delta() - fee * stats.filled_order_count
+
+
+search = SuccessiveHalvingSearch(
+    base_config=base_config,
+    simulator_config=simulator_config,
+    time_range=time_range,
+    min_range=14 * 24 * 60 * 60,
+    score=profit_with_fee,
+    result_cache=ResultCache(Path('cache/results')))
+result = search.run(list(grid_generator(param_grids)))
+
+for rung in result.rungs:
+    console.print(f'{rung.time_range}: checked {len(rung.scores)} candidates')
+console.print(f'Simulated {result.simulated_time / result.grid_simulated_time:.0%} '
+              f'of the full grid search time')
+color = 'green' if result.best_score > 0 else 'red'
 console.print('[bold]Optimal parameters:[/bold]')
-console.print(best_params)
+console.print(result.best_config)
 console.print(
-    f'[bold]Profit (including fee): [{color}]{best_profit:.1f}[/{color}] '
-    f'{best_stats.price_asset}[/bold]')
+    f'[bold]Profit (including fee): [{color}]{result.best_score:.1f}[/{color}] '
+    f'{result.best_stats.price_asset}[/bold]')
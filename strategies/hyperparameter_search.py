@@ -0,0 +1,146 @@
+"""
+Successive halving search of strategy parameters.
+
+All candidates are simulated on a short prefix of the time range,
+the best keep_fraction of them are simulated again on a range
+1 / keep_fraction times longer, and so on up to the full range.
+Most hopeless candidates are dropped after a few cheap runs.
+"""
+import math
+import typing as tp
+
+from helpers.typing.common_types import Config, ConfigsScope
+from strategies.result_cache import ResultCache
+from strategies.strategy_runner import StrategyRunner
+from strategies.worker_pool import WorkerPool
+from trading import TimeRange
+from trading_system.trading_statistics import TradingStatistics
+
+ScoreT = tp.Callable[[TradingStatistics], float]
+
+
+def run_candidate(base_config: ConfigsScope, simulator_config: Config,
+                  strategy_config: Config, time_range: TimeRange,
+                  result_cache: tp.Optional[ResultCache] = None) -> TradingStatistics:
+    runner = StrategyRunner(base_config=base_config,
+                            simulator_config=simulator_config,
+                            exchange_config={},
+                            headless=True,
+                            strategy_config=strategy_config,
+                            result_cache=result_cache)
+    return runner.run_simulation(time_range=time_range)
+
+
+class Rung(tp.NamedTuple):
+    time_range: TimeRange
+    # Candidate index and its score, best first
+    scores: tp.List[tp.Tuple[int, float]]
+
+
+class SearchResult(tp.NamedTuple):
+    best_config: Config
+    best_score: float
+    best_stats: TradingStatistics
+    rungs: tp.List[Rung]
+    # Simulated time of all runs and of a full grid search, in seconds
+    simulated_time: int
+    grid_simulated_time: int
+
+
+class SuccessiveHalvingSearch:
+    def __init__(self,
+                 base_config: ConfigsScope,
+                 simulator_config: Config,
+                 time_range: TimeRange,
+                 min_range: int,
+                 keep_fraction: float = 0.5,
+                 score: tp.Optional[ScoreT] = None,
+                 processes: int = 4,
+                 result_cache: tp.Optional[ResultCache] = None):
+        """
+        min_range is the length of the first rung in seconds.
+        score defaults to the absolute delta of balance, higher is better.
+        With processes <= 1 candidates run in the current process,
+        otherwise in a worker pool kept for all rungs.
+        Runs are stored in result_cache as soon as they finish,
+        so an interrupted search resumes from them.
+        """
+        if not 0 < keep_fraction < 1:
+            raise ValueError('keep_fraction must be in (0, 1)')
+        self.base_config = base_config
+        self.simulator_config = simulator_config
+        self.time_range = time_range
+        self.min_range = min(min_range, time_range.get_range())
+        self.keep_fraction = keep_fraction
+        self.score: ScoreT = score if score is not None else \
+            TradingStatistics.calc_absolute_delta
+        self.processes = processes
+        self.result_cache = result_cache
+        self._pool: tp.Optional[WorkerPool] = None
+
+    def get_rung_ranges(self) -> tp.List[TimeRange]:
+        """ Prefixes of the time range growing 1 / keep_fraction times, the last one is full. """
+        ranges = []
+        length = float(self.min_range)
+        while length < self.time_range.get_range():
+            ranges.append(TimeRange(self.time_range.from_ts,
+                                    self.time_range.from_ts + int(length)))
+            length /= self.keep_fraction
+        ranges.append(self.time_range)
+        return ranges
+
+    def run(self, candidates: tp.List[Config]) -> SearchResult:
+        if not candidates:
+            raise ValueError('no candidates')
+        if self.processes > 1:
+            # Candidates of a rung share the range, spreading them evenly matters more
+            self._pool = WorkerPool(self.base_config, self.simulator_config,
+                                    processes=self.processes, max_imbalance=0,
+                                    result_cache=self.result_cache)
+        try:
+            return self._run(candidates)
+        finally:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool = None
+
+    def _run(self, candidates: tp.List[Config]) -> SearchResult:
+        survivors = list(range(len(candidates)))
+        rungs: tp.List[Rung] = []
+        simulated_time = 0
+        rung_ranges = self.get_rung_ranges()
+        for time_range in rung_ranges:
+            if len(survivors) == 1:
+                # Nothing to compare, only the full run is left
+                time_range = rung_ranges[-1]
+            stats = self._evaluate([candidates[i] for i in survivors], time_range)
+            simulated_time += len(survivors) * time_range.get_range()
+            scores = sorted(((i, self.score(s)) for i, s in zip(survivors, stats)),
+                            key=lambda item: item[1], reverse=True)
+            rungs.append(Rung(time_range, scores))
+            if time_range is rung_ranges[-1]:
+                best_id, best_score = scores[0]
+                return SearchResult(
+                    best_config=candidates[best_id],
+                    best_score=best_score,
+                    best_stats=stats[survivors.index(best_id)],
+                    rungs=rungs,
+                    simulated_time=simulated_time,
+                    grid_simulated_time=len(candidates) * self.time_range.get_range())
+            keep = max(1, math.ceil(len(survivors) * self.keep_fraction))
+            survivors = [i for i, _ in scores[:keep]]
+        raise AssertionError('the last rung covers the full range')
+
+    def _evaluate(self, configs: tp.List[Config],
+                  time_range: TimeRange) -> tp.List[TradingStatistics]:
+        if self._pool is None:
+            return [run_candidate(self.base_config, self.simulator_config,
+                                  config, time_range, self.result_cache) for config in configs]
+        results: tp.List[tp.Optional[TradingStatistics]] = [None] * len(configs)
+        task_indices = {self._pool.submit(time_range, config): i for i, config in enumerate(configs)}
+        for _ in configs:
+            task_id, stats = self._pool.get_result()
+            if stats is None:
+                raise RuntimeError(f'Simulation of {configs[task_indices[task_id]]} failed')
+            results[task_indices[task_id]] = stats
+        return [tp.cast(TradingStatistics, stats) for stats in results]
@@ -0,0 +1,153 @@
+import typing as tp
+from os import getpid
+from pathlib import Path
+
+from helpers.typing.common_types import Config, ConfigsScope
+from logger.logger import Logger
+
+from trading_interface.simulator.simulator import Simulator
+
+from trading_system.trading_system import Handlers, TradingSystem
+from trading_system.trading_statistics import TradingStatistics
+
+from trading_signal_detectors.trading_signal_detector import TradingSignalDetector
+
+from strategies.strategy_base import StrategyBase
+from strategies.strategy_runner import StrategyRunner
+
+from trading import Signal, Timeframe, Timestamp, TimeRange
+
+
+class PortfolioMember:
+    """ Strategy of a portfolio with its own trading system, so its own wallet and statistics. """
+
+    def __init__(self, label: str, strategy: StrategyBase, trading_system: TradingSystem):
+        self.label = label
+        self.strategy = strategy
+        self.ts = trading_system
+        self.strategy.init_trading(trading_system)
+        self.signal_detectors: tp.List[TradingSignalDetector] = \
+            self.strategy.get_signal_detectors() + [trading_system]  # type: ignore
+
+    def do_trading_iteration(self) -> None:
+        self.ts.update()
+        signals: tp.List[Signal] = []
+        for detector in self.signal_detectors:
+            signals += detector.get_trading_signals()
+        for signal in signals:
+            self.strategy.__getattribute__(f'handle_{signal.name}_signal')(signal.content)
+        self.strategy.update()
+
+
+class PortfolioRunner:
+    """
+    Simulates several strategies on one Simulator. Handlers are shared by the strategies,
+    a handler required by several of them is created and updated once per tick.
+    """
+
+    def __init__(self,
+                 base_config: ConfigsScope,
+                 simulator_config: Config,
+                 strategies: tp.List[Config],
+                 headless: tp.Optional[bool] = None):
+        """
+        strategies are sections like the strategy one of the base config with optional
+        label (the name by default, labels are unique), config replacing config.json
+        of the strategy and wallet. Without a wallet the strategy gets an equal share
+        of the trading system wallet.
+        """
+        self.base_config = base_config
+        self.simulator_config = simulator_config
+        self.strategies = strategies
+        self.labels: tp.List[str] = [strategy['label'] if 'label' in strategy else strategy['name']
+                                     for strategy in strategies]
+        if len(set(self.labels)) != len(self.labels):
+            raise ValueError(f'Strategy labels are not unique: {self.labels}')
+        self._headless: bool = headless if headless is not None else \
+            self.base_config['strategy_runner'].get('headless', False)
+        self.logger = Logger(f"PortfolioRunner{getpid()}",
+                             config=self.base_config['strategy_runner']['logger'])
+        self.handlers: tp.Optional[Handlers] = None
+        self.members: tp.List[PortfolioMember] = []
+
+    def run_simulation(
+            self,
+            time_range: TimeRange,
+            logs_path: tp.Optional[Path] = None,
+            pretty_print: bool = True) -> tp.Dict[str, TradingStatistics]:
+        """ Statistics of every strategy by its label, loggers are headless for the duration of the run. """
+        headless = Logger.is_headless()
+        Logger.set_headless(self._headless)
+        try:
+            return self._run_simulation(time_range, logs_path, pretty_print)
+        finally:
+            Logger.set_headless(headless)
+
+    def _run_simulation(self, time_range: TimeRange, logs_path: tp.Optional[Path],
+                        pretty_print: bool) -> tp.Dict[str, TradingStatistics]:
+        Logger.set_log_file_name(Timestamp.to_iso_format(time_range.from_ts))
+        if logs_path is not None:
+            Logger.set_logs_path(logs_path)
+        Logger.start_run()
+
+        ti = Simulator(
+            time_range=time_range,
+            trading_config=self.base_config['trading_interface'],
+            exchange_config=self.simulator_config)
+        Logger.set_clock(ti.get_clock())
+        self._init_trading(ti)
+
+        self.logger.info("Portfolio simulation started")
+        active = list(self.members)
+        while active and ti.is_alive():
+            self.handlers.update_handlers()  # type: ignore
+            for member in active:
+                member.do_trading_iteration()
+            for member in [member for member in active if member.ts.is_aborted()]:
+                self.logger.info("Simulation of %s pruned at %s", member.label,
+                                 Timestamp.to_iso_format(ti.get_timestamp()))
+                member.ts.stop_trading()
+                active.remove(member)
+
+        for member in active:
+            member.ts.stop_trading()
+        ti.stop_trading()
+        self.handlers.update_handlers()  # type: ignore
+        for member in active:
+            member.ts.update()
+
+        results = {member.label: member.ts.get_trading_statistics() for member in self.members}
+        Logger.store_log()
+        Logger.end_run()
+        self._print_statistics(results, pretty_print)
+        return results
+
+    def _init_trading(self, ti: Simulator) -> None:
+        self.handlers = Handlers()
+        self.members = []
+        trading_system_config = self.base_config['trading_system']
+        shared_wallet = {asset: amount / len(self.strategies)
+                         for asset, amount in trading_system_config['wallet'].items()}
+        for label, strategy in zip(self.labels, self.strategies):
+            trading_system = TradingSystem(
+                trading_interface=ti,
+                config={**trading_system_config, 'wallet': strategy.get('wallet', shared_wallet)},
+                timeframe=Timeframe(self.base_config['trading_interface']['timeframe']),
+                handlers=self.handlers)
+            strategy_config = strategy['config'] if 'config' in strategy else \
+                StrategyRunner.load_strategy_config(strategy)
+            self.members.append(PortfolioMember(
+                label,
+                StrategyRunner.create_strategy(strategy, strategy_config),
+                trading_system))
+
+    def _print_statistics(self, results: tp.Dict[str, TradingStatistics],
+                          pretty_print: bool) -> None:
+        if self._headless:
+            return
+        for label, stats in results.items():
+            print(label)
+            if pretty_print:
+                stats.pretty_print()
+            else:
+                print(stats)
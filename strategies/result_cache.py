@@ -0,0 +1,139 @@
+"""
+Content-addressed cache of simulation results.
+
+A result is keyed by a hash of everything it depends on: strategy name, its config
+and source code, source code of the trading, trading system, trading interface
+and signal detector packages, trading system, trading interface and simulator
+configs, time range, candles and whether the run writes an event log.
+An entry is a directory with pickled statistics and, if the run wrote one, its event log.
+"""
+import functools
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import typing as tp
+from pathlib import Path
+from uuid import uuid4
+
+import numpy as np
+
+from helpers.typing.common_types import Config, ConfigsScope
+from trading import Candle, TimeRange
+from trading_system.trading_statistics import TradingStatistics
+
+STATS_FILE = 'stats.pickle'
+EVENT_LOG_FILE = 'events.dump'
+SOURCE_ROOT = Path(__file__).parents[1]
+# Packages simulation results depend on besides the strategy
+SIMULATION_PACKAGES = ['trading', 'trading_system', 'trading_interface', 'trading_signal_detectors']
+
+
+def get_candles_digest(candles: tp.List[Candle]) -> str:
+    values = np.array([(c.ts, c.open, c.close, c.low, c.high, c.volume) for c in candles],
+                      dtype=np.float64)
+    return hashlib.sha256(values.tobytes()).hexdigest()
+
+
+def get_source_digest(directory: Path) -> str:
+    digest = hashlib.sha256()
+    for path in sorted(directory.rglob('*.py')):
+        digest.update(str(path.relative_to(directory)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=1)
+def get_code_digest() -> str:
+    """ Digest of SIMULATION_PACKAGES, computed once per process. """
+    digest = hashlib.sha256()
+    for package in SIMULATION_PACKAGES:
+        digest.update(get_source_digest(SOURCE_ROOT / package).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """ Least recently used entries are evicted when the total size exceeds max_size bytes. """
+
+    def __init__(self, path: Path, max_size: int = 512 * 1024 * 1024):
+        self.path = path
+        self.max_size = max_size
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def get_key(base_config: ConfigsScope, simulator_config: Config,
+                strategy_config: Config, time_range: TimeRange,
+                candles: tp.List[Candle], event_log: bool = False) -> str:
+        """ event_log tells whether the run writes an event log, headless runs do not. """
+        strategy_dir = SOURCE_ROOT / 'strategies' / base_config['strategy']['dir']
+        description = json.dumps({
+            'strategy': base_config['strategy'],
+            'strategy_config': strategy_config,
+            'strategy_source': get_source_digest(strategy_dir),
+            'code': get_code_digest(),
+            'event_log': event_log,
+            'trading_system': base_config['trading_system'],
+            'trading_interface': {key: base_config['trading_interface'][key]
+                                  for key in ('asset_pair', 'asset_pairs', 'timeframe')
+                                  if key in base_config['trading_interface']},
+            'simulator': simulator_config,
+            'time_range': [time_range.from_ts, time_range.to_ts],
+            'candles': get_candles_digest(candles),
+        }, sort_keys=True)
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def get(self, key: str) -> tp.Optional[tp.Tuple[TradingStatistics, tp.Optional[Path]]]:
+        """ Statistics and path of the cached event log, if there is one. """
+        entry = self.path / key
+        try:
+            with open(entry / STATS_FILE, 'rb') as f:
+                stats: TradingStatistics = pickle.load(f)
+            # Modification time orders entries for eviction
+            os.utime(entry)
+        except FileNotFoundError:
+            return None
+        event_log = entry / EVENT_LOG_FILE
+        return stats, event_log if event_log.exists() else None
+
+    def put(self, key: str, stats: TradingStatistics,
+            event_log: tp.Optional[Path] = None) -> None:
+        # Entries are built aside and renamed, so concurrent runs never see a partial one
+        tmp_entry = self.path / f'.{key}.{uuid4().hex}'
+        tmp_entry.mkdir()
+        with open(tmp_entry / STATS_FILE, 'wb') as f:
+            pickle.dump(stats, f, protocol=pickle.HIGHEST_PROTOCOL)
+        if event_log is not None and event_log.exists():
+            shutil.copyfile(event_log, tmp_entry / EVENT_LOG_FILE)
+        try:
+            tmp_entry.rename(self.path / key)
+        except OSError:
+            # Stored by another run meanwhile
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+        self.evict()
+
+    def get_size(self) -> int:
+        return sum(size for _, _, size in self._get_entries())
+
+    def evict(self) -> None:
+        entries = sorted(self._get_entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        for entry, _, size in entries:
+            if total <= self.max_size:
+                return
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def _get_entries(self) -> tp.List[tp.Tuple[Path, float, int]]:
+        """ Path, last use time and size of every complete entry. """
+        entries = []
+        for entry in self.path.iterdir():
+            if entry.name.startswith('.') or not entry.is_dir():
+                continue
+            try:
+                size = sum(f.stat().st_size for f in entry.iterdir())
+                entries.append((entry, entry.stat().st_mtime, size))
+            except FileNotFoundError:
+                # Evicted by another run
+                continue
+        return entries
@@ -63,7 +63,7 @@ class RSIMACDStrategy(StrategyBase):
         self.received_new_signal = False
 
     def handle_moving_average_cd_signal(self, trend: Signal) -> None:
-        self.logger.info(f'Strategy received MACD signal of type {trend}')
+        self.logger.info('Strategy received MACD signal of type %s', trend)
         self.received_new_signal = True
 
         if trend == TrendType.UPTREND:
@@ -72,7 +72,7 @@ class RSIMACDStrategy(StrategyBase):
             self.last_macd_downtrend_ts = self.ts.get_timestamp()
 
     def handle_relative_strength_index_signal(self, signal: RSISignal) -> None:
-        self.logger.info(f'Strategy received RSI signal of type {signal.type}.')
+        self.logger.info('Strategy received RSI signal of type %s.', signal.type)
         self.received_new_signal = True
         self.last_rsi_value = signal.value
         if signal.type == RSISignalType.OVERSOLD:
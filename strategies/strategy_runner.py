@@ -1,18 +1,18 @@
 import importlib
-import multiprocessing as mp
-import traceback as tb
+import shutil
 import typing as tp
+from contextlib import nullcontext
 from pathlib import Path
 from time import sleep, time
 from os import getpid
 
+from helpers.profiler import Profiler
 from helpers.typing.common_types import Config, ConfigsScope
 from logger.logger import Logger
 from base.config_parser import ConfigParser
 
 from trading_interface.trading_interface import TradingInterface
 from trading_interface.simulator.simulator import Simulator
-from trading_interface.waves_exchange.waves_exchange_interface import WAVESExchangeInterface
 
 from trading_system.trading_system import TradingSystem
 from trading_system.trading_statistics import TradingStatistics
@@ -24,20 +24,39 @@ from trading_signal_detectors.moving_average.moving_average_signal_detector \
     import MovingAverageSignalDetector
 
 from strategies.strategy_base import StrategyBase
+from strategies.result_cache import ResultCache
+from strategies.worker_pool import WorkerPool
 
 from logger.logger import Logger
 
-from trading import Timestamp, TimeRange, Signal
+from trading import Timestamp, TimeRange, Signal, Timeframe
 
 
 class StrategyRunner:
     def __init__(self,
                  base_config: ConfigsScope,
                  simulator_config: Config,
-                 exchange_config: Config):
+                 exchange_config: Config,
+                 headless: tp.Optional[bool] = None,
+                 strategy_config: tp.Optional[Config] = None,
+                 result_cache: tp.Optional[ResultCache] = None,
+                 profile: tp.Optional[bool] = None):
+        """
+        In headless mode loggers are no-ops during runs, no events are stored
+        for visualizer and nothing is printed, runs only return statistics.
+        strategy_config replaces config.json of the strategy, e.g. in a parameter search.
+        With result_cache simulations with the same configs, candles and strategy code
+        are not repeated, their statistics and event log are taken from the cache.
+        With profile calls of handlers, signal detectors, strategy and trading interface
+        are timed, the profile is attached to statistics of the run.
+        """
         self.base_config = base_config
         self.simulator_config = simulator_config
         self.exchange_config = exchange_config
+        self.strategy_config = strategy_config
+        self.result_cache = result_cache
+        self._headless: bool = headless if headless is not None else \
+            self.base_config['strategy_runner'].get('headless', False)
         self.logger = Logger(f"Runner{getpid()}",
                              config=self.base_config['strategy_runner']['logger'])
         self._ti: tp.Optional[TradingInterface] = None
@@ -46,55 +65,117 @@ class StrategyRunner:
         self._signal_detectors: tp.List[TradingSignalDetector] = []
         self._stdout_frequency = self.base_config['strategy_runner']['stdout_frequency']
         self._between_iteration_pause = self.base_config['strategy_runner']['between_iteration_pause']
+        self._profile: bool = profile if profile is not None else \
+            self.base_config['strategy_runner'].get('profile', False)
+        self._profiler: tp.Optional[Profiler] = None
+
+    @staticmethod
+    def create_strategy(strategy: Config, strategy_config: Config) -> tp.Any:
+        """ strategy is a section like the strategy one of the base config, with name and dir. """
+        module_path = 'strategies' + ('.' + strategy["dir"]) * 2
+        module = importlib.import_module(module_path)
+        strategy_class = module.__getattribute__(strategy["name"])
+        return strategy_class(config=strategy_config)
+
+    @staticmethod
+    def load_strategy_config(strategy: Config) -> Config:
+        path = 'strategies/' + strategy["dir"] + '/config.json'
+        return ConfigParser.load_config(Path(path))
 
     def _get_strategy_instance(self) -> tp.Any:
-        module_path = 'strategies' + ('.' + self.base_config["strategy"]["dir"]) * 2
-        module = importlib.import_module(module_path)
-        strategy_class = module.__getattribute__(self.base_config["strategy"]["name"])
-        path = 'strategies/' + self.base_config["strategy"]["dir"] + '/config.json'
-        config = ConfigParser.load_config(Path(path))
-        strategy_instance = strategy_class(config=config)
-        return strategy_instance
+        return self.create_strategy(self.base_config["strategy"], self._get_strategy_config())
+
+    def _get_strategy_config(self) -> Config:
+        if self.strategy_config is not None:
+            return self.strategy_config
+        return self.load_strategy_config(self.base_config["strategy"])
 
     def run_simulation(
             self,
             time_range: TimeRange,
             logs_path: tp.Optional[Path] = None,
             pretty_print: bool = True) -> TradingStatistics:
-        assert self._ti is not None
-
-        def get_progress() -> float:
-            return (min(self._ti.get_timestamp(),  # type: ignore
-                        time_range.to_ts) - time_range.from_ts)\
-                   / time_range.get_range() * 100
-
+        """ Loggers are headless for the duration of the run in headless mode. """
+        headless = Logger.is_headless()
+        Logger.set_headless(self._headless)
+        try:
+            return self._run_simulation(time_range, logs_path, pretty_print)
+        finally:
+            Logger.set_headless(headless)
+
+    def _run_simulation(self, time_range: TimeRange, logs_path: tp.Optional[Path],
+                        pretty_print: bool) -> TradingStatistics:
         Logger.set_log_file_name(Timestamp.to_iso_format(time_range.from_ts))
         if logs_path is not None:
             Logger.set_logs_path(logs_path)
+        Logger.start_run()
 
         self._ti = Simulator(
             time_range=time_range,
             trading_config=self.base_config['trading_interface'],
             exchange_config=self.simulator_config
         )
-        Logger.set_clock(self._ti.get_clock())  # type: ignore
 
+        cache_key: tp.Optional[str] = None
+        if self.result_cache is not None:
+            cache_key = ResultCache.get_key(
+                self.base_config, self.simulator_config, self._get_strategy_config(),
+                time_range, [candle for market in self._ti.markets.values()
+                             for candle in market.candles],
+                event_log=not self._headless)
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                return self._use_cached_result(*cached, pretty_print)
+
+        Logger.set_clock(self._ti.get_clock())  # type: ignore
         self._init_trading()
+        stats = self._simulate(time_range, pretty_print)
+
+        if self.result_cache is not None and cache_key is not None:
+            self.result_cache.put(cache_key, stats, None if self._headless else
+                                  Logger.create_log_file('dump', 'dump'))
+        return stats
+
+    def _simulate(self, time_range: TimeRange, pretty_print: bool) -> TradingStatistics:
+        def get_progress() -> float:
+            return (min(self._ti.get_timestamp(),  # type: ignore
+                        time_range.to_ts) - time_range.from_ts)\
+                   / time_range.get_range() * 100
 
-        last_checkpoint = 0
         self.logger.info("Simulation started")
-        while self._ti.is_alive():  # type: ignore
+        if self._headless:
+            while self._ti.is_alive() and not self._ts.is_aborted():  # type: ignore
+                self._do_trading_iteration()
+            return self._stop_trading(pretty_print)
+
+        last_checkpoint = 0
+        while self._ti.is_alive() and not self._ts.is_aborted():  # type: ignore
             current_checkpoint = get_progress() // self._stdout_frequency * self._stdout_frequency
             if current_checkpoint != last_checkpoint:
                 last_checkpoint = current_checkpoint
-                self.logger.info(f"{last_checkpoint}% of simulation passed."
-                                 f" Simulation time: "
-                                 f"{Timestamp.to_iso_format(self._ti.get_timestamp())}")  # type: ignore
+                self.logger.info("%s%% of simulation passed. Simulation time: %s",
+                                 last_checkpoint,
+                                 Timestamp.to_iso_format(self._ti.get_timestamp()))  # type: ignore
 
             self._do_trading_iteration()
 
+        if self._ts.is_aborted():  # type: ignore
+            self.logger.info("Simulation pruned at %s",
+                             Timestamp.to_iso_format(self._ti.get_timestamp()))  # type: ignore
         return self._stop_trading(pretty_print)
 
+    def _use_cached_result(self, stats: TradingStatistics,
+                           event_log: tp.Optional[Path],
+                           pretty_print: bool) -> TradingStatistics:
+        self.logger.info("Simulation result is taken from the cache")
+        # Profile of the run which stored the result
+        stats.profile = None
+        if event_log is not None and not self._headless:
+            shutil.copyfile(event_log, Logger.create_log_file('dump', 'dump'))
+        Logger.end_run()
+        self._print_statistics(stats, pretty_print)
+        return stats
+
     def run_simulation_on_periods(
             self,
             time_range: TimeRange,
@@ -103,8 +184,12 @@ class StrategyRunner:
             visualize: bool = False,
             processes: int = 4,
             logs_path: tp.Optional[Path] = None,
-            pretty_print: bool = True) -> TradingStatistics:
-
+            pretty_print: bool = True,
+            worker_pool: tp.Optional[WorkerPool] = None) -> TradingStatistics:
+        """
+        Periods are simulated by worker_pool, which stays warm for later calls,
+        or by a pool of the given number of processes created for this call.
+        """
         if period is None and runs is None:
             raise ValueError('Run type not selected')
 
@@ -113,31 +198,28 @@ class StrategyRunner:
         runs = runs if runs is not None else \
             time_range.get_range() // period
 
-        pool = mp.Pool(processes=processes, maxtasksperchild=1)
-        current_ts = time_range.from_ts
-        run_results: tp.List[TradingStatistics] = []
-
-        for run_id in range(runs):
-            next_ts = current_ts + period
-            pool.apply_async(
-                self.run_simulation,
-                kwds={
-                    'time_range': TimeRange(current_ts, next_ts),
-                    'logs_path': logs_path},
-                callback=lambda run_result: run_results.append(run_result),
-                error_callback=lambda e: tb.print_exception(type(e), e, None))
-            current_ts = next_ts
-
-        pool.close()
-        pool.join()
-        stats = TradingStatistics.merge(run_results)
-        if pretty_print:
-            stats.pretty_print()
-        else:
-            print(stats)
+        time_ranges = [TimeRange(time_range.from_ts + run_id * period,
+                                 time_range.from_ts + (run_id + 1) * period)
+                       for run_id in range(runs)]
+        pool_context: tp.ContextManager[WorkerPool] = nullcontext(worker_pool) \
+            if worker_pool is not None else \
+            WorkerPool(self.base_config, self.simulator_config,
+                       processes=processes, headless=self._headless,
+                       result_cache=self.result_cache, profile=self._profile)
+        with pool_context as pool:
+            # Workers fold their runs into accumulators, only those are sent back
+            for period_range in time_ranges:
+                pool.submit(period_range, self.strategy_config, logs_path, accumulate=True)
+            accumulator = pool.collect_accumulated()
+            self.logger.info('Worker pool metrics: %s', pool.get_metrics())
+
+        stats = accumulator.get_statistics()
+        self._print_statistics(stats, pretty_print)
+        if not self._headless:
+            print(accumulator.table)
 
         if visualize:
-            TradingStatistics.visualize(run_results)
+            accumulator.table.visualize()
 
         return stats
 
@@ -145,11 +227,16 @@ class StrategyRunner:
             self,
             logs_path: tp.Optional[Path] = None,
             pretty_print: bool = True) -> TradingStatistics:
+        # Imported here, simulations do not need the exchange client and its dependencies
+        from trading_interface.waves_exchange.waves_exchange_interface import WAVESExchangeInterface
 
         # TODO: don't use time()
         Logger.set_log_file_name(Timestamp.to_iso_format(int(time())))
         if logs_path is not None:
             Logger.set_logs_path(logs_path)
+        # Writing logs must not delay reaction to the market
+        Logger.start_run(async_output=True,
+                         **self.base_config['strategy_runner'].get('async_log_writer', {}))
 
         self._ti = WAVESExchangeInterface(
             trading_config=self.base_config['trading_interface'],
@@ -162,17 +249,37 @@ class StrategyRunner:
             self._do_trading_iteration()
             sleep(self._between_iteration_pause)
 
+        self.logger.info('Log writer metrics: %s', Logger.get_async_writer_metrics())
         return self._stop_trading(pretty_print)
 
     def _init_trading(self) -> None:
         self._ts = TradingSystem(
             trading_interface=self._ti,  # type: ignore
-            config=self.base_config['trading_system'])
+            config=self.base_config['trading_system'],
+            timeframe=Timeframe(self.base_config['trading_interface']['timeframe']))
 
         self._strategy_inst = self._get_strategy_instance()
         self._strategy_inst.init_trading(self._ts)  # type: ignore
         self._signal_detectors = self._strategy_inst.get_signal_detectors()  # type: ignore
         self._signal_detectors.append(self._ts)  # type: ignore
+        self._profiler = Profiler() if self._profile else None
+        if self._profiler is not None:
+            self._instrument(self._profiler)
+
+    def _instrument(self, profiler: Profiler) -> None:
+        """ Handlers added after the strategy initialization are not timed. """
+        for name in vars(TradingInterface):
+            if not name.startswith('_'):
+                profiler.wrap_method(self._ti, name, f'interface:{name}')
+        profiler.wrap_method(self._ts, 'update', 'trading_system:update')
+        for name, handler in self._ts.handlers.items():  # type: ignore
+            profiler.wrap_method(handler, 'update', f'handler:{name}')
+        for detector in self._signal_detectors:
+            profiler.wrap_method(detector, 'get_trading_signals',
+                                 f'detector:{type(detector).__name__}')
+        for name in dir(self._strategy_inst):
+            if name == 'update' or name.startswith('handle_') and name.endswith('_signal'):
+                profiler.wrap_method(self._strategy_inst, name, f'strategy:{name}')
 
     def _do_trading_iteration(self) -> None:
         self._ts.update()  # type: ignore
@@ -190,10 +297,21 @@ class StrategyRunner:
         self._ts.update()  # type: ignore
 
         stats = self._ts.get_trading_statistics()  # type: ignore
+        stats.profile = self._profiler
         Logger.store_log()
+        Logger.end_run()
+        self._print_statistics(stats, pretty_print)
+        return stats
+
+    def _print_statistics(self, stats: TradingStatistics,
+                          pretty_print: bool) -> None:
+        if self._headless:
+            return
         if pretty_print:
             stats.pretty_print()
+            if stats.profile is not None:
+                stats.profile.pretty_print()
         else:
             print(stats)
-
-        return stats
+            if stats.profile is not None:
+                print(stats.profile)
@@ -45,7 +45,7 @@ class TrendStrategy(StrategyBase):
 
     def handle_new_trend_signal(self, trend: Trend) -> None:
         assert self.ts is not None
-        self.logger.info(f'Strategy received trend of type {trend.trend_type}')
+        self.logger.info('Strategy received trend of type %s', trend.trend_type)
 
         if self.order_balance > 3:
             return
@@ -0,0 +1,310 @@
+"""
+Long-lived pool of simulation workers.
+
+Workers import heavy modules and load market data once at start and serve
+many simulations, a task carries only its time range and strategy config.
+Tasks of the same asset pair and time range go to the same worker,
+whose candles are already in memory, unless it is much busier than others.
+Statistics of accumulated tasks stay in workers, which send back one compact
+StatisticsAccumulator each.
+"""
+import collections
+import importlib
+import multiprocessing as mp
+import queue
+import traceback as tb
+import typing as tp
+from pathlib import Path
+from time import perf_counter
+
+from helpers.typing.common_types import Config, ConfigsScope
+from logger.logger import Logger
+from market_data_api.market_data_downloader import MarketDataDownloader
+from strategies.result_cache import ResultCache
+from trading import AssetPair, Timeframe, TimeRange
+from trading_system.trading_statistics import StatisticsAccumulator, TradingStatistics
+
+PRELOAD_MODULES = ['ccxt', 'pandas', 'plotly.graph_objects', 'rich.console', 'sklearn.linear_model']
+
+# Time range, strategy config, logs path
+TaskT = tp.Tuple[TimeRange, tp.Optional[Config], tp.Optional[Path]]
+AffinityKeyT = tp.Tuple[str, int, int]
+# Task id, task, whether its statistics are accumulated by the worker.
+# FLUSH asks a worker for its accumulator, None stops it
+WorkerMessageT = tp.Union[None, str, tp.Tuple[int, TaskT, bool]]
+FLUSH = 'flush'
+ResultT = tp.Tuple[int, tp.Optional[TradingStatistics]]
+
+
+def _import_modules(modules: tp.List[str]) -> None:
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+
+
+def _worker_main(worker_id: int,
+                 tasks: 'mp.Queue[WorkerMessageT]',
+                 results: 'mp.Queue[tp.Tuple[tp.Any, ...]]',
+                 base_config: ConfigsScope,
+                 simulator_config: Config,
+                 headless: bool,
+                 preload_modules: tp.List[str],
+                 preload_candles: tp.List[tp.Tuple[AssetPair, Timeframe, TimeRange]],
+                 market_data_config: tp.Optional[Config],
+                 memory_cache_size: int,
+                 result_cache: tp.Optional[ResultCache],
+                 profile: tp.Optional[bool]) -> None:
+    # Imported here, the runner itself uses the pool
+    from strategies.strategy_runner import StrategyRunner
+
+    _import_modules(preload_modules)
+    if market_data_config is not None:
+        MarketDataDownloader.init(market_data_config)
+    MarketDataDownloader.set_memory_cache_size(memory_cache_size)
+    for asset_pair, timeframe, time_range in preload_candles:
+        MarketDataDownloader.get_candles(asset_pair, timeframe, time_range)
+    results.put(('ready', worker_id, perf_counter()))
+
+    accumulator = StatisticsAccumulator()
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        if isinstance(task, str):
+            accumulator.shrink()
+            results.put(('accumulator', worker_id, accumulator))
+            accumulator = StatisticsAccumulator()
+            continue
+        task_id, (time_range, strategy_config, logs_path), accumulate = task
+        results.put(('started', worker_id, task_id))
+        start = perf_counter()
+        stats: tp.Optional[TradingStatistics] = None
+        error: tp.Optional[str] = None
+        try:
+            runner = StrategyRunner(base_config=base_config,
+                                    simulator_config=simulator_config,
+                                    exchange_config={},
+                                    headless=headless,
+                                    strategy_config=strategy_config,
+                                    result_cache=result_cache,
+                                    profile=profile)
+            stats = runner.run_simulation(time_range=time_range, logs_path=logs_path)
+        except Exception:
+            error = tb.format_exc()
+        if accumulate and stats is not None:
+            accumulator.add(stats)
+            stats = None
+        results.put(('done', worker_id, task_id, perf_counter() - start, stats, error))
+
+
+class _Worker:
+    def __init__(self, process: mp.Process,
+                 tasks: 'mp.Queue[WorkerMessageT]') -> None:
+        self.process = process
+        self.tasks = tasks
+        self.pending = 0
+        self.busy_time = 0.
+        self.ready_time: tp.Optional[float] = None
+
+
+class WorkerPool:
+    def __init__(self,
+                 base_config: ConfigsScope,
+                 simulator_config: Config,
+                 processes: int = 4,
+                 headless: bool = True,
+                 preload_modules: tp.Optional[tp.List[str]] = None,
+                 preload_candles: tp.Optional[tp.List[tp.Tuple[AssetPair, Timeframe, TimeRange]]] = None,
+                 market_data_config: tp.Optional[Config] = None,
+                 memory_cache_size: int = 8,
+                 max_imbalance: int = 1,
+                 result_cache: tp.Optional[ResultCache] = None,
+                 profile: tp.Optional[bool] = None):
+        """
+        preload_candles are loaded by every worker at start,
+        ranges of later tasks inside them are served from memory.
+        market_data_config initializes MarketDataDownloader in workers,
+        not needed with the fork start method if the parent initialized it.
+        A task goes to the worker of its asset pair and range while that worker
+        has at most max_imbalance more pending tasks than the least busy one.
+        Workers share result_cache, if given, and profile runs as StrategyRunner does.
+        """
+        self.base_config = base_config
+        self.logger = Logger('WorkerPool', config=base_config['strategy_runner']['logger'])
+        self._results: 'mp.Queue[tp.Tuple[tp.Any, ...]]' = mp.Queue()
+        self._workers: tp.List[_Worker] = []
+        modules = PRELOAD_MODULES if preload_modules is None else preload_modules
+        modules = modules + ['strategies.strategy_runner',
+                             'strategies' + ('.' + base_config['strategy']['dir']) * 2]
+        if mp.get_start_method() == 'fork':
+            # Forked workers inherit modules imported once here
+            _import_modules(modules)
+        for worker_id in range(processes):
+            tasks: 'mp.Queue[WorkerMessageT]' = mp.Queue()
+            process = mp.Process(
+                target=_worker_main,
+                args=(worker_id, tasks, self._results, base_config, simulator_config,
+                      headless, modules, preload_candles or [],
+                      market_data_config, memory_cache_size, result_cache, profile),
+                name=f'SimulationWorker-{worker_id}',
+                daemon=True)
+            process.start()
+            self._workers.append(_Worker(process, tasks))
+        self._max_imbalance = max_imbalance
+        self._affinity: tp.Dict[AffinityKeyT, int] = {}
+        self._next_task_id = 0
+        self._started_tasks: tp.Set[int] = set()
+        self._completed = 0
+        self._failed = 0
+        # Tracebacks of failed tasks by task id
+        self._errors: tp.Dict[int, str] = {}
+        self._affinity_hits = 0
+        # Results of tasks finished while accumulators were collected
+        self._ready_results: tp.Deque[ResultT] = collections.deque()
+        self._start_time = perf_counter()
+        self._closed = False
+
+    def __enter__(self) -> 'WorkerPool':
+        return self
+
+    def __exit__(self, *args: tp.Any) -> None:
+        self.close()
+
+    def submit(self, time_range: TimeRange,
+               strategy_config: tp.Optional[Config] = None,
+               logs_path: tp.Optional[Path] = None,
+               accumulate: bool = False) -> int:
+        """
+        Queues a simulation and returns its task id.
+        With accumulate its statistics are added to the accumulator of the worker,
+        get_result returns None for them and collect_accumulated merges them.
+        """
+        if self._closed:
+            raise RuntimeError('Pool is closed')
+        task_id = self._next_task_id
+        self._next_task_id += 1
+        worker_id = self._route(self._get_affinity_key(time_range, strategy_config))
+        worker = self._workers[worker_id]
+        worker.pending += 1
+        worker.tasks.put((task_id, (time_range, strategy_config, logs_path), accumulate))
+        return task_id
+
+    def get_result(self) -> ResultT:
+        """
+        Waits for any submitted task to finish.
+        Statistics are None if the simulation failed, its traceback is logged
+        and kept in the metrics.
+        """
+        if self._ready_results:
+            return self._ready_results.popleft()
+        while True:
+            result = self._handle_message(self._results.get())
+            if result is not None:
+                return result
+
+    def collect_accumulated(self) -> StatisticsAccumulator:
+        """
+        Waits for all submitted tasks and merges statistics of the accumulated ones,
+        accumulators of workers are emptied.
+        """
+        for worker in self._workers:
+            worker.tasks.put(FLUSH)
+        accumulator = StatisticsAccumulator()
+        collected = 0
+        while collected < len(self._workers):
+            message = self._results.get()
+            if message[0] == 'accumulator':
+                accumulator.merge(message[2])
+                collected += 1
+                continue
+            result = self._handle_message(message)
+            if result is not None:
+                self._ready_results.append(result)
+        return accumulator
+
+    def map(self, tasks: tp.Iterable[TaskT]) -> tp.List[tp.Optional[TradingStatistics]]:
+        """ Runs tasks and returns their results in order. """
+        ids = [self.submit(*task) for task in tasks]
+        results: tp.Dict[int, tp.Optional[TradingStatistics]] = {}
+        while len(results) < len(ids):
+            task_id, stats = self.get_result()
+            results[task_id] = stats
+        return [results[task_id] for task_id in ids]
+
+    def get_metrics(self) -> tp.Dict[str, tp.Any]:
+        """
+        Task counters, queue lengths, share of time each worker spent simulating
+        and tracebacks of failed tasks by task id.
+        """
+        now = perf_counter()
+        pending = sum(worker.pending for worker in self._workers)
+        return {
+            'workers': len(self._workers),
+            'submitted': self._next_task_id,
+            'completed': self._completed,
+            'failed': self._failed,
+            'running': len(self._started_tasks),
+            'queued': pending - len(self._started_tasks),
+            'affinity_hits': self._affinity_hits,
+            'pending_per_worker': [worker.pending for worker in self._workers],
+            'utilization': [
+                worker.busy_time / (now - worker.ready_time)
+                if worker.ready_time is not None and now > worker.ready_time else 0.
+                for worker in self._workers],
+            'uptime': now - self._start_time,
+            'errors': dict(self._errors),
+        }
+
+    def close(self) -> None:
+        """ Lets workers finish queued tasks and stops them. """
+        if self._closed:
+            return
+        self._closed = True
+        for worker in self._workers:
+            worker.tasks.put(None)
+        # Workers exit only after their results are read
+        while any(worker.process.is_alive() for worker in self._workers):
+            try:
+                self._handle_message(self._results.get(timeout=0.1))
+            except queue.Empty:
+                pass
+        for worker in self._workers:
+            worker.process.join()
+
+    def _handle_message(self, message: tp.Tuple[tp.Any, ...]) -> tp.Optional[ResultT]:
+        if message[0] == 'ready':
+            self._workers[message[1]].ready_time = message[2]
+            return None
+        if message[0] == 'started':
+            self._started_tasks.add(message[2])
+            return None
+        _, worker_id, task_id, busy_time, stats, error = message
+        worker = self._workers[worker_id]
+        worker.pending -= 1
+        worker.busy_time += busy_time
+        self._started_tasks.discard(task_id)
+        self._completed += 1
+        if error is not None:
+            self._failed += 1
+            self._errors[task_id] = error
+            self.logger.error('Task %s failed:\n%s', task_id, error)
+        return task_id, stats
+
+    def _get_affinity_key(self, time_range: TimeRange,
+                          strategy_config: tp.Optional[Config]) -> AffinityKeyT:
+        asset_pair: tp.List[str] = self.base_config['trading_interface']['asset_pair']
+        if strategy_config is not None and 'asset_pair' in strategy_config:
+            asset_pair = strategy_config['asset_pair']
+        return '/'.join(asset_pair), time_range.from_ts, time_range.to_ts
+
+    def _route(self, key: AffinityKeyT) -> int:
+        least_busy = min(range(len(self._workers)), key=lambda i: self._workers[i].pending)
+        worker_id = self._affinity.get(key)
+        if worker_id is not None and self._workers[worker_id].pending <= \
+                self._workers[least_busy].pending + self._max_imbalance:
+            self._affinity_hits += 1
+            return worker_id
+        self._affinity[key] = least_busy
+        return least_busy
@@ -0,0 +1,44 @@
+import pytest
+
+from helpers.profiler import ComponentProfile, Profiler
+
+
+def test_quantiles() -> None:
+    component = ComponentProfile()
+    for ns in range(1, 100001):
+        component.add(ns)
+    assert component.count == 100000
+    assert component.get_quantile(0.5) == pytest.approx(50000, rel=1 / 16)
+    assert component.get_quantile(0.99) == pytest.approx(99000, rel=1 / 16)
+    assert component.get_quantile(0.) == 1
+
+
+def test_merge() -> None:
+    first, second = ComponentProfile(), ComponentProfile()
+    for ns in [10, 20, 30]:
+        first.add(ns)
+    for ns in [1000, 2000]:
+        second.add(ns)
+    first.merge(second)
+    assert first.count == 5
+    assert first.total_ns == 3060
+    assert first.get_quantile(0.5) == 31  # middle of [30, 32)
+
+
+def test_wrap_method() -> None:
+    class Handler:
+        def update(self, value: int) -> int:
+            return value + 1
+
+    handler = Handler()
+    profiler = Profiler()
+    profiler.wrap_method(handler, 'update', 'handler:Handler')
+    assert handler.update(1) == 2
+    assert handler.update(2) == 3
+    profiler.get_component('unused')
+
+    merged = Profiler().merge(profiler).merge(profiler)
+    summary = merged.get_summary()
+    assert [row['component'] for row in summary] == ['handler:Handler']
+    assert summary[0]['calls'] == 4
+    assert 'handler:Handler' in str(merged)
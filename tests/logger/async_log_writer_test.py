@@ -0,0 +1,66 @@
+import logging
+import typing as tp
+
+from logger.async_log_writer import AsyncLogWriter
+from logger.logger import Logger
+
+
+class ListHandler(logging.Handler):
+    def __init__(self, level: int = logging.NOTSET) -> None:
+        super().__init__(level)
+        self.messages: tp.List[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(record.getMessage())
+
+
+def test_async_log_writer() -> None:
+    info_handler, warning_handler = ListHandler(logging.INFO), ListHandler(logging.WARNING)
+    writer = AsyncLogWriter()
+    writer.start()
+    logger = logging.getLogger('AsyncLogWriterTest')
+    logger.setLevel(logging.INFO)
+    handler = writer.get_handler([info_handler, warning_handler])
+    assert writer.get_handler([info_handler, warning_handler]) is handler
+    logger.addHandler(handler)
+    try:
+        args = [1]
+        logger.info('value %s', args)
+        args.append(2)
+        logger.warning('warning')
+    finally:
+        logger.removeHandler(handler)
+        writer.stop()
+    assert info_handler.messages == ['value [1]', 'warning']
+    assert warning_handler.messages == ['warning']
+    assert writer.get_metrics()['written_records'] == 2
+
+
+def test_async_log_writer_drops_on_full_queue() -> None:
+    target = ListHandler()
+    writer = AsyncLogWriter(max_queue_size=2)
+    handler = writer.get_handler([target])
+    for i in range(5):
+        handler.handle(logging.makeLogRecord({'msg': str(i), 'levelno': logging.INFO}))
+    writer.start()
+    writer.stop()
+    assert target.messages == ['0', '1']
+    assert writer.get_metrics()['dropped_records'] == 3
+
+
+def test_handlers_registered_once_per_run() -> None:
+    config = {'file_output': False, 'std_output': True, 'system_time': False}
+    try:
+        Logger.start_run()
+        first = Logger('RegisteredOnceTest', config=config)
+        Logger('RegisteredOnceTest', config=config)
+        assert len(first.logger.handlers) == 1
+        assert len(first.logger.filters) == 1
+
+        Logger.start_run(async_output=True)
+        assert len(first.logger.handlers) == 1
+        assert Logger.get_async_writer_metrics() is not None
+    finally:
+        Logger.end_run()
+    assert first.logger.handlers == []
+    assert Logger.get_async_writer_metrics() is None
@@ -0,0 +1,135 @@
+import pickle
+import struct
+import typing as tp
+from pathlib import Path
+from time import sleep
+
+import pytest
+
+from logger.event_log import EventLogReader, EventLogTailer, EventLogWriter
+
+
+def make_events(count: int) -> tp.List[tp.Dict[str, tp.Any]]:
+    return [{'ts': i, 'value': i * 0.5, 'event_type': dict} for i in range(count)]
+
+
+@pytest.mark.parametrize("compression", [True, False])
+@pytest.mark.parametrize("chunk_size", [1, 7, 1000])
+def test_write_and_read(tmp_path: Path, compression: bool, chunk_size: int) -> None:
+    path = tmp_path / 'log.dump'
+    events = make_events(100)
+    writer = EventLogWriter(path, chunk_size=chunk_size,
+                            compression=compression, max_pending_chunks=2)
+    for event in events:
+        writer.append(event)
+    writer.close()
+
+    assert EventLogReader.is_event_log(path)
+    assert list(EventLogReader(path)) == events
+    assert len(list(EventLogReader(path).chunks())) == -(-len(events) // chunk_size)
+    assert list(EventLogReader(path).events(dict, 50)) == events[50:]
+
+
+def test_truncated_log(tmp_path: Path) -> None:
+    path = tmp_path / 'log.dump'
+    writer = EventLogWriter(path, chunk_size=10)
+    for event in make_events(25):
+        writer.append(event)
+    writer.close()
+
+    last_chunk = EventLogReader(path).get_index()[-1]
+    data = path.read_bytes()
+    path.write_bytes(data[:last_chunk.offset + last_chunk.length - 5])
+    assert list(EventLogReader(path)) == make_events(20)
+
+
+def test_events_query(tmp_path: Path) -> None:
+    path = tmp_path / 'log.dump'
+    writer = EventLogWriter(path, chunk_size=10)
+    events = make_events(100)
+    for event in events:
+        writer.append(event)
+        writer.append({'ts': event['ts'], 'event_type': list})
+    writer.close()
+
+    reader = EventLogReader(path)
+    assert reader.get_event_types() == [dict, list]
+    assert list(reader.events(dict)) == events
+    assert list(reader.events(dict, 25, 42)) == events[25:43]
+    assert list(reader.events(dict, to_ts=9)) == events[:10]
+    assert list(reader.events(set)) == []
+    assert sum(info.events_count for info in reader.get_index()) == 200
+
+
+def test_not_an_event_log(tmp_path: Path) -> None:
+    path = tmp_path / 'log.dump'
+    path.write_bytes(b'\x80\x04]\x94.')
+    assert not EventLogReader.is_event_log(path)
+    path.write_bytes(b'CTEVLOG\xff')
+    assert not EventLogReader.is_event_log(path)
+    with pytest.raises(ValueError):
+        EventLogReader(path).get_index()
+
+
+def test_version_1_log(tmp_path: Path) -> None:
+    path = tmp_path / 'log.dump'
+    events = [event for i, event in enumerate(make_events(30))
+              for event in (event, {'ts': i, 'event_type': list})]
+    with open(path, 'wb') as f:
+        f.write(b'CTEVLOG\x01')
+        # Chunks of version 1 mix event types and have no type name
+        for i in range(0, len(events), 8):
+            chunk = events[i:i + 8]
+            payload = pickle.dumps(chunk)
+            f.write(struct.pack('>BIqqI', 0, len(chunk), chunk[0]['ts'], chunk[-1]['ts'], len(payload)))
+            f.write(payload)
+
+    reader = EventLogReader(path)
+    assert EventLogReader.is_event_log(path) and reader.is_complete()
+    assert not reader.is_indexed()
+    assert list(reader) == events
+    assert reader.get_event_types() == [dict, list]
+    assert list(reader.events(dict, 10, 14)) == make_events(15)[10:]
+
+
+def test_tail_running_log(tmp_path: Path) -> None:
+    path = tmp_path / 'log.dump'
+    writer = EventLogWriter(path, chunk_size=1000, flush_interval=0)
+    tailer = EventLogTailer(path)
+    events = make_events(30)
+    for event in events[:10]:
+        writer.append(event)
+    writer.flush()
+    tail = []
+    for _ in range(100):
+        tail += tailer.read_new()
+        if len(tail) == 10:
+            break
+        sleep(0.01)
+    assert tail == events[:10]
+    assert not EventLogReader(path).is_complete()
+
+    for event in events[10:]:
+        writer.append(event)
+    writer.close()
+    assert tailer.read_new() == events[10:]
+    assert tailer.finished and tailer.read_new() == []
+    assert EventLogReader(path).is_complete()
+
+
+def test_quiet_writer_flushed(tmp_path: Path) -> None:
+    path = tmp_path / 'log.dump'
+    writer = EventLogWriter(path, chunk_size=1000, flush_interval=0.05)
+    tailer = EventLogTailer(path)
+    events = make_events(10)
+    for event in events:
+        writer.append(event)
+    # No more events and no flush calls, the writer thread writes them on its own
+    tail = []
+    for _ in range(100):
+        tail += tailer.read_new()
+        if len(tail) == 10:
+            break
+        sleep(0.01)
+    assert tail == events
+    writer.close()
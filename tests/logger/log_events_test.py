@@ -0,0 +1,39 @@
+from logging import INFO
+
+from logger.log_events import BuyEvent, ExpMovingAverageEvent, NewCandleEvent, RSIEvent
+from logger.logger import Logger
+from trading import AssetPair, Candle
+
+QUIET_CONFIG = {'file_output': False, 'std_output': False, 'system_time': True}
+
+
+def test_event_dicts() -> None:
+    candle = Candle(0, 1, 2, 0, 3, 1)
+    assert NewCandleEvent(candle).obj == {'candle': candle}
+    assert BuyEvent(AssetPair('WAVES', 'USDN'), 1, 2, '42').obj == {
+        'amount_asset': AssetPair('WAVES', 'USDN').amount_asset,
+        'price_asset': AssetPair('WAVES', 'USDN').price_asset,
+        'amount': 1, 'price': 2, 'order_id': '42'}
+    assert ExpMovingAverageEvent(1.5, 10).obj == {
+        'value': 1.5, 'params': '10', 'min_value': None, 'max_value': None,
+        'value_fmt': 'Value: 1.5000'}
+    assert RSIEvent(30).obj['value_fmt'] == 'RSI: 30.00'
+    assert ExpMovingAverageEvent(1.5, 10).msg == 'New EMA of last 10 elements: 1.5'
+
+
+def test_events_have_no_dict() -> None:
+    assert not hasattr(RSIEvent(30), '__dict__')
+    assert not hasattr(BuyEvent(AssetPair('WAVES', 'USDN'), 1, 2, '42'), '__dict__')
+
+
+def test_event_capture() -> None:
+    logger = Logger('LogEventsTest', config=QUIET_CONFIG)
+    logger.setLevel(INFO + 1)
+    try:
+        Logger.set_event_capture(False)
+        assert not logger.is_event_enabled(RSIEvent, INFO)
+        Logger.set_event_capture(True, [NewCandleEvent])
+        assert logger.is_event_enabled(NewCandleEvent, INFO)
+        assert not logger.is_event_enabled(RSIEvent, INFO)
+    finally:
+        Logger.set_event_capture(True)
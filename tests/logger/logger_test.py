@@ -0,0 +1,52 @@
+from logging import INFO
+
+from logger.log_events import BuyEvent, NewCandleEvent
+from logger.logger import Logger, NullLogger
+
+
+def test_headless_logger() -> None:
+    try:
+        Logger.set_headless(True)
+        logger = Logger('HeadlessTest')
+        assert isinstance(logger, NullLogger)
+        assert not logger.is_event_enabled(NewCandleEvent, INFO)
+        logger.info('nothing %s', 'happens')
+        logger.setLevel(INFO)
+        assert not Logger.is_captured(NewCandleEvent)
+    finally:
+        Logger.set_headless(False)
+    assert isinstance(Logger('HeadlessTest', config={'file_output': False,
+                                                      'std_output': False,
+                                                      'system_time': True}), Logger)
+    assert Logger.is_captured(NewCandleEvent)
+
+
+def test_headless_mode_is_not_kept_by_loggers() -> None:
+    config = {'file_output': False, 'std_output': False, 'system_time': True}
+    regular = Logger('RegularTest', config=config)
+    try:
+        Logger.set_headless(True)
+        headless = Logger('HeadlessTest', config=config)
+        assert not regular.isEnabledFor(INFO)
+        assert not headless.isEnabledFor(INFO)
+    finally:
+        Logger.set_headless(False)
+    # A logger created in headless mode logs once it is left
+    assert isinstance(headless, Logger) and headless.isEnabledFor(INFO)
+    assert regular.isEnabledFor(INFO)
+
+
+def test_headless_keeps_event_capture() -> None:
+    try:
+        Logger.set_event_capture(True, [NewCandleEvent])
+        Logger.set_headless(True)
+        Logger.set_headless(True)
+        assert not Logger.is_captured(NewCandleEvent)
+        Logger.set_headless(False)
+        assert Logger.is_captured(NewCandleEvent)
+        assert not Logger.is_captured(BuyEvent)
+        Logger.set_headless(False)
+        assert Logger.is_captured(NewCandleEvent)
+    finally:
+        Logger.set_headless(False)
+        Logger.set_event_capture(True)
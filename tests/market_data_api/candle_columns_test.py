@@ -0,0 +1,55 @@
+import numpy as np
+
+from market_data_api import candle_columns
+from trading import Candle, Timestamp
+
+NAN = float('nan')
+
+
+def test_parse_iso_times() -> None:
+    for times in (['2021-03-01 00:00:00', '2021-07-01 12:30:00', '2021-10-31 02:00:00'],
+                  ['2021-03-01T00:00:00.000Z', '2021-07-01T12:30:00.000Z'],
+                  ['2021-03-01T00:00:00+03:00']):
+        assert candle_columns.parse_iso_times(times).tolist() == \
+            [Timestamp.from_iso_format(t) for t in times]
+
+
+def test_decode_batch() -> None:
+    values = candle_columns.decode_batch([
+        {'data': {'time': '2021-03-01T00:00:00.000Z', 'open': 1, 'close': 2,
+                  'low': 0.5, 'high': 2.5, 'volume': 10}},
+        {'data': {'time': '2021-03-01T01:00:00.000Z', 'open': None, 'close': None,
+                  'low': None, 'high': None, 'volume': 0}},
+    ])
+    assert candle_columns.to_candles(values[:1]) == [Candle(1614556800, 1., 2., 0.5, 2.5, 10.)]
+    assert np.isnan(values[1, candle_columns.OPEN])
+
+
+def test_merge() -> None:
+    first = np.array([[0, 1, 1, 1, 1, 1], [60, 2, 2, 2, 2, 2]], dtype=np.float64)
+    second = np.array([[60, 3, 3, 3, 3, 3], [120, 4, 4, 4, 4, 4]], dtype=np.float64)
+    merged = candle_columns.merge([second, first])
+    assert merged[:, candle_columns.TS].tolist() == [0, 60, 120]
+    assert merged[:, candle_columns.OPEN].tolist() == [1, 2, 4]
+
+
+def test_fill_gaps() -> None:
+    values = np.array([[0, NAN, NAN, NAN, NAN, 0],
+                       [60, 1, 2, 0.5, 2.5, 10],
+                       [120, NAN, NAN, NAN, NAN, 0],
+                       [180, NAN, NAN, NAN, NAN, 0],
+                       [240, 3, 4, 2.5, 4.5, 10]])
+    assert candle_columns.to_candles(candle_columns.fill_gaps(values)) == [
+        Candle(60, 1, 2, 0.5, 2.5, 10),
+        Candle(120, 2, 2, 2, 2, 0),
+        Candle(180, 2, 2, 2, 2, 0),
+        Candle(240, 3, 4, 2.5, 4.5, 10)]
+    assert len(candle_columns.fill_gaps(values[:1])) == 0
+
+
+def test_aggregate() -> None:
+    values = np.array([[ts, ts, ts + 1, ts - 1, ts + 2, 1] for ts in range(60, 301, 60)],
+                      dtype=np.float64)
+    assert candle_columns.to_candles(candle_columns.aggregate(values, 180)) == [
+        Candle(0, 60, 121, 59, 122, 2),
+        Candle(180, 180, 301, 179, 302, 3)]
@@ -0,0 +1,105 @@
+import json
+import threading
+import typing as tp
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter, sleep
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from logger.logger import Logger
+from market_data_api.market_data_downloader import MarketDataDownloader
+from trading import Asset, AssetPair, Timeframe, TimeRange, Timestamp
+
+
+class CandlesServer(ThreadingHTTPServer):
+    """ Stand-in of the market data API serving hourly candles with price equal to the hour. """
+
+    def __init__(self) -> None:
+        super().__init__(('127.0.0.1', 0), CandlesRequestHandler)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+
+    def get_host(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+
+class CandlesRequestHandler(BaseHTTPRequestHandler):
+    server: CandlesServer
+
+    def do_GET(self) -> None:
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.active += 1
+            self.server.max_active = max(self.server.max_active, self.server.active)
+        params = parse_qs(urlparse(self.path).query)
+        from_ts = int(params['timeStart'][0]) // 1000
+        to_ts = int(params['timeEnd'][0]) // 1000
+        first_ts = (from_ts + 3599) // 3600 * 3600
+        data = [{'data': {'time': Timestamp.to_iso_format(ts), 'open': ts / 3600,
+                          'close': ts / 3600, 'low': ts / 3600, 'high': ts / 3600, 'volume': 1.}}
+                for ts in range(first_ts, to_ts + 1, 3600)]
+        # Slow enough for requests to overlap
+        sleep(0.02)
+        body = json.dumps({'data': data}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.lock:
+            self.server.active -= 1
+
+    def log_message(self, *args: tp.Any) -> None:
+        pass
+
+
+@pytest.fixture
+def candles_server() -> tp.Iterator[CandlesServer]:
+    server = CandlesServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def init_downloader(monkeypatch: pytest.MonkeyPatch, server: CandlesServer,
+                    max_requests_per_second: float, max_connections: int) -> None:
+    # Loggers created by init do nothing, so no log files are written
+    monkeypatch.setattr(Logger, '_headless', True)
+    MarketDataDownloader.init({'market_data_host': server.get_host(),
+                               'candles_per_request': 24,
+                               'max_requests_per_second': max_requests_per_second,
+                               'max_connections': max_connections})
+    monkeypatch.setattr(MarketDataDownloader, '_Markets', {'WAVES/USDN': 'WAVES/USDN'})
+    monkeypatch.setattr(MarketDataDownloader, '_MemorySize', 0)
+
+
+def test_chunks_merged(monkeypatch: pytest.MonkeyPatch, candles_server: CandlesServer) -> None:
+    init_downloader(monkeypatch, candles_server, max_requests_per_second=0, max_connections=4)
+    time_range = TimeRange.from_iso_format('2021-03-01 00:30:00', '2021-03-11 00:00:00')
+    candles = MarketDataDownloader.get_candles(
+        AssetPair(Asset('WAVES'), Asset('USDN')), Timeframe('1h'), time_range)
+
+    first_ts = time_range.from_ts + 1800
+    assert [candle.ts for candle in candles] == list(range(first_ts, time_range.to_ts + 1, 3600))
+    assert all(candle.close == candle.ts / 3600 for candle in candles)
+    assert candles_server.requests == 10
+    assert 1 < candles_server.max_active <= 4
+
+
+def test_limits(monkeypatch: pytest.MonkeyPatch, candles_server: CandlesServer) -> None:
+    init_downloader(monkeypatch, candles_server, max_requests_per_second=50, max_connections=2)
+    start = perf_counter()
+    candles = MarketDataDownloader.get_candles(
+        AssetPair(Asset('WAVES'), Asset('USDN')), Timeframe('1h'),
+        TimeRange.from_iso_format('2021-03-01 00:00:00', '2021-03-11 23:00:00'))
+
+    assert len(candles) == 11 * 24
+    assert candles_server.requests == 11
+    assert candles_server.max_active <= 2
+    # 11 requests spaced by 1 / 50 s
+    assert perf_counter() - start >= 10 / 50
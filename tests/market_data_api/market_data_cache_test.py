@@ -0,0 +1,128 @@
+import os
+import typing as tp
+from pathlib import Path
+from time import time
+
+import pytest
+from mock import MagicMock
+
+from logger.logger import Logger
+from market_data_api.market_data_cache import CandlesCache, MarketsCache
+from market_data_api.market_data_downloader import MarketDataDownloader
+from trading import Asset, AssetPair, Candle, Timeframe, TimeRange, Timestamp
+
+ASSET_PAIR = AssetPair(Asset('WAVES'), Asset('USDN'))
+DAY = TimeRange.from_iso_format('2021-03-01 00:00:00', '2021-03-02 00:00:00')
+
+
+def test_markets_cache_ttl(tmp_path: Path) -> None:
+    cache = MarketsCache(tmp_path / 'markets.json', ttl=60)
+    assert cache.load() is None
+    cache.store({'WAVES/USDN': 'id'})
+    assert cache.load() == {'WAVES/USDN': 'id'}
+
+    cache.ttl = -1
+    assert cache.load() is None
+    assert cache.load(allow_stale=True) == {'WAVES/USDN': 'id'}
+
+
+def test_candles_cache_sub_range(tmp_path: Path) -> None:
+    cache = CandlesCache(tmp_path)
+    candles = [Candle(DAY.from_ts + i * 3600, 1., 2., 0.5, 2.5, float(i)) for i in range(25)]
+    cache.put(ASSET_PAIR, Timeframe('1h'), DAY, candles)
+
+    assert cache.get(ASSET_PAIR, Timeframe('1h'), DAY) == candles
+    hours = TimeRange(DAY.from_ts + 1800, DAY.from_ts + 3 * 3600)
+    assert cache.get(ASSET_PAIR, Timeframe('1h'), hours) == candles[1:4]
+    assert cache.get(ASSET_PAIR, Timeframe('15m'), DAY) is None
+    assert cache.get(ASSET_PAIR, Timeframe('1h'),
+                     TimeRange(DAY.from_ts, DAY.to_ts + 3600)) is None
+
+
+@pytest.fixture
+def offline_downloader(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> tp.Iterator[tp.List[TimeRange]]:
+    """ Downloader with a cache in tmp_path, returns the list of candle requests. """
+    requests: tp.List[TimeRange] = []
+
+    def load_candles_batch(asset_pair: AssetPair, timeframe: Timeframe,
+                           time_range: TimeRange) -> tp.List[tp.Dict[str, tp.Any]]:
+        requests.append(time_range)
+        step = timeframe.to_seconds()
+        first_ts = (time_range.from_ts + step - 1) // step * step
+        return [{'data': {'time': Timestamp.to_iso_format(ts), 'open': 1., 'close': 1.,
+                          'low': 1., 'high': 1., 'volume': 1.}}
+                for ts in range(first_ts, time_range.to_ts + 1, step)]
+
+    monkeypatch.setattr(MarketDataDownloader, '_load_candles_batch', load_candles_batch)
+    monkeypatch.setattr(MarketDataDownloader, '_MemorySize', 0)
+    # Loggers created by init do nothing, so no log files are written
+    monkeypatch.setattr(Logger, '_headless', True)
+    MarketDataDownloader.init({'market_data_host': '', 'candles_per_request': 1400,
+                               'cache_path': str(tmp_path), 'markets_ttl': '1d'})
+    yield requests
+    MarketDataDownloader._CandlesCache = None
+    MarketDataDownloader._MarketsCache = None
+
+
+def test_candles_served_offline(offline_downloader: tp.List[TimeRange]) -> None:
+    candles = MarketDataDownloader.get_candles(ASSET_PAIR, Timeframe('1h'), DAY)
+    assert len(offline_downloader) > 0
+    loaded = len(offline_downloader)
+
+    hours = TimeRange(DAY.from_ts + 3600, DAY.from_ts + 2 * 3600)
+    assert MarketDataDownloader.get_candles(ASSET_PAIR, Timeframe('1h'), hours) == candles[1:3]
+    assert len(offline_downloader) == loaded
+
+
+def test_markets_loaded_once(offline_downloader: tp.List[TimeRange],
+                             monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    exchange = MagicMock()
+    exchange.load_markets.return_value = {'WAVES/USDN': {'id': 'WAVES/DG2xFkPd'}}
+    monkeypatch.setattr(MarketDataDownloader, '_get_exchange', lambda: exchange)
+    # No network at init
+    assert exchange.load_markets.call_count == 0
+
+    assert MarketDataDownloader._get_market_id(ASSET_PAIR) == 'WAVES/DG2xFkPd'
+    assert MarketDataDownloader._get_market_id(ASSET_PAIR) == 'WAVES/DG2xFkPd'
+    assert exchange.load_markets.call_count == 1
+    assert os.path.exists(tmp_path / 'markets.json')
+
+    # A new process finds markets in the cache
+    MarketDataDownloader.init({'cache_path': str(tmp_path)})
+    assert MarketDataDownloader._get_market_id(ASSET_PAIR) == 'WAVES/DG2xFkPd'
+    assert exchange.load_markets.call_count == 1
+
+
+def test_coarse_timeframes_aggregated(offline_downloader: tp.List[TimeRange],
+                                      monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setitem(MarketDataDownloader._Config, 'base_timeframe', '15m')
+    hours = MarketDataDownloader.get_candles(ASSET_PAIR, Timeframe('1h'), DAY)
+    assert [candle.ts for candle in hours] == list(range(DAY.from_ts, DAY.to_ts + 1, 3600))
+    assert hours[0].volume == 4
+    loaded = len(offline_downloader)
+
+    # Served by the same pyramid of 15m candles
+    four_hours = MarketDataDownloader.get_candles(
+        ASSET_PAIR, Timeframe('4h'), TimeRange(DAY.from_ts, DAY.to_ts - 4 * 3600))
+    assert [candle.ts for candle in four_hours] == list(range(DAY.from_ts, DAY.to_ts, 4 * 3600))
+    assert all(candle.volume == 16 for candle in four_hours)
+    assert len(offline_downloader) == loaded
+
+    # The last day candle ends after the range of the pyramid
+    days = MarketDataDownloader.get_candles(ASSET_PAIR, Timeframe('1d'), DAY)
+    assert [candle.volume for candle in days] == [96, 96]
+    assert len(offline_downloader) > loaded
+
+
+def test_unfinished_range_reloaded(offline_downloader: tp.List[TimeRange],
+                                   monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setitem(MarketDataDownloader._Config, 'base_timeframe', '1m')
+    now = int(time())
+    recent = TimeRange(now - 2 * 3600, now)
+    MarketDataDownloader.get_candles(ASSET_PAIR, Timeframe('1h'), recent)
+    loaded = len(offline_downloader)
+
+    # The forming candle is still to change
+    MarketDataDownloader.get_candles(ASSET_PAIR, Timeframe('1h'), recent)
+    assert len(offline_downloader) > loaded
+    assert MarketDataDownloader._Pyramids == []
@@ -1,17 +1,23 @@
 import pytest
+import typing as tp
+from mock import MagicMock
 
 from tests.configs import base_config
 from helpers.typing.common_types import ConfigsScope
+from logger.logger import Logger
 
 from market_data_api.market_data_downloader import MarketDataDownloader
-from trading import Timeframe, AssetPair, Asset, TimeRange
+from trading import Timeframe, AssetPair, Asset, TimeRange, Timestamp
 
 
 @pytest.mark.parametrize("timeframe, candle_count", [
     ('15m', 9),
     ('1h', 3)
 ])
-def test_candle_count(timeframe: str, candle_count: int, base_config: ConfigsScope) -> None:
+def test_candle_count(timeframe: str, candle_count: int, base_config: ConfigsScope,
+                      monkeypatch: pytest.MonkeyPatch) -> None:
+    # Loggers created by init do nothing, so no log files are written
+    monkeypatch.setattr(Logger, '_headless', True)
     MarketDataDownloader.init(base_config['market_data_downloader'])
     candles = MarketDataDownloader.get_candles(
         asset_pair=AssetPair(Asset('WAVES'), Asset('USDN')),
@@ -21,3 +27,38 @@ def test_candle_count(timeframe: str, candle_count: int, base_config: ConfigsSco
             to_ts='2021-03-01 02:00:00'
         ))
     assert len(candles) == candle_count
+
+
+def test_memory_cache(monkeypatch: pytest.MonkeyPatch, base_config: ConfigsScope) -> None:
+    requests = []
+
+    def load_candles_batch(asset_pair: AssetPair, timeframe: Timeframe,
+                           time_range: TimeRange) -> tp.List[tp.Dict[str, tp.Any]]:
+        requests.append(time_range)
+        step = timeframe.to_seconds()
+        first_ts = (time_range.from_ts + step - 1) // step * step
+        return [{'data': {'time': Timestamp.to_iso_format(ts), 'open': 1., 'close': 1.,
+                          'low': 1., 'high': 1., 'volume': 1.}}
+                for ts in range(first_ts, time_range.to_ts + 1, step)]
+
+    monkeypatch.setattr(MarketDataDownloader, '_load_candles_batch', load_candles_batch)
+    monkeypatch.setattr(MarketDataDownloader, '_Config', base_config['market_data_downloader'])
+    monkeypatch.setattr(MarketDataDownloader, '_Logger', MagicMock())
+    monkeypatch.setattr(MarketDataDownloader, '_Memory', [])
+    MarketDataDownloader.set_memory_cache_size(1)
+    try:
+        asset_pair = AssetPair(Asset('WAVES'), Asset('USDN'))
+        day = TimeRange.from_iso_format('2021-03-01 00:00:00', '2021-03-02 00:00:00')
+        assert len(MarketDataDownloader.get_candles(asset_pair, Timeframe('1h'), day)) == 25
+        loaded = len(requests)
+        hours = MarketDataDownloader.get_candles(
+            asset_pair, Timeframe('1h'),
+            TimeRange.from_iso_format('2021-03-01 10:30:00', '2021-03-01 12:00:00'))
+        assert [candle.ts - day.from_ts for candle in hours] == [11 * 3600, 12 * 3600]
+        assert len(requests) == loaded
+
+        MarketDataDownloader.get_candles(asset_pair, Timeframe('15m'), day)
+        MarketDataDownloader.get_candles(asset_pair, Timeframe('1h'), day)
+        assert len(requests) > loaded + 1
+    finally:
+        MarketDataDownloader.set_memory_cache_size(0)
@@ -0,0 +1,67 @@
+import typing as tp
+from pathlib import Path
+
+import pytest
+
+import strategies.hyperparameter_search as hyperparameter_search
+from helpers.typing.common_types import Config, ConfigsScope
+from strategies.hyperparameter_search import SuccessiveHalvingSearch
+from strategies.result_cache import ResultCache
+from trading import Asset, TimeRange
+from trading_system.trading_statistics import TradingStatistics
+
+DAY = 24 * 60 * 60
+# Candidates with higher quality earn more, the first day is noise
+QUALITIES = [3, 7, 1, 5, 2, 8, 4, 6]
+# Quality, days and result cache of every run
+RunsT = tp.List[tp.Tuple[int, int, tp.Optional[ResultCache]]]
+
+
+@pytest.fixture
+def runs(monkeypatch: pytest.MonkeyPatch) -> RunsT:
+    runs: RunsT = []
+
+    def run_candidate(base_config: ConfigsScope, simulator_config: Config,
+                      strategy_config: Config, time_range: TimeRange,
+                      result_cache: tp.Optional[ResultCache] = None) -> TradingStatistics:
+        days = time_range.get_range() // DAY
+        runs.append((strategy_config['quality'], days, result_cache))
+        noise = 10 if strategy_config['quality'] == 1 else 0
+        stats = TradingStatistics(price_asset=Asset('USDN'), initial_wallet={},
+                                  initial_balance=100, start_timestamp=time_range.from_ts)
+        stats.set_final_balance(100 + strategy_config['quality'] * days + noise)
+        return stats
+
+    monkeypatch.setattr(hyperparameter_search, 'run_candidate', run_candidate)
+    return runs
+
+
+def get_search(result_cache: tp.Optional[ResultCache] = None) -> SuccessiveHalvingSearch:
+    return SuccessiveHalvingSearch(
+        base_config={'strategy': {'name': 'Strategy', 'dir': 'strategy'}},
+        simulator_config={},
+        time_range=TimeRange(0, 8 * DAY),
+        min_range=DAY,
+        processes=1,
+        result_cache=result_cache)
+
+
+def test_rung_ranges() -> None:
+    assert [r.get_range() // DAY for r in get_search().get_rung_ranges()] == [1, 2, 4, 8]
+
+
+def test_successive_halving(runs: RunsT) -> None:
+    result = get_search().run([{'quality': q} for q in QUALITIES])
+    assert result.best_config == {'quality': 8}
+    assert result.best_stats.final_balance == 164
+    assert [len(rung.scores) for rung in result.rungs] == [8, 4, 2, 1]
+    assert [q for q, days, _ in runs if days == 8] == [8]
+    assert result.simulated_time == 4 * 8 * DAY
+    assert result.grid_simulated_time == 8 * 8 * DAY
+
+
+def test_runs_use_result_cache(runs: RunsT, tmp_path: Path) -> None:
+    cache = ResultCache(tmp_path)
+    get_search(cache).run([{'quality': q} for q in QUALITIES])
+    assert len(runs) == 15
+    assert all(result_cache is cache for _, _, result_cache in runs)
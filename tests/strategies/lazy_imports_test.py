@@ -0,0 +1,20 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from benchmarks.import_benchmark import ENTRY_POINTS, ROOT, get_heavy_imports
+
+
+@pytest.mark.parametrize('module', ENTRY_POINTS)
+def test_no_heavy_imports(module: str) -> None:
+    assert get_heavy_imports(module) == []
+
+
+def test_no_config_read_at_import(tmp_path: Path) -> None:
+    # No configs/ in the working directory, reading it at import would fail
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    subprocess.run([sys.executable, '-c', 'import strategies.strategy_runner'],
+                   check=True, cwd=tmp_path, env=env)
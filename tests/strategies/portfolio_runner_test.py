@@ -0,0 +1,86 @@
+import math
+import typing as tp
+
+import pytest
+
+from helpers.typing.common_types import Config, ConfigsScope
+from logger.logger import Logger
+from market_data_api.market_data_downloader import MarketDataDownloader
+from strategies.portfolio_runner import PortfolioRunner
+from strategies.strategy_runner import StrategyRunner
+from trading_system.orders_handler import OrdersHandler
+from trading import AssetPair, Asset, Candle, Timeframe, TimeRange
+
+from tests.configs.base_config import *
+from tests.logger.empty_logger_mock import empty_logger_mock
+
+HOUR = 60 * 60
+FROM_TS = 1614556800  # 2021-03-01
+RSI_MACD = {'name': 'RSIMACDStrategy', 'dir': 'rsi_macd_strategy'}
+EMA_SRSI = {'name': 'EMASRSIStrategy', 'dir': 'ema_srsi_strategy'}
+GRID_CONFIG = {'asset_pair': ['WAVES', 'USDN'], 'total_levels': 7, 'base_price': 10.,
+               'interval': 0.02, 'window_size': 20, 'min_amount': 1}
+GRID = {'name': 'GridStrategy', 'dir': 'grid_strategy', 'config': GRID_CONFIG}
+
+
+def get_candles(asset_pair: AssetPair, timeframe: Timeframe,
+                time_range: TimeRange) -> tp.List[Candle]:
+    """ Price swings around 10 with a period of 8 hours. """
+    step = timeframe.to_seconds()
+    first_ts = (time_range.from_ts + step - 1) // step * step
+    candles = []
+    for ts in range(first_ts, time_range.to_ts + 1, step):
+        price = 10. + math.sin(ts / HOUR * math.pi / 4)
+        candles.append(Candle(ts, price, price, price - 0.1, price + 0.1, 1.))
+    return candles
+
+
+@pytest.fixture
+def offline(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(MarketDataDownloader, 'get_candles', staticmethod(get_candles))
+
+
+def test_strategies_isolated(offline: None, base_config: ConfigsScope, simulator_config: Config,
+                             empty_logger_mock: empty_logger_mock) -> None:
+    time_range = TimeRange(FROM_TS, FROM_TS + 24 * HOUR)
+    wallet = {'USDN': 100., 'WAVES': 10.}
+    runner = PortfolioRunner(base_config, simulator_config, headless=True, strategies=[
+        RSI_MACD, {**RSI_MACD, 'label': 'small', 'wallet': {'USDN': 1., 'WAVES': 0.}}, EMA_SRSI])
+    results = runner.run_simulation(time_range)
+    assert list(results) == ['RSIMACDStrategy', 'small', 'EMASRSIStrategy']
+    # Without a wallet a strategy gets an equal share of the trading system one
+    assert results['RSIMACDStrategy'].initial_wallet == {Asset('USDN'): 100. / 3, Asset('WAVES'): 10. / 3}
+
+    # A strategy of the portfolio trades as if it ran alone
+    solo_config = {**base_config, 'strategy': GRID,
+                   'trading_system': {**base_config['trading_system'], 'wallet': wallet}}
+    solo = StrategyRunner(solo_config, simulator_config, {}, headless=True,
+                          strategy_config=GRID_CONFIG).run_simulation(time_range)
+    portfolio = PortfolioRunner(base_config, simulator_config, headless=True, strategies=[
+        {**GRID, 'label': 'other'}, {**GRID, 'wallet': wallet}, RSI_MACD]) \
+        .run_simulation(time_range)['GridStrategy']
+    assert solo.final_wallet == portfolio.final_wallet
+    assert solo.final_balance == portfolio.final_balance
+    assert solo.final_wallet != solo.initial_wallet
+
+
+def test_handlers_shared(offline: None, base_config: ConfigsScope, simulator_config: Config,
+                         empty_logger_mock: empty_logger_mock) -> None:
+    runner = PortfolioRunner(base_config, simulator_config, headless=True,
+                             strategies=[RSI_MACD, {**RSI_MACD, 'label': 'copy'}])
+    assert not Logger.is_headless()
+    runner.run_simulation(TimeRange(FROM_TS, FROM_TS + 2 * HOUR))
+    # Loggers are headless only during the run
+    assert not Logger.is_headless()
+    first, second = runner.members
+    assert first.ts.handlers is second.ts.handlers
+    # Handlers of the strategies are created once, orders are tracked by every trading system
+    assert 'OrdersHandler' not in runner.handlers
+    assert first.ts.get_handler(OrdersHandler) is not second.ts.get_handler(OrdersHandler)
+    solo_config = {**base_config, 'strategy': RSI_MACD}
+    solo = StrategyRunner(solo_config, simulator_config, {}, headless=True)
+    solo.run_simulation(TimeRange(FROM_TS, FROM_TS + 2 * HOUR))
+    assert list(runner.handlers) == [name for name in solo._ts.handlers if name != 'OrdersHandler']
+
+    with pytest.raises(ValueError):
+        PortfolioRunner(base_config, simulator_config, strategies=[RSI_MACD, RSI_MACD])
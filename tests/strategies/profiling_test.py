@@ -0,0 +1,24 @@
+import pytest
+
+from helpers.typing.common_types import Config, ConfigsScope
+from market_data_api.market_data_downloader import MarketDataDownloader
+from strategies.strategy_runner import StrategyRunner
+from trading import TimeRange
+
+from tests.configs.base_config import *
+from tests.logger.empty_logger_mock import empty_logger_mock
+from tests.strategies.worker_pool_test import FROM_TS, HOUR, get_candles
+
+
+def test_profile(monkeypatch: pytest.MonkeyPatch,
+                 base_config: ConfigsScope, simulator_config: Config,
+                 empty_logger_mock: empty_logger_mock) -> None:
+    monkeypatch.setattr(MarketDataDownloader, 'get_candles', staticmethod(get_candles))
+    runner = StrategyRunner(base_config, simulator_config, {}, headless=True, profile=True)
+    stats = runner.run_simulation(TimeRange(FROM_TS, FROM_TS + 6 * HOUR))
+    components = {row['component']: row for row in stats.profile.get_summary()}
+    assert {'trading_system:update', 'handler:CandlesHandler', 'handler:OrdersHandler',
+            'detector:TradingSystem', 'strategy:update', 'interface:is_alive'} <= set(components)
+    # Stopping trading updates the trading system twice more
+    assert components['strategy:update']['calls'] == \
+           components['trading_system:update']['calls'] - 2
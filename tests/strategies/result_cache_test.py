@@ -0,0 +1,86 @@
+import typing as tp
+from pathlib import Path
+
+import pytest
+
+from helpers.typing.common_types import Config, ConfigsScope
+from market_data_api.market_data_downloader import MarketDataDownloader
+import strategies.result_cache as result_cache
+from strategies.result_cache import ResultCache
+from strategies.strategy_runner import StrategyRunner
+from trading import Asset, Candle, TimeRange
+from trading_system.trading_statistics import TradingStatistics
+
+from tests.configs.base_config import *
+from tests.logger.empty_logger_mock import empty_logger_mock
+from tests.strategies.worker_pool_test import FROM_TS, HOUR, get_candles
+
+CANDLES = [Candle(ts, 10., 10., 10., 10., 1.) for ts in range(0, 600, 60)]
+
+
+def make_stats(balance: float) -> TradingStatistics:
+    return TradingStatistics(price_asset=Asset('USDN'), initial_balance=balance)
+
+
+def test_key(monkeypatch: pytest.MonkeyPatch,
+             base_config: ConfigsScope, simulator_config: Config) -> None:
+    time_range = TimeRange(0, 600)
+    key = ResultCache.get_key(base_config, simulator_config, {}, time_range, CANDLES)
+    assert key == ResultCache.get_key(base_config, simulator_config, {}, time_range, CANDLES)
+    assert key != ResultCache.get_key(base_config, simulator_config, {'window': 2},
+                                      time_range, CANDLES)
+    assert key != ResultCache.get_key(base_config, simulator_config, {},
+                                      TimeRange(0, 540), CANDLES)
+    assert key != ResultCache.get_key(base_config, simulator_config, {}, time_range,
+                                      CANDLES[:-1] + [Candle(540, 10., 11., 10., 11., 1.)])
+    # A headless run stores no event log for runs writing one
+    assert key != ResultCache.get_key(base_config, simulator_config, {}, time_range, CANDLES,
+                                      event_log=True)
+    monkeypatch.setattr(result_cache, 'get_code_digest', lambda: 'changed trading system')
+    assert key != ResultCache.get_key(base_config, simulator_config, {}, time_range, CANDLES)
+
+
+def test_put_get(tmp_path: Path) -> None:
+    cache = ResultCache(tmp_path / 'cache')
+    assert cache.get('a') is None
+    event_log = tmp_path / 'run.dump'
+    event_log.write_bytes(b'events')
+    cache.put('a', make_stats(1), event_log)
+    cache.put('b', make_stats(2))
+    stats, cached_log = cache.get('a')
+    assert stats.initial_balance == 1
+    assert cached_log.read_bytes() == b'events'
+    assert cache.get('b')[1] is None
+
+
+def test_eviction(tmp_path: Path) -> None:
+    cache = ResultCache(tmp_path / 'cache')
+    cache.put('a', make_stats(1))
+    entry_size = cache.get_size()
+    cache.max_size = 2 * entry_size
+    cache.put('b', make_stats(2))
+    assert cache.get('a') is not None  # now used after b
+    cache.put('c', make_stats(3))
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.get_size() <= cache.max_size
+
+
+def test_runner_uses_cache(monkeypatch: pytest.MonkeyPatch, tmp_path: Path,
+                           base_config: ConfigsScope, simulator_config: Config,
+                           empty_logger_mock: empty_logger_mock) -> None:
+    monkeypatch.setattr(MarketDataDownloader, 'get_candles', staticmethod(get_candles))
+    runner = StrategyRunner(base_config, simulator_config, {}, headless=True,
+                            result_cache=ResultCache(tmp_path))
+    time_range = TimeRange(FROM_TS, FROM_TS + 6 * HOUR)
+    stats = runner.run_simulation(time_range)
+
+    def simulate(*args: tp.Any) -> TradingStatistics:
+        raise AssertionError('cached simulation is repeated')
+
+    monkeypatch.setattr(runner, '_simulate', simulate)
+    cached = runner.run_simulation(time_range)
+    assert cached.final_balance == stats.final_balance
+    assert cached.finish_timestamp == stats.finish_timestamp
+    with pytest.raises(AssertionError):
+        runner.run_simulation(TimeRange(FROM_TS, FROM_TS + 5 * HOUR))
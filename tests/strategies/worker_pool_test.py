@@ -0,0 +1,72 @@
+import typing as tp
+
+import pytest
+
+from helpers.typing.common_types import Config, ConfigsScope
+from market_data_api.market_data_downloader import MarketDataDownloader
+from strategies.worker_pool import WorkerPool
+from trading import AssetPair, Candle, Timeframe, TimeRange
+
+from tests.configs.base_config import *
+
+HOUR = 60 * 60
+FROM_TS = 1614556800  # 2021-03-01
+
+
+def get_candles(asset_pair: AssetPair, timeframe: Timeframe,
+                time_range: TimeRange) -> tp.List[Candle]:
+    if time_range.to_ts > FROM_TS + 100 * HOUR:
+        raise RuntimeError('no market data')
+    step = timeframe.to_seconds()
+    first_ts = (time_range.from_ts + step - 1) // step * step
+    return [Candle(ts, 10., 10., 10., 10., 1.)
+            for ts in range(first_ts, time_range.to_ts + 1, step)]
+
+
+@pytest.fixture
+def pool(monkeypatch: pytest.MonkeyPatch, base_config: ConfigsScope,
+         simulator_config: Config) -> tp.Iterator[WorkerPool]:
+    # Forked workers inherit the patched downloader
+    monkeypatch.setattr(MarketDataDownloader, 'get_candles', staticmethod(get_candles))
+    with WorkerPool(base_config, simulator_config, processes=2,
+                    preload_modules=[]) as pool:
+        yield pool
+
+
+def test_map(pool: WorkerPool) -> None:
+    ranges = [TimeRange(FROM_TS + i * 6 * HOUR, FROM_TS + (i + 1) * 6 * HOUR) for i in range(3)]
+    results = pool.map([(time_range, None, None) for time_range in ranges + ranges[:1]])
+    assert [stats.start_timestamp for stats in results] == \
+           [time_range.from_ts for time_range in ranges + ranges[:1]]
+
+    metrics = pool.get_metrics()
+    assert metrics['submitted'] == metrics['completed'] == 4
+    assert metrics['queued'] == metrics['running'] == metrics['failed'] == 0
+    assert metrics['affinity_hits'] == 1
+    assert all(0 < utilization <= 1 for utilization in metrics['utilization'])
+
+
+def test_failed_task(pool: WorkerPool) -> None:
+    results = pool.map([(TimeRange(FROM_TS, FROM_TS + 200 * HOUR), None, None),
+                        (TimeRange(FROM_TS, FROM_TS + HOUR), None, None)])
+    assert results[0] is None
+    assert results[1] is not None
+    metrics = pool.get_metrics()
+    assert metrics['failed'] == 1
+    assert list(metrics['errors']) == [0] and 'no market data' in metrics['errors'][0]
+
+
+def test_accumulated_tasks(pool: WorkerPool) -> None:
+    ranges = [TimeRange(FROM_TS + i * 6 * HOUR, FROM_TS + (i + 1) * 6 * HOUR) for i in range(4)]
+    for time_range in ranges:
+        pool.submit(time_range, accumulate=True)
+    pool.submit(TimeRange(FROM_TS, FROM_TS + 200 * HOUR), accumulate=True)
+    task_id = pool.submit(ranges[0])
+    accumulator = pool.collect_accumulated()
+    assert sorted(accumulator.table.get('start_ts')) == [time_range.from_ts for time_range in ranges]
+    assert accumulator.get_statistics().finish_timestamp >= ranges[-1].to_ts - HOUR
+    # Results of other tasks finished meanwhile are kept for get_result
+    results = dict(pool.get_result() for _ in range(6))
+    assert results[task_id].start_timestamp == ranges[0].from_ts
+    assert sum(stats is None for stats in results.values()) == 5
+    assert len(pool.collect_accumulated()) == 0
@@ -0,0 +1,30 @@
+import pickle
+from copy import copy
+
+import pytest
+
+from trading import Asset, AssetPair, Direction, Order
+
+
+def test_asset_interning() -> None:
+    assert Asset('WAVES') is Asset('WAVES')
+    assert Asset('WAVES') != Asset('USDN')
+    assert pickle.loads(pickle.dumps(Asset('WAVES'))) is Asset('WAVES')
+
+
+def test_asset_pair_interning() -> None:
+    pair = AssetPair(Asset('WAVES'), Asset('USDN'))
+    assert AssetPair('WAVES', 'USDN') is pair
+    assert AssetPair.from_string('WAVES', 'USDN') is pair
+    assert reversed(pair) is AssetPair('USDN', 'WAVES')
+    assert pickle.loads(pickle.dumps(pair)) is pair
+    with pytest.raises(AttributeError):
+        pair.amount_asset = Asset('BTC')  # type: ignore
+
+
+def test_order_is_immutable() -> None:
+    order = Order('1', AssetPair('WAVES', 'USDN'), 1, 2, 0, Direction.BUY)
+    assert copy(order) is order
+    assert pickle.loads(pickle.dumps(order)) == order
+    with pytest.raises(AttributeError):
+        order.price = 3  # type: ignore
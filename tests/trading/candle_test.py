@@ -1,3 +1,7 @@
+import pickle
+from copy import copy
+
+import pytest
 from numpy.random import random
 
 from trading import Candle
@@ -12,3 +16,18 @@ def test_hash_and_eq() -> None:
         assert (candle == same_candle)
         assert (hash(candle) == hash(same_candle))
         assert (candle != other_candle)
+
+
+def test_immutable() -> None:
+    candle = Candle(0, 1, 2, 0, 3, 1)
+    with pytest.raises(AttributeError):
+        candle.close = 5  # type: ignore
+    assert candle.close == 2
+
+
+def test_copy_and_pickle() -> None:
+    candle = Candle(0, 1, 2, 0, 3, 1)
+    assert copy(candle) is candle
+    restored = pickle.loads(pickle.dumps(candle))
+    assert restored == candle
+    assert hash(restored) == hash(candle)
@@ -0,0 +1,111 @@
+import typing as tp
+
+import numpy as np
+import pytest
+
+from market_data_api.market_data_downloader import MarketDataDownloader
+from tests.logger.empty_logger_mock import empty_logger_mock
+from trading import Asset, AssetPair, Candle, TimeRange
+from trading_interface.pair_view import PairView
+from trading_interface.simulator.simulator import Simulator
+from trading_system.indicators import MovingAverageHandler
+from trading_system.trading_system import TradingSystem
+
+WAVES = AssetPair(Asset('WAVES'), Asset('USDN'))
+BTC = AssetPair(Asset('BTC'), Asset('USDN'))
+EXCHANGE_CONFIG = {'price_simulation_type': 'three_interval_path', 'price_shift': 0.,
+                   'clock_simulator': {'candles_lifetime': 2}}
+TIME_RANGE = TimeRange(86400, 86400 + 10 * 3600)
+
+
+def flat_candles(price: float, first_ts: int, to_ts: int) -> tp.List[Candle]:
+    return [Candle(ts, price, price, price, price, 1.) for ts in range(first_ts, to_ts + 1, 3600)]
+
+
+@pytest.fixture
+def candles(monkeypatch: pytest.MonkeyPatch) -> tp.Dict[AssetPair, tp.List[Candle]]:
+    """ WAVES costs 10, BTC costs 1000 and has no candles for the first 3 hours. """
+    candles = {WAVES: flat_candles(10., 0, TIME_RANGE.to_ts),
+               BTC: flat_candles(1000., 3 * 3600, TIME_RANGE.to_ts)}
+    del candles[BTC][5]
+    monkeypatch.setattr(MarketDataDownloader, 'get_candles',
+                        lambda asset_pair, timeframe, time_range: candles[asset_pair])
+    return candles
+
+
+def make_simulator() -> Simulator:
+    return Simulator(TIME_RANGE, {'asset_pairs': [['WAVES', 'USDN'], ['BTC', 'USDN']], 'timeframe': '1h'},
+                     EXCHANGE_CONFIG)
+
+
+def test_streams_aligned(candles: tp.Dict[AssetPair, tp.List[Candle]]) -> None:
+    simulator = make_simulator()
+    assert simulator.get_asset_pairs() == [WAVES, BTC]
+    for _ in range(4):
+        simulator.is_alive()
+    waves_candles = simulator.get_last_n_candles(100)
+    btc_candles = simulator.get_last_n_candles(100, BTC)
+    assert [candle.ts for candle in btc_candles] == [candle.ts for candle in waves_candles]
+    # Before its first candle BTC is flat at its open, the missing candle is flat at the previous close
+    assert btc_candles[0] == Candle(0, 1000., 1000., 1000., 1000., 0.)
+    assert btc_candles[8].volume == 0. and btc_candles[8].close == 1000.
+    assert simulator.get_last_n_columns(3).shape == (2, 3, 6)
+    assert np.array_equal(simulator.get_last_n_columns(3)[1, :, 0],
+                          [candle.ts for candle in btc_candles[-3:]])
+
+
+def test_matching_engine_per_pair(candles: tp.Dict[AssetPair, tp.List[Candle]]) -> None:
+    simulator = make_simulator()
+    btc = simulator.for_pair(BTC)
+    assert isinstance(btc, PairView) and simulator.for_pair(WAVES) is simulator
+    # Only the simulator advances the shared clock
+    timestamp = simulator.get_timestamp()
+    assert btc.is_alive() and btc.is_alive()
+    assert simulator.get_timestamp() == timestamp
+    assert btc.get_buy_price() == 1000. and simulator.get_buy_price() == 10.
+    # Filled against the price of its own pair only
+    waves_order = simulator.buy(1., 11.)
+    btc_order = btc.buy(1., 11.)
+    btc_filled = btc.buy(1., 1001.)
+    simulator.is_alive()
+    assert simulator.order_is_filled(waves_order)
+    assert simulator.order_is_filled(btc_filled)
+    assert not simulator.order_is_filled(btc_order)
+    assert simulator.active_orders == {btc_order}
+    btc.cancel_all()
+    assert not simulator.active_orders
+    with pytest.raises(ValueError):
+        simulator.for_pair(AssetPair(Asset('ETH'), Asset('USDN')))
+    with pytest.raises(ValueError):
+        btc.for_pair(WAVES)
+
+
+def test_single_pair_rejects_others(candles: tp.Dict[AssetPair, tp.List[Candle]]) -> None:
+    simulator = Simulator(TIME_RANGE, {'asset_pair': ['WAVES', 'USDN'], 'timeframe': '1h'},
+                          EXCHANGE_CONFIG)
+    assert simulator.for_pair(WAVES) is simulator
+    with pytest.raises(ValueError):
+        simulator.for_pair(BTC)
+
+
+def test_shared_wallet(candles: tp.Dict[AssetPair, tp.List[Candle]],
+                       empty_logger_mock: empty_logger_mock) -> None:
+    simulator = make_simulator()
+    simulator.is_alive()
+    ts = TradingSystem(simulator, config={'currency_asset': 'USDN',
+                                          'wallet': {'USDN': 2000., 'WAVES': 10., 'BTC': 0.}})
+    assert ts.get_total_balance() == 2100.
+    ts.buy(BTC, 1., 1001.)
+    ts.buy(WAVES, 10., 11.)
+    assert ts.wallet[Asset('USDN')] == 2000. - 1001. - 110.
+    while simulator.is_alive():
+        ts.update()
+    assert ts.wallet[Asset('BTC')] == 1. and ts.wallet[Asset('WAVES')] == 20.
+    assert ts.get_total_balance() == 2000. - 1001. - 110. + 1000. + 200.
+
+    waves_ma = ts.add_handler(MovingAverageHandler, params={'window_size': 2})
+    btc_ma = ts.add_handler(MovingAverageHandler, params={'window_size': 2}, asset_pair=BTC)
+    assert btc_ma is not waves_ma
+    assert 'MovingAverageHandler2[BTC/USDN]' in ts.handlers
+    ts.update()
+    assert waves_ma.get_last_n_values(1) == [10.] and btc_ma.get_last_n_values(1) == [1000.]
@@ -42,6 +42,9 @@ class TradingInterfaceMock(TradingInterface):
     def get_timestamp(self) -> int:
         return len(self.processed_candles)
 
+    def get_asset_pairs(self) -> tp.List[AssetPair]:
+        return [self.asset_pair]
+
     def get_last_n_candles(self, n: int) -> tp.List[Candle]:
         return self.processed_candles[-n:]
 
@@ -0,0 +1,30 @@
+import pytest
+
+from trading_system.abort_rules import AbortRules
+
+
+def test_disabled() -> None:
+    rules = AbortRules()
+    assert not rules.is_enabled()
+    assert rules.update(0, 100, 100) is None
+    assert rules.update(60, 10, 100) is None
+    assert rules.max_drawdown == pytest.approx(90)
+    assert rules.calc_pnl() == pytest.approx(-90)
+
+
+def test_max_drawdown() -> None:
+    rules = AbortRules({'max_drawdown': 20, 'grace_period': '2m'})
+    assert rules.update(0, 100, 100) is None
+    assert rules.update(60, 70, 100) is None  # grace period
+    assert rules.update(120, 150, 100) is None
+    assert rules.update(180, 125, 100) is None
+    assert rules.drawdown == pytest.approx(100 / 6)
+    assert 'drawdown' in rules.update(240, 110, 100)
+    assert rules.update(300, 150, 100) is not None
+
+
+def test_hodl_underperformance() -> None:
+    rules = AbortRules({'max_hodl_underperformance': 10})
+    assert rules.update(0, 100, 100) is None
+    assert rules.update(60, 105, 110) is None
+    assert 'HODL' in rules.update(120, 105, 120)
@@ -0,0 +1,48 @@
+import math
+
+import pytest
+
+from trading import Direction
+from trading_system.equity_log import EquityLog, SECONDS_PER_YEAR
+
+
+@pytest.fixture
+def equity_log() -> EquityLog:
+    log = EquityLog()
+    log.add_candle(0, 100, 0, 10)
+    log.add_fill(30, Direction.BUY, 5, 10, 0)
+    log.add_candle(60, 110, 5, 12)
+    log.add_fill(90, Direction.SELL, 2, 12, 1)
+    log.add_candle(120, 99, 3, 11)
+    log.add_fill(150, Direction.SELL, 3, 9, 0)
+    log.add_candle(180, 132, 0, 9)
+    return log
+
+
+def test_columns(equity_log: EquityLog) -> None:
+    assert equity_log.candles.get('fills').tolist() == [0, 1, 1, 1]
+    assert equity_log.candles.get('volume').tolist() == [0, 50, 24, 27]
+    assert equity_log.get_equity().tolist() == [100, 110, 98, 131]
+    equity_log.shrink()
+    assert len(equity_log.candles.get('ts')) == 4
+
+
+def test_metrics(equity_log: EquityLog) -> None:
+    returns = [0.1, 98 / 110 - 1, 131 / 98 - 1]
+    mean = sum(returns) / 3
+    std = math.sqrt(sum((r - mean) ** 2 for r in returns) / 3)
+    downside = math.sqrt((98 / 110 - 1) ** 2 / 3)
+    periods = math.sqrt(SECONDS_PER_YEAR / 60)
+    assert equity_log.calc_sharpe_ratio() == pytest.approx(mean / std * periods)
+    assert equity_log.calc_sortino_ratio() == pytest.approx(mean / downside * periods)
+    assert equity_log.calc_max_drawdown() == pytest.approx((1 - 98 / 110) * 100)
+    assert equity_log.calc_exposure() == pytest.approx((60 / 110 + 33 / 99) / 4 * 100)
+    assert equity_log.calc_turnover() == pytest.approx(101 / (439 / 4))
+    assert equity_log.calc_win_rate() == 50
+
+
+def test_empty_log() -> None:
+    log = EquityLog()
+    assert log.calc_sharpe_ratio() == 0
+    assert log.calc_max_drawdown() == 0
+    assert log.calc_win_rate() == 0
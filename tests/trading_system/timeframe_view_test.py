@@ -0,0 +1,59 @@
+import typing as tp
+
+from tests.logger.empty_logger_mock import empty_logger_mock
+from tests.trading_interface.trading_interface_mock import TradingInterfaceMock
+from trading import Candle, Timeframe
+from trading_system.indicators import MovingAverageHandler
+from trading_system.timeframe_view import TimeframeView
+from trading_system.trading_system import TradingSystem
+
+
+def make_candles(count: int, first_ts: int = 0) -> tp.List[Candle]:
+    """ Minute candles with price equal to the minute. """
+    return [Candle(ts, ts // 60, ts // 60 + 1, ts // 60 - 1, ts // 60 + 2, 1.)
+            for ts in range(first_ts, first_ts + count * 60, 60)]
+
+
+def test_candles_close_with_their_frame() -> None:
+    ti = TradingInterfaceMock(make_candles(12))
+    view = TimeframeView(ti, Timeframe('1m'), Timeframe('5m'))
+    closed = []
+    while ti.update():
+        closed.append(len(view.get_last_n_candles(10)))
+    assert closed == [0, 0, 0, 0, 1, 1, 1, 1, 1, 2, 2, 2]
+    assert view.get_last_n_candles(2) == [Candle(0, 0, 5, -1, 6, 5.),
+                                          Candle(300, 5, 10, 4, 11, 5.)]
+
+
+def test_history_and_missed_candles() -> None:
+    ti = TradingInterfaceMock(make_candles(30, first_ts=120))
+    for _ in range(10):
+        ti.update()
+    view = TimeframeView(ti, Timeframe('1m'), Timeframe('5m'))
+    # The period started at 0 is incomplete
+    assert [candle.ts for candle in view.get_last_n_candles(10)] == [300]
+
+    for _ in range(10):
+        ti.update()
+    assert [candle.ts for candle in view.get_last_n_candles(10)] == [300, 600, 900]
+    assert view.get_last_n_candles(1)[0].volume == 5
+
+
+def test_handlers_of_timeframes(empty_logger_mock: empty_logger_mock) -> None:
+    ti = TradingInterfaceMock(make_candles(20))
+    ti.update()
+    ts = TradingSystem(ti, config={'currency_asset': 'USDN', 'wallet': {'USDN': 100.}},
+                       timeframe=Timeframe('1m'))
+    minute = ts.add_handler(MovingAverageHandler, params={'window_size': 2})
+    five_minutes = ts.add_handler(MovingAverageHandler, params={'window_size': 2}, timeframe='5m')
+    assert minute is not five_minutes
+    assert ts.add_handler(MovingAverageHandler, params={'window_size': 2}, timeframe='5m') \
+        is five_minutes
+    assert ts.add_handler(MovingAverageHandler, params={'window_size': 2}, timeframe='1m') \
+        is minute
+
+    while ti.update():
+        ts.update()
+    assert len(minute.get_last_n_values(100)) == 19
+    # Moving averages of mid prices of candles at 0 and 300, 300 and 600, 600 and 900
+    assert five_minutes.get_last_n_values(100) == [5., 10., 15.]
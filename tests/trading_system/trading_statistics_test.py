@@ -0,0 +1,87 @@
+import math
+import typing as tp
+
+import pytest
+
+from helpers.profiler import Profiler
+from trading import Asset
+from trading_system.trading_statistics import (StatisticsAccumulator,
+                                               TradingStatistics)
+
+
+def make_stats(start_ts: int, initial_balance: float, final_balance: float,
+               final_wallet: float) -> TradingStatistics:
+    stats = TradingStatistics(price_asset=Asset('USDN'),
+                              initial_wallet={Asset('USDN'): initial_balance},
+                              initial_balance=initial_balance,
+                              start_timestamp=start_ts)
+    stats.set_final_wallet({Asset('USDN'): final_wallet, Asset('WAVES'): 1})
+    stats.set_final_balance(final_balance)
+    stats.set_hodl_result(initial_balance)
+    stats.set_finish_timestamp(start_ts + 60)
+    stats.add_candle(start_ts, initial_balance, 0, 1)
+    stats.add_candle(start_ts + 60, final_balance, 1, 1)
+    stats.filled_order_count = 2
+    return stats
+
+
+@pytest.fixture
+def stats_array() -> tp.List[TradingStatistics]:
+    return [make_stats(ts, 100, 100 + delta, 90 + delta)
+            for ts, delta in [(120, 10), (0, -20), (60, 5)]]
+
+
+def test_merge(stats_array: tp.List[TradingStatistics]) -> None:
+    stats = TradingStatistics.merge(stats_array)
+    assert stats.initial_wallet == {Asset('USDN'): 300}
+    assert stats.final_wallet == {Asset('USDN'): 265, Asset('WAVES'): 3}
+    assert stats.initial_balance == 300
+    assert stats.final_balance == 295
+    assert stats.hodl_result == 300
+    assert stats.start_timestamp == 0
+    assert stats.finish_timestamp == 180
+    assert stats.filled_order_count == 6
+    assert stats.equity_log is None
+
+    with pytest.raises(ValueError):
+        TradingStatistics.merge([])
+
+
+def test_accumulator_is_monoid(stats_array: tp.List[TradingStatistics]) -> None:
+    whole = StatisticsAccumulator.from_statistics(stats_array)
+    left = StatisticsAccumulator.from_statistics(stats_array[:1])
+    right = StatisticsAccumulator.from_statistics(stats_array[1:])
+    combined = StatisticsAccumulator().merge(left).merge(StatisticsAccumulator()).merge(right)
+    assert len(combined) == 3
+    assert vars(combined.get_statistics()) == vars(whole.get_statistics())
+
+
+def test_results_table(stats_array: tp.List[TradingStatistics]) -> None:
+    table = StatisticsAccumulator.from_statistics(stats_array).table
+    assert table.calc_relative_delta().tolist() == [10, -20, 5]
+    assert not math.isnan(table.get('sharpe')[0])
+
+    summary = table.get_summary()
+    assert summary['runs'] == 3
+    assert summary['profitable(%)'] == pytest.approx(200 / 3)
+    assert summary['median delta(%)'] == 5
+    assert summary['min delta(%)'] == -20
+    assert summary['mean max_drawdown'] == pytest.approx(20 / 3)
+    assert 'runs:' in str(table)
+
+
+def test_pruned_runs(stats_array: tp.List[TradingStatistics]) -> None:
+    stats_array[1].set_pruned('drawdown')
+    accumulator = StatisticsAccumulator.from_statistics(stats_array)
+    assert accumulator.table.get('pruned').tolist() == [False, True, False]
+    assert accumulator.table.get_summary()['pruned(%)'] == pytest.approx(100 / 3)
+    assert accumulator.get_statistics().pruned_reason == '1 of 3 runs'
+    assert 'pruned' in str(stats_array[1])
+
+
+def test_merge_profiles(stats_array: tp.List[TradingStatistics]) -> None:
+    for stats in stats_array[:2]:
+        stats.profile = Profiler()
+        stats.profile.get_component('strategy:update').add(1000)
+    merged = TradingStatistics.merge(stats_array)
+    assert merged.profile.get_summary()[0]['calls'] == 2
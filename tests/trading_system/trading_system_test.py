@@ -119,3 +119,42 @@ def test_trading_system_get_total_balance(ti: TradingInterfaceMock, ts, empty_lo
     ti.update()
     assert pytest.approx(ts.get_total_balance(), 1e-6) == \
            (20 * ts.get_price_by_direction(Direction.SELL))
+
+
+@pytest.mark.parametrize('ts', [real_ti], indirect=True)
+@pytest.mark.parametrize('ti', [real_ti])
+def test_trading_system_equity_log(ti: TradingInterfaceMock, ts, empty_logger_mock):
+    ti.refresh()
+    ts.order_fee = 0.5
+    ti.update()
+    ts.update()
+    ts.buy(AssetPair(Asset('WAVES'), Asset('USDN')), amount=1, price=10)
+    ti.update()
+    ts.update()
+    stats = ts.get_trading_statistics()
+    candles = stats.equity_log.candles
+    assert len(candles) == 3
+    assert candles.get('fills').tolist() == [0, 0, 1]
+    assert candles.get('position').tolist() == [10, 10, 11]
+    assert candles.get('balance')[2] == pytest.approx(ts.get_total_balance())
+    assert stats.equity_log.get_equity()[2] == pytest.approx(ts.get_total_balance() - 0.5)
+    assert set(stats.get_risk_metrics()) == {'sharpe', 'sortino', 'max_drawdown',
+                                             'exposure', 'turnover', 'win_rate'}
+
+
+def test_trading_system_abort_rules(empty_logger_mock):
+    ti = TradingInterfaceMock.from_price_values([10, 10, 5, 5])
+    ts = TradingSystem(ti, config={"currency_asset": "USDN",
+                                   "wallet": {"USDN": 0.0, "WAVES": 10.0},
+                                   "abort_rules": {"max_drawdown": 30}})
+    ti.refresh()
+    for _ in range(2):
+        ti.update()
+        ts.update()
+    assert not ts.is_aborted()
+    ti.update()
+    ts.update()
+    assert ts.is_aborted()
+    stats = ts.get_trading_statistics()
+    assert stats.is_pruned()
+    assert 'drawdown' in stats.pruned_reason
@@ -0,0 +1,34 @@
+import numpy as np
+
+from visualizer.downsampling import aggregate_ohlc, get_bucket_size, lttb_indices
+
+
+def test_aggregate_ohlc() -> None:
+    candle_params = {
+        'ts': np.arange(5),
+        'open': np.array([1., 2., 3., 4., 5.]),
+        'close': np.array([2., 3., 4., 5., 6.]),
+        'high': np.array([3., 7., 5., 6., 7.]),
+        'low': np.array([0., 1., 2., 3., -1.]),
+    }
+    assert get_bucket_size(5, 2) == 3
+    aggregated = aggregate_ohlc(candle_params, 3)
+    assert aggregated['ts'].tolist() == [0, 3]
+    assert aggregated['open'].tolist() == [1., 4.]
+    assert aggregated['close'].tolist() == [4., 6.]
+    assert aggregated['high'].tolist() == [7., 7.]
+    assert aggregated['low'].tolist() == [0., -1.]
+    assert aggregate_ohlc(candle_params, 1) is candle_params
+
+
+def test_lttb_keeps_extremes() -> None:
+    x = np.arange(1000)
+    y = np.zeros(1000)
+    y[500] = 10
+    y[700] = -10
+    indices = lttb_indices(x, y, 50)
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+    assert 500 in indices and 700 in indices
+    assert lttb_indices(x[:10], y[:10], 50).tolist() == list(range(10))
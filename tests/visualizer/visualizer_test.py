@@ -0,0 +1,127 @@
+from pathlib import Path
+
+import pytest
+
+from logger.event_log import EventLogWriter
+from logger.log_events import NewCandleEvent, RSIEvent
+from trading import Candle, TimeRange
+from visualizer.visualize_log import create_visualizer_from_log, decompose_log, load_decomposed_log
+from visualizer.visualizer import Visualizer, timestamp_to_hhmm
+
+
+def _get_visualizer() -> Visualizer:
+    vis = Visualizer()
+    vis.add_candles([Candle(ts, 10 + i, 11 + i, 12 + i, 9 + i, 1)
+                     for i, ts in enumerate(range(300, 3300, 300))])
+    vis.add_curve([{'ts': ts, 'value': float(ts), 'value_fmt': '',
+                    'min_value': None, 'max_value': None}
+                   for ts in range(600, 3300, 600)], 'Curve')
+    vis.add_buy_events([310, 910, 920], [1., 1., 1.], [1., 1., 1.], ['', '', ''])
+    vis.add_sell_events([], [], [], [])
+    return vis
+
+
+def test_layer_contains_history_of_its_moment() -> None:
+    vis = _get_visualizer()
+    assert vis.get_layers_count() == 10
+
+    layer = vis.get_layer(2)
+    assert layer.ts == 900
+    assert len(layer.left_candle_trace.x) == 2
+    assert len(layer.right_candle_trace.x) == 8
+    assert list(layer.curve_traces[0].y) == [600.]
+    assert len(layer.buy_trace.x) == 3
+    assert layer.buy_trace.y[2] < layer.buy_trace.y[1]
+    assert len(layer.sell_trace.x) == 0
+
+    assert vis.get_layer_index(900) == vis.get_layer_index(1000) == 2
+    assert vis.get_layer_index(0) == 0 and vis.get_layer_ts(2) == 900
+
+    first = vis.get_layer(0)
+    assert len(first.buy_trace.x) == 1
+    assert len(first.curve_traces[0].x) == 0
+
+
+def test_plot_has_time_slider() -> None:
+    vis = _get_visualizer()
+    fig = vis.plot()
+    steps = fig.layout.sliders[0].steps
+    assert len(steps) == 10
+    assert len(fig.data) == sum(len(vis.get_layer(i).get_traces()) for i in range(10))
+    assert [trace.visible for trace in fig.data] == list(steps[-1].args[0]['visible'])
+
+    steps = vis.plot(max_frames=4).layout.sliders[0].steps
+    assert [step.label for step in steps] == \
+           [timestamp_to_hhmm(ts) for ts in (300, 1200, 2100, 3000)]
+    assert not vis.get_layout().sliders
+
+
+def test_layer_is_downsampled_to_time_range() -> None:
+    vis = Visualizer(max_points=3)
+    vis.add_candles([Candle(ts, 10, 11, 12, 9, 1) for ts in range(300, 3300, 300)])
+    vis.add_curve([{'ts': ts, 'value': float(ts), 'value_fmt': '',
+                    'min_value': None, 'max_value': None}
+                   for ts in range(300, 3300, 300)], 'Curve')
+
+    layer = vis.get_layer(9)
+    assert len(layer.left_candle_trace.x) == 3
+    assert len(layer.curve_traces[0].x) == 3
+
+    layer = vis.get_layer(4, TimeRange(600, 1200))
+    assert len(layer.left_candle_trace.x) + len(layer.right_candle_trace.x) == 3
+    assert list(layer.curve_traces[0].y) == [600., 900., 1200.]
+    assert len(layer.buy_trace.x) == 0
+
+
+def test_load_decomposed_log(tmp_path: Path) -> None:
+    path = tmp_path / 'log.dump'
+    writer = EventLogWriter(path, chunk_size=4)
+    for ts in range(300, 3300, 300):
+        writer.append({**NewCandleEvent(Candle(ts, 10, 11, 12, 9, 1)).obj,
+                       'ts': ts, 'event_type': NewCandleEvent})
+        writer.append({**RSIEvent(50).obj, 'ts': ts, 'event_type': RSIEvent})
+    writer.close()
+
+    decomposed_log = load_decomposed_log(path, TimeRange(900, 1800))
+    assert [event['ts'] for event in decomposed_log[NewCandleEvent]] == \
+           [900, 1200, 1500, 1800]
+    assert len(decomposed_log[RSIEvent]) == 4
+    assert create_visualizer_from_log(decomposed_log).get_layers_count() == 4
+
+
+def test_extend_and_trim() -> None:
+    vis = _get_visualizer()
+    new_candles = vis.extend_candles([Candle(ts, 20, 21, 22, 19, 1)
+                                      for ts in range(3300, 4500, 300)])
+    assert list(new_candles['open']) == [20.] * 4
+    new_buys = vis.extend_buy_events([3310], [1.], [1.], [''])
+    assert list(new_buys['y']) == [20.]
+    assert vis.get_layers_count() == 14
+
+    vis.trim(5)
+    assert vis.get_layers_count() == 5
+    layer = vis.get_layer(4)
+    assert len(layer.buy_trace.x) == 1
+    assert list(layer.curve_traces[0].y) == [3000.]
+
+
+def test_session_without_candles_yet() -> None:
+    vis = create_visualizer_from_log(decompose_log([]))
+    assert vis.get_layers_count() == 0
+
+    vis.extend_candles([Candle(ts, 20, 21, 22, 19, 1) for ts in range(300, 1500, 300)])
+    assert vis.get_layers_count() == 4
+    assert vis.get_layer(3).ts == 1200
+
+
+def test_normalized_curve_follows_price_range() -> None:
+    vis = _get_visualizer()
+    vis.add_curve([{'ts': 300, 'value': 50., 'value_fmt': '', 'min_value': 0., 'max_value': 100.}],
+                  'RSI')
+    new_points = vis.extend_curve([{'ts': 600, 'value': 50., 'value_fmt': '',
+                                    'min_value': 0., 'max_value': 100.}], 'RSI')
+    assert list(new_points['y']) == pytest.approx([sum(vis.get_y_range()) / 2])
+
+    vis.extend_candles([Candle(ts, 40, 41, 42, 39, 1) for ts in range(3300, 4500, 300)])
+    # Points added before the price range changed are scaled to the new one
+    assert list(vis.get_layer(13).curve_traces[1].y) == pytest.approx([sum(vis.get_y_range()) / 2] * 2)
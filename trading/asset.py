@@ -1,33 +1,117 @@
+from __future__ import annotations
+
 import typing as tp
 
 
 class Asset:
-    def __init__(self, asset_name: str):
-        self.name = asset_name
+    """
+    Immutable asset. Instances are interned by name,
+    so equal assets are the same object.
+    """
+    __slots__ = ('name', '_hash')
+
+    _instances: tp.Dict[str, Asset] = {}
+
+    name: str
+    _hash: int
+
+    def __new__(cls, asset_name: str) -> Asset:
+        instance = cls._instances.get(asset_name)
+        if instance is None:
+            instance = super().__new__(cls)
+            object.__setattr__(instance, 'name', asset_name)
+            object.__setattr__(instance, '_hash', hash(asset_name))
+            cls._instances[asset_name] = instance
+        return instance
 
     def __repr__(self) -> str:
         return self.name
 
     def __hash__(self) -> int:
-        return hash(self.name)
+        return self._hash
 
     def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
         if isinstance(other, Asset):
             return self.name == other.name
         return False
 
+    def __setattr__(self, name: str, value: tp.Any) -> None:
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __reduce__(self) -> tp.Tuple[tp.Any, ...]:
+        return Asset, (self.name,)
+
+    def __copy__(self) -> Asset:
+        return self
+
+    def __deepcopy__(self, memo: tp.Dict[int, tp.Any]) -> Asset:
+        return self
+
 
 class AssetPair:
-    def __init__(self, amount_asset: tp.Union[Asset, str], price_asset: tp.Union[Asset, str]):
-        self.amount_asset: Asset = amount_asset if isinstance(amount_asset, Asset) else Asset(amount_asset)
-        self.price_asset: Asset = price_asset if isinstance(price_asset, Asset) else Asset(price_asset)
+    """
+    Immutable asset pair. Instances are interned by asset names,
+    so equal pairs are the same object.
+    """
+    __slots__ = ('amount_asset', 'price_asset', '_hash')
+
+    _instances: tp.Dict[tp.Tuple[str, str], AssetPair] = {}
+
+    amount_asset: Asset
+    price_asset: Asset
+    _hash: int
+
+    def __new__(cls, amount_asset: tp.Union[Asset, str],
+                price_asset: tp.Union[Asset, str]) -> AssetPair:
+        amount = amount_asset if isinstance(amount_asset, Asset) else Asset(amount_asset)
+        price = price_asset if isinstance(price_asset, Asset) else Asset(price_asset)
+        key = (amount.name, price.name)
+        instance = cls._instances.get(key)
+        if instance is None:
+            instance = super().__new__(cls)
+            object.__setattr__(instance, 'amount_asset', amount)
+            object.__setattr__(instance, 'price_asset', price)
+            object.__setattr__(instance, '_hash', hash(key))
+            cls._instances[key] = instance
+        return instance
 
     @classmethod
-    def from_string(cls, amount_asset: str, price_asset: str) -> 'AssetPair':
+    def from_string(cls, amount_asset: str, price_asset: str) -> AssetPair:
         return cls(Asset(amount_asset), Asset(price_asset))
 
     def __repr__(self) -> str:
         return f"{self.amount_asset}/{self.price_asset}"
 
-    def __reversed__(self) -> 'AssetPair':
+    def __reversed__(self) -> AssetPair:
         return AssetPair(self.price_asset, self.amount_asset)
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
+        if isinstance(other, AssetPair):
+            return self.amount_asset == other.amount_asset and \
+                   self.price_asset == other.price_asset
+        return False
+
+    def __setattr__(self, name: str, value: tp.Any) -> None:
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __reduce__(self) -> tp.Tuple[tp.Any, ...]:
+        return AssetPair, (self.amount_asset.name, self.price_asset.name)
+
+    def __copy__(self) -> AssetPair:
+        return self
+
+    def __deepcopy__(self, memo: tp.Dict[int, tp.Any]) -> AssetPair:
+        return self
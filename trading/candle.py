@@ -1,15 +1,31 @@
 from __future__ import annotations
 
+import typing as tp
+
 
 class Candle:
+    """
+    Immutable candle. Hash is computed on construction.
+    """
+    __slots__ = ('ts', 'open', 'close', 'low', 'high', 'volume', '_hash')
+
+    ts: int
+    open: float
+    close: float
+    low: float
+    high: float
+    volume: float
+    _hash: int
+
     def __init__(self, ts: int, open: float, close: float,
                  low: float, high: float, volume: float):
-        self.ts = ts
-        self.open = open
-        self.close = close
-        self.low = low
-        self.high = high
-        self.volume = volume
+        _set_ts(self, ts)
+        _set_open(self, open)
+        _set_close(self, close)
+        _set_low(self, low)
+        _set_high(self, high)
+        _set_volume(self, volume)
+        _set_hash(self, hash((ts, open, close, low, high, volume)))
 
     def get_lower_price(self) -> float:
         return min(self.open, self.close)
@@ -32,10 +48,33 @@ class Candle:
                f"Volume: {self.volume}"
 
     def __hash__(self) -> int:
-        return hash((self.ts, self.open, self.close, self.low, self.high, self.volume))
+        return self._hash
 
     def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
         if isinstance(other, Candle):
             return (self.ts, self.open, self.close, self.low, self.high, self.volume) \
                    == (other.ts, other.open, other.close, other.low, other.high, other.volume)
         return False
+
+    def __setattr__(self, name: str, value: tp.Any) -> None:
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __reduce__(self) -> tp.Tuple[tp.Any, ...]:
+        return Candle, (self.ts, self.open, self.close,
+                        self.low, self.high, self.volume)
+
+    def __copy__(self) -> Candle:
+        return self
+
+    def __deepcopy__(self, memo: tp.Dict[int, tp.Any]) -> Candle:
+        return self
+
+
+# Setters of the slots bypassing __setattr__, cheaper than object.__setattr__ per field
+_set_ts, _set_open, _set_close, _set_low, _set_high, _set_volume, _set_hash = \
+    (Candle.__dict__[name].__set__ for name in Candle.__slots__)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 from enum import IntEnum
+import typing as tp
 
 from trading import AssetPair
 
@@ -18,14 +19,29 @@ class Direction(IntEnum):
 
 
 class Order:
+    """
+    Immutable order. Identity is defined by order_id.
+    """
+    __slots__ = ('order_id', 'asset_pair', 'amount', 'price',
+                 'timestamp', 'direction', '_hash')
+
+    order_id: str
+    asset_pair: AssetPair
+    amount: float
+    price: float
+    timestamp: int
+    direction: Direction
+    _hash: int
+
     def __init__(self, order_id: str, asset_pair: AssetPair, amount: float,
                  price: float, timestamp: int, direction: Direction):
-        self.order_id = order_id
-        self.asset_pair = asset_pair
-        self.amount = amount
-        self.price = price
-        self.timestamp = timestamp
-        self.direction = direction
+        _set_order_id(self, order_id)
+        _set_asset_pair(self, asset_pair)
+        _set_amount(self, amount)
+        _set_price(self, price)
+        _set_timestamp(self, timestamp)
+        _set_direction(self, direction)
+        _set_hash(self, hash(order_id))
 
     def __repr__(self) -> str:
         return f"Order{self.order_id[:min(len(self.order_id), 10)]}"
@@ -39,9 +55,32 @@ class Order:
                f"Direction: {self.direction}"
 
     def __hash__(self) -> int:
-        return hash(self.order_id)
+        return self._hash
 
     def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
         if isinstance(other, Order):
             return self.order_id == other.order_id
         return False
+
+    def __setattr__(self, name: str, value: tp.Any) -> None:
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __reduce__(self) -> tp.Tuple[tp.Any, ...]:
+        return Order, (self.order_id, self.asset_pair, self.amount,
+                       self.price, self.timestamp, self.direction)
+
+    def __copy__(self) -> Order:
+        return self
+
+    def __deepcopy__(self, memo: tp.Dict[int, tp.Any]) -> Order:
+        return self
+
+
+# Setters of the slots bypassing __setattr__, cheaper than object.__setattr__ per field
+_set_order_id, _set_asset_pair, _set_amount, _set_price, _set_timestamp, _set_direction, \
+    _set_hash = (Order.__dict__[name].__set__ for name in Order.__slots__)
@@ -1,10 +1,29 @@
+from __future__ import annotations
+
 import typing as tp
 
 
 class Signal:
+    __slots__ = ('name', 'content')
+
+    name: str
+    content: tp.Any
+
     def __init__(self, name: str, content: tp.Any):
-        self.name = name
-        self.content = content
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'content', content)
 
     def __repr__(self) -> str:
         return f'Signal {self.name}: {self.content}'
+
+    def __setattr__(self, name: str, value: tp.Any) -> None:
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __reduce__(self) -> tp.Tuple[tp.Any, ...]:
+        return Signal, (self.name, self.content)
+
+    def __copy__(self) -> Signal:
+        return self
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import typing as tp
+from abc import abstractmethod
+
+from trading import AssetPair, Order, Candle
+from trading_interface.trading_interface import TradingInterface
+
+
+class MultiPairTradingInterface(TradingInterface):
+    """
+    Interface trading all its asset pairs on one clock. Methods trade
+    the first pair unless asset_pair is given, for_pair returns a PairView
+    trading another pair.
+    """
+
+    @abstractmethod
+    def is_running(self) -> bool:
+        """ Whether the interface still trades, unlike is_alive it does not advance the clock. """
+        pass
+
+    @abstractmethod
+    def buy(self, amount: float, price: float,
+            asset_pair: tp.Optional[AssetPair] = None) -> tp.Optional[Order]:
+        pass
+
+    @abstractmethod
+    def sell(self, amount: float, price: float,
+             asset_pair: tp.Optional[AssetPair] = None) -> tp.Optional[Order]:
+        pass
+
+    @abstractmethod
+    def cancel_all(self, asset_pair: tp.Optional[AssetPair] = None) -> None:
+        """ Cancels orders of asset_pair, of all pairs by default. """
+        pass
+
+    @abstractmethod
+    def get_buy_price(self, asset_pair: tp.Optional[AssetPair] = None) -> float:
+        pass
+
+    @abstractmethod
+    def get_sell_price(self, asset_pair: tp.Optional[AssetPair] = None) -> float:
+        pass
+
+    @abstractmethod
+    def get_last_n_candles(self, n: int,
+                           asset_pair: tp.Optional[AssetPair] = None) -> tp.List[Candle]:
+        pass
+
+    def for_pair(self, asset_pair: AssetPair) -> TradingInterface:
+        asset_pairs = self.get_asset_pairs()
+        if asset_pair == asset_pairs[0]:
+            return self
+        if asset_pair not in asset_pairs:
+            raise ValueError(f'{asset_pair} is not traded by {type(self).__name__}')
+        return PairView(self, asset_pair)
+
+
+class PairView(TradingInterface):
+    """
+    Multi pair interface as handlers and orders of one of its asset pairs see it.
+    Only the parent interface advances the shared clock, is_alive of a view does not.
+    """
+
+    def __init__(self, trading_interface: MultiPairTradingInterface, asset_pair: AssetPair):
+        self.ti = trading_interface
+        self.asset_pair = asset_pair
+
+    def is_alive(self) -> bool:
+        return self.ti.is_running()
+
+    def stop_trading(self) -> None:
+        self.ti.stop_trading()
+
+    def get_timestamp(self) -> int:
+        return self.ti.get_timestamp()
+
+    def get_asset_pairs(self) -> tp.List[AssetPair]:
+        return [self.asset_pair]
+
+    def buy(self, amount: float, price: float) -> tp.Optional[Order]:
+        return self.ti.buy(amount, price, self.asset_pair)
+
+    def sell(self, amount: float, price: float) -> tp.Optional[Order]:
+        return self.ti.sell(amount, price, self.asset_pair)
+
+    def cancel_order(self, order: Order) -> bool:
+        return self.ti.cancel_order(order)
+
+    def cancel_all(self) -> None:
+        self.ti.cancel_all(self.asset_pair)
+
+    def order_is_filled(self, order: Order) -> bool:
+        return self.ti.order_is_filled(order)
+
+    def get_buy_price(self) -> float:
+        return self.ti.get_buy_price(self.asset_pair)
+
+    def get_sell_price(self) -> float:
+        return self.ti.get_sell_price(self.asset_pair)
+
+    def get_last_n_candles(self, n: int) -> tp.List[Candle]:
+        return self.ti.get_last_n_candles(n, self.asset_pair)
+
+    def get_orderbook(self):  # type: ignore
+        return self.ti.get_orderbook()
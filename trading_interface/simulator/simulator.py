@@ -1,41 +1,102 @@
 import datetime
 import typing as tp
-from copy import copy
+
+import numpy as np
 
 from helpers.typing.common_types import Config
 
 from trading_interface.simulator.clock_simulator import ClockSimulator
-from trading_interface.trading_interface import TradingInterface
+from trading_interface.pair_view import MultiPairTradingInterface
+from market_data_api import candle_columns
 from market_data_api.market_data_downloader import MarketDataDownloader
 
 from trading import Order, Direction, AssetPair, Timeframe, TimeRange, Candle
 from trading_interface.simulator.price_simulator import PriceSimulator, PriceSimulatorType
 
 
-class Simulator(TradingInterface):
+class PairMarket:
+    """ Candles, the price path and the matching engine of one asset pair. """
+
+    def __init__(self, asset_pair: AssetPair, candles: tp.List[Candle],
+                 price_simulator: PriceSimulator):
+        self.asset_pair = asset_pair
+        self.candles = candles
+        self.price_simulator = price_simulator
+        self.active_orders: tp.Set[Order] = set()
+
+    def fill_orders(self, buy_price: float, sell_price: float) -> tp.List[Order]:
+        """ Removes and returns the orders filled at the prices. """
+        if not self.active_orders:
+            return []
+        filled_orders = [order for order in self.active_orders
+                         if (order.direction == Direction.BUY and order.price > sell_price) or
+                         (order.direction == Direction.SELL and order.price < buy_price)]
+        self.active_orders.difference_update(filled_orders)
+        return filled_orders
+
+
+class Simulator(MultiPairTradingInterface):
+    """
+    Trades asset_pair of trading_config, or all asset_pairs of it on one clock:
+    candles of the pairs are aligned to the first pair ones and every pair has
+    its own matching engine.
+    """
+
     def __init__(self, time_range: TimeRange, trading_config: Config, exchange_config: Config):
         ts_offset = int(datetime.timedelta(days=1).total_seconds())
         self.clock = ClockSimulator(
             start_ts=time_range.from_ts,
             timeframe=Timeframe(trading_config['timeframe']),
             config=exchange_config['clock_simulator'])
-        self.asset_pair = AssetPair(*trading_config['asset_pair'])
+        self.asset_pairs = self.__get_asset_pairs(trading_config)
+        self.asset_pair = self.asset_pairs[0]
         self.candle_index_offset = ts_offset // self.clock.get_seconds_per_candle()
-        self.active_orders: tp.Set[Order] = set()
         self.last_used_order_id = 0
         self.filled_order_ids: tp.Set[int] = set()
         self.price_shift = float(exchange_config['price_shift'])
-        self.price_simulator = PriceSimulator(
-            candles_lifetime=self.clock.candles_lifetime,
-            simulation_type=PriceSimulatorType(exchange_config['price_simulation_type']))
+        simulation_type = PriceSimulatorType(exchange_config['price_simulation_type'])
+        candles_range = TimeRange(time_range.from_ts - ts_offset, time_range.to_ts)
         self.candles = MarketDataDownloader.get_candles(
             asset_pair=self.asset_pair,
             timeframe=self.clock.get_timeframe(),
-            time_range=TimeRange(time_range.from_ts - ts_offset, time_range.to_ts))
+            time_range=candles_range)
+        columns = [candle_columns.from_candles(self.candles)]
+        for asset_pair in self.asset_pairs[1:]:
+            values = candle_columns.from_candles(MarketDataDownloader.get_candles(
+                asset_pair=asset_pair,
+                timeframe=self.clock.get_timeframe(),
+                time_range=candles_range))
+            columns.append(candle_columns.align(values, columns[0][:, candle_columns.TS]))
+        # Candles of all pairs as an array of shape (pairs, candles, 6)
+        self.columns = np.stack(columns)
+        self.markets = {
+            asset_pair: PairMarket(
+                asset_pair,
+                self.candles if i == 0 else candle_columns.to_candles(self.columns[i]),
+                PriceSimulator(self.clock.candles_lifetime, simulation_type))
+            for i, asset_pair in enumerate(self.asset_pairs)}
+
+    @staticmethod
+    def __get_asset_pairs(trading_config: Config) -> tp.List[AssetPair]:
+        asset_pairs = [AssetPair(*asset_pair) for asset_pair in trading_config.get('asset_pairs', [])]
+        if 'asset_pair' in trading_config:
+            asset_pair = AssetPair(*trading_config['asset_pair'])
+            asset_pairs = [asset_pair] + [pair for pair in asset_pairs if pair != asset_pair]
+        if not asset_pairs:
+            raise ValueError('No asset pairs to simulate')
+        return asset_pairs
+
+    @property
+    def active_orders(self) -> tp.Set[Order]:
+        """ Active orders of all pairs. """
+        return set().union(*(market.active_orders for market in self.markets.values()))
 
     def is_alive(self) -> bool:
         self.__fill_orders()
         self.clock.next_iteration()
+        return self.is_running()
+
+    def is_running(self) -> bool:
         return self.__get_current_candle_index(truncated_index=False) < len(self.candles)
 
     def stop_trading(self) -> None:
@@ -47,69 +108,89 @@ class Simulator(TradingInterface):
     def get_timestamp(self) -> int:
         return self.clock.get_timestamp()
 
-    def buy(self, amount: float, price: float) -> tp.Optional[Order]:
-        order = Order(order_id=self.__get_new_order_id(),
-                      asset_pair=self.asset_pair,
-                      amount=amount,
-                      price=price,
-                      timestamp=self.clock.get_timestamp(),
-                      direction=Direction.BUY)
-        self.active_orders.add(copy(order))
-        return order
+    def get_asset_pairs(self) -> tp.List[AssetPair]:
+        return list(self.asset_pairs)
 
-    def sell(self, amount: float, price: float) -> tp.Optional[Order]:
-        order = Order(order_id=self.__get_new_order_id(),
-                      asset_pair=self.asset_pair,
-                      amount=amount,
-                      price=price,
-                      timestamp=self.clock.get_timestamp(),
-                      direction=Direction.SELL)
-        self.active_orders.add(copy(order))
-        return order
+    def buy(self, amount: float, price: float,
+            asset_pair: tp.Optional[AssetPair] = None) -> tp.Optional[Order]:
+        return self.__place_order(amount, price, Direction.BUY, asset_pair)
+
+    def sell(self, amount: float, price: float,
+             asset_pair: tp.Optional[AssetPair] = None) -> tp.Optional[Order]:
+        return self.__place_order(amount, price, Direction.SELL, asset_pair)
 
     def cancel_order(self, order: Order) -> bool:
+        market = self.markets.get(order.asset_pair, self.markets[self.asset_pair])
         try:
-            self.active_orders.remove(order)
+            market.active_orders.remove(order)
             return True
         except KeyError:
             return False
 
-    def cancel_all(self) -> None:
-        self.active_orders.clear()
+    def cancel_all(self, asset_pair: tp.Optional[AssetPair] = None) -> None:
+        if asset_pair is not None:
+            self.__get_market(asset_pair).active_orders.clear()
+            return
+        for market in self.markets.values():
+            market.active_orders.clear()
 
     def order_is_filled(self, order: Order) -> bool:
         return order.order_id in self.filled_order_ids
 
-    def get_sell_price(self) -> float:
-        return self.__get_current_price() * (1 + self.price_shift)
+    def get_sell_price(self, asset_pair: tp.Optional[AssetPair] = None) -> float:
+        return self.__get_current_price(self.__get_market(asset_pair)) * (1 + self.price_shift)
 
-    def get_buy_price(self) -> float:
-        return self.__get_current_price() * (1 - self.price_shift)
+    def get_buy_price(self, asset_pair: tp.Optional[AssetPair] = None) -> float:
+        return self.__get_current_price(self.__get_market(asset_pair)) * (1 - self.price_shift)
 
-    def get_last_n_candles(self, n: int) -> tp.List[Candle]:
+    def get_last_n_candles(self, n: int,
+                           asset_pair: tp.Optional[AssetPair] = None) -> tp.List[Candle]:
         candle_index = self.__get_current_candle_index()
-        return self.candles[max(0, candle_index - n): candle_index]
+        return self.__get_market(asset_pair).candles[max(0, candle_index - n): candle_index]
+
+    def get_last_n_columns(self, n: int) -> np.ndarray:
+        """
+        Last n candles of all pairs as candle_columns arrays stacked to shape (pairs, n, 6),
+        in the order of get_asset_pairs, for handlers updating all pairs at once.
+        """
+        candle_index = self.__get_current_candle_index()
+        return self.columns[:, max(0, candle_index - n): candle_index]
 
     def get_orderbook(self):  # type: ignore
         pass
 
-    def __order_is_filled(self, order: Order) -> bool:
-        return (order.direction == Direction.BUY and
-                order.price > self.get_sell_price()) or \
-               (order.direction == Direction.SELL and
-                order.price < self.get_buy_price())
+    def __place_order(self, amount: float, price: float, direction: Direction,
+                      asset_pair: tp.Optional[AssetPair]) -> Order:
+        market = self.__get_market(asset_pair)
+        order = Order(order_id=self.__get_new_order_id(),
+                      asset_pair=market.asset_pair,
+                      amount=amount,
+                      price=price,
+                      timestamp=self.clock.get_timestamp(),
+                      direction=direction)
+        market.active_orders.add(order)
+        return order
+
+    def __get_market(self, asset_pair: tp.Optional[AssetPair]) -> PairMarket:
+        if asset_pair is None:
+            return self.markets[self.asset_pair]
+        try:
+            return self.markets[asset_pair]
+        except KeyError:
+            raise ValueError(f'{asset_pair} is not simulated') from None
 
     def __fill_orders(self) -> None:
-        filled_orders = set(filter(self.__order_is_filled, self.active_orders))
-        self.active_orders = set(
-            filter(lambda order: not self.__order_is_filled(order),
-                   self.active_orders))
-        for order in filled_orders:
-            self.filled_order_ids.add(order.order_id)
-
-    def __get_current_price(self) -> float:
-        candle = self.candles[self.__get_current_candle_index()]
-        return self.price_simulator.get_price(
+        for market in self.markets.values():
+            if not market.active_orders:
+                continue
+            price = self.__get_current_price(market)
+            for order in market.fill_orders(buy_price=price * (1 - self.price_shift),
+                                            sell_price=price * (1 + self.price_shift)):
+                self.filled_order_ids.add(order.order_id)
+
+    def __get_current_price(self, market: PairMarket) -> float:
+        candle = market.candles[self.__get_current_candle_index()]
+        return market.price_simulator.get_price(
             candle, self.clock.get_current_candle_lifetime())
 
     def __get_current_candle_index(self, truncated_index: bool = True) -> int:
@@ -121,3 +202,4 @@ class Simulator(TradingInterface):
     def __get_new_order_id(self) -> str:
         self.last_used_order_id += 1
         return str(self.last_used_order_id)
+
@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 import typing as tp
 from abc import ABC, abstractmethod
 
@@ -52,3 +54,14 @@ class TradingInterface(ABC):
     @abstractmethod
     def get_last_n_candles(self, n: int) -> tp.List[Candle]:
         pass
+
+    @abstractmethod
+    def get_asset_pairs(self) -> tp.List[AssetPair]:
+        """ Traded pairs, the first one is traded by the interface itself, others through for_pair. """
+        pass
+
+    def for_pair(self, asset_pair: AssetPair) -> TradingInterface:
+        """ Interface trading asset_pair, the interface itself for its own pair. """
+        if asset_pair not in self.get_asset_pairs()[:1]:
+            raise ValueError(f'{asset_pair} is not traded by {type(self).__name__}')
+        return self
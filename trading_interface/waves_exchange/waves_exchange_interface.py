@@ -64,6 +64,9 @@ class WAVESExchangeInterface(TradingInterface):
         """
         return self._clock.get_timestamp()
 
+    def get_asset_pairs(self) -> tp.List[AssetPair]:
+        return [self.asset_pair_human_readable]
+
     def buy(self, amount: float, price: float) -> tp.Optional[Order]:
         return self._place_order(Direction.BUY, amount, price)
 
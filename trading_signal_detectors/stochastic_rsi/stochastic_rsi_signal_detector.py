@@ -1,5 +1,4 @@
 import typing as tp
-import pandas as pd
 
 import trading_system.trading_system as ts
 from logger.logger import Logger
@@ -50,10 +49,12 @@ class StochasticRSISignalDetector(TradingSignalDetector):
             return []
 
         trend_type = 'uptrend' if trend == TrendType.UPTREND else 'downtrend'
-        self.logger.info(f"SRSI {trend_type} detected")
+        self.logger.info("SRSI %s detected", trend_type)
         return [Signal("stochastic_rsi", trend)]
 
     def __calculate_stochastic(self, values: tp.List[float]) -> tp.List[float]:
+        import pandas as pd
+
         vals = pd.Series(values)
         low = vals.rolling(self.stoch_len).min()
         high = vals.rolling(self.stoch_len).max()
@@ -61,5 +62,7 @@ class StochasticRSISignalDetector(TradingSignalDetector):
 
     def __calculate_sma(self, values: tp.List[float],
                         window: int) -> tp.List[float]:
+        import pandas as pd
+
         rolling_mean = pd.Series(values).rolling(window).mean()
         return rolling_mean[-window:].tolist()
@@ -0,0 +1,63 @@
+import math
+import typing as tp
+
+from helpers.typing.common_types import Config
+
+from trading import Timeframe
+
+
+class AbortRules:
+    """
+    Tracks PnL and drawdown of a run online, once per candle,
+    and tells when the run is hopeless and may be stopped.
+    Config (every rule is optional):
+        max_drawdown: fall of equity from its peak, in percent
+        max_hodl_underperformance: lag of equity behind HODL, in percent of initial balance
+        grace_period: timeframe string, rules are not checked before it passes
+    """
+
+    def __init__(self, config: tp.Optional[Config] = None):
+        config = config or {}
+        self._max_drawdown: tp.Optional[float] = config.get('max_drawdown')
+        self._max_hodl_underperformance: tp.Optional[float] = \
+            config.get('max_hodl_underperformance')
+        grace_period = config.get('grace_period')
+        self._grace_period = Timeframe(grace_period).to_seconds() if grace_period else 0
+        self._start_ts: tp.Optional[int] = None
+        self._initial_equity = 0.
+        self._peak_equity = -math.inf
+        self.equity = 0.
+        self.drawdown = 0.
+        self.max_drawdown = 0.
+        self.reason: tp.Optional[str] = None
+
+    def is_enabled(self) -> bool:
+        return self._max_drawdown is not None or \
+            self._max_hodl_underperformance is not None
+
+    def update(self, ts: int, equity: float, hodl_equity: float) -> tp.Optional[str]:
+        """ Returns the reason to abort once a rule is broken, the reason sticks. """
+        if self._start_ts is None:
+            self._start_ts = ts
+            self._initial_equity = equity
+        self.equity = equity
+        self._peak_equity = max(self._peak_equity, equity)
+        self.drawdown = (1 - equity / self._peak_equity) * 100 if self._peak_equity > 0 else 0.
+        self.max_drawdown = max(self.max_drawdown, self.drawdown)
+        if self.reason is not None or ts - self._start_ts < self._grace_period:
+            return self.reason
+
+        if self._max_drawdown is not None and self.drawdown > self._max_drawdown:
+            self.reason = f'drawdown {self.drawdown:.1f}% exceeds {self._max_drawdown}%'
+        elif self._max_hodl_underperformance is not None and self._initial_equity > 0:
+            lag = (hodl_equity - equity) / self._initial_equity * 100
+            if lag > self._max_hodl_underperformance:
+                self.reason = f'underperforms HODL by {lag:.1f}%, ' \
+                              f'more than {self._max_hodl_underperformance}%'
+        return self.reason
+
+    def calc_pnl(self) -> float:
+        """ Change of equity since the first update, in percent. """
+        if math.isclose(self._initial_equity, 0):
+            return 0.
+        return (self.equity / self._initial_equity - 1) * 100
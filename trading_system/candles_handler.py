@@ -13,7 +13,8 @@ class CandlesHandler(TradingSystemHandler):
     def update(self) -> bool:
         if super().received_new_candle():
             last_candle = self.ti.get_last_n_candles(1)[0]
-            self.logger.trading_event(NewCandleEvent(last_candle))
+            if self.logger.is_event_enabled(NewCandleEvent):
+                self.logger.trading_event(NewCandleEvent(last_candle))
             return True
         return False
 
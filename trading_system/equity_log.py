@@ -0,0 +1,150 @@
+import math
+
+import numpy as np
+
+from helpers.columns import Columns
+from trading import Direction
+
+SECONDS_PER_YEAR = 365 * 24 * 60 * 60
+
+
+class EquityLog:
+    """
+    Columnar log of a run: one row per candle with mark-to-market balance,
+    position and its price, fills, traded volume and fees of the candle,
+    and one row per filled order.
+    """
+
+    def __init__(self) -> None:
+        self.candles = Columns({
+            'ts': np.int64,
+            'balance': np.float64,
+            'position': np.float64,
+            'price': np.float64,
+            'fills': np.int32,
+            'volume': np.float64,
+            'fees': np.float64,
+        })
+        self.fills = Columns({
+            'ts': np.int64,
+            'direction': np.int8,
+            'amount': np.float64,
+            'price': np.float64,
+            'fee': np.float64,
+        })
+        self._candle_fills = 0
+        self._candle_volume = 0.
+        self._candle_fees = 0.
+
+    def add_fill(self, ts: int, direction: Direction,
+                 amount: float, price: float, fee: float) -> None:
+        self.fills.append(ts, int(direction), amount, price, fee)
+        self._candle_fills += 1
+        self._candle_volume += amount * price
+        self._candle_fees += fee
+
+    def add_candle(self, ts: int, balance: float, position: float, price: float) -> None:
+        """ Closes the row of the candle with fills made since the previous one. """
+        self.candles.append(ts, balance, position, price, self._candle_fills,
+                            self._candle_volume, self._candle_fees)
+        self._candle_fills = 0
+        self._candle_volume = 0.
+        self._candle_fees = 0.
+
+    def shrink(self) -> None:
+        self.candles.shrink()
+        self.fills.shrink()
+
+    def get_equity(self) -> np.ndarray:
+        """ Balance after fees paid so far. """
+        return self.candles.get('balance') - np.cumsum(self.candles.get('fees'))
+
+    def get_returns(self) -> np.ndarray:
+        equity = self.get_equity()
+        if len(equity) < 2:
+            return np.empty(0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.diff(equity) / equity[:-1]
+        return returns[np.isfinite(returns)]
+
+    def get_periods_per_year(self) -> float:
+        ts = self.candles.get('ts')
+        if len(ts) < 2:
+            return 0.
+        period = float(np.median(np.diff(ts)))
+        return SECONDS_PER_YEAR / period if period > 0 else 0.
+
+    def calc_sharpe_ratio(self) -> float:
+        """ Annualized, risk free rate is zero. """
+        returns = self.get_returns()
+        if len(returns) < 2:
+            return 0.
+        std = returns.std()
+        if math.isclose(std, 0, abs_tol=1e-15):
+            return 0.
+        return float(returns.mean() / std * math.sqrt(self.get_periods_per_year()))
+
+    def calc_sortino_ratio(self) -> float:
+        """ Annualized, only negative returns count as risk. """
+        returns = self.get_returns()
+        if len(returns) < 2:
+            return 0.
+        downside = math.sqrt(float(np.mean(np.minimum(returns, 0) ** 2)))
+        if math.isclose(downside, 0, abs_tol=1e-15):
+            return 0.
+        return float(returns.mean() / downside * math.sqrt(self.get_periods_per_year()))
+
+    def calc_max_drawdown(self) -> float:
+        """ Largest fall of equity from its peak, in percent. """
+        equity = self.get_equity()
+        if len(equity) == 0:
+            return 0.
+        peaks = np.maximum.accumulate(equity)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            drawdowns = np.where(peaks > 0, 1 - equity / peaks, 0)
+        return float(drawdowns.max() * 100)
+
+    def calc_exposure(self) -> float:
+        """ Average share of balance held in position, in percent. """
+        balance = self.candles.get('balance')
+        if len(balance) == 0:
+            return 0.
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shares = np.where(balance > 0, self.candles.get('position') *
+                              self.candles.get('price') / balance, 0)
+        return float(shares.mean() * 100)
+
+    def calc_turnover(self) -> float:
+        """ Traded volume relative to the average equity. """
+        equity = self.get_equity()
+        if len(equity) == 0 or math.isclose(equity.mean(), 0):
+            return 0.
+        return float(self.candles.get('volume').sum() / equity.mean())
+
+    def calc_win_rate(self) -> float:
+        """
+        Share of sells above the average cost of the position, in percent.
+        Position held at the start is valued at the price of the first candle.
+        """
+        directions = self.fills.get('direction')
+        sells = directions == int(Direction.SELL)
+        if not sells.any():
+            return 0.
+        amounts = self.fills.get('amount')
+        prices = self.fills.get('price')
+        position, cost = 0., 0.
+        if len(self.candles) > 0:
+            position = float(self.candles.get('position')[0])
+            cost = position * float(self.candles.get('price')[0])
+        wins = 0
+        for is_sell, amount, price in zip(sells, amounts, prices):
+            if not is_sell:
+                position += amount
+                cost += amount * price
+            elif position > 0:
+                average_cost = cost / position
+                wins += price > average_cost
+                sold = min(amount, position)
+                cost -= sold * average_cost
+                position -= sold
+        return wins / int(sells.sum()) * 100
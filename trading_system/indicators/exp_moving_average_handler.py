@@ -41,8 +41,9 @@ class ExpMovingAverageHandler(TradingSystemHandler):
                 self.values[-1] * (1 - self.alpha))
         else:
             self.values.append(new_candle.get_mid_price())
-        self.logger.info_event(
-            ExpMovingAverageEvent(self.values[-1], self.window_size))
+        if self.logger.is_event_enabled(ExpMovingAverageEvent, INFO):
+            self.logger.info_event(
+                ExpMovingAverageEvent(self.values[-1], self.window_size))
         return True
 
     def get_last_n_values(self, n: int) -> tp.List[float]:
@@ -33,8 +33,9 @@ class MovingAverageHandler(TradingSystemHandler):
 
         candle_values = list(map(lambda c: c.get_mid_price(), candles))
         self.values.append(self.calculate_from(candle_values))
-        self.logger.info_event(
-            MovingAverageEvent(self.get_last_n_values(1)[0], self.window_size))
+        if self.logger.is_event_enabled(MovingAverageEvent, INFO):
+            self.logger.info_event(
+                MovingAverageEvent(self.values[-1], self.window_size))
         return True
 
     def get_last_n_values(self, n: int) -> tp.List[float]:
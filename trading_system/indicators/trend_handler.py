@@ -26,8 +26,9 @@ class TrendHandler(TradingSystemHandler):
         if not super().received_new_candle():
             return False
         lower_trend_line, upper_trend_line = self.get_trend_lines()
-        self.logger.info_event(
-            TrendLinesEvent(lower_trend_line, upper_trend_line))
+        if self.logger.is_event_enabled(TrendLinesEvent, INFO):
+            self.logger.info_event(
+                TrendLinesEvent(lower_trend_line, upper_trend_line))
         return True
 
     def get_trend_lines(self) -> tp.Tuple[TrendLine, TrendLine]:
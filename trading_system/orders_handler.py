@@ -21,8 +21,9 @@ class OrdersHandler(TradingSystemHandler):
     def update(self) -> bool:
         filled_orders = set(
             filter(self.ti.order_is_filled, self.active_orders))
-        for order in filled_orders:
-            self.logger.trading_event(FilledOrderEvent(order.order_id))
+        if filled_orders and self.logger.is_event_enabled(FilledOrderEvent):
+            for order in filled_orders:
+                self.logger.trading_event(FilledOrderEvent(order.order_id))
         self.new_filled_orders |= filled_orders
         self.active_orders = self.active_orders - filled_orders
         return len(filled_orders) > 0
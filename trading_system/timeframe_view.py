@@ -0,0 +1,109 @@
+import typing as tp
+
+from trading import AssetPair, Candle, Order, Timeframe
+from trading_interface.trading_interface import TradingInterface
+
+
+class TimeframeView(TradingInterface):
+    """
+    Trading interface as handlers of a coarser timeframe see it: candles
+    are aggregated incrementally from candles of the underlying interface,
+    a candle is available once its last base candle is, so handlers
+    get a new candle only when their own frame closes.
+    Everything else is delegated to the underlying interface.
+    """
+
+    def __init__(self, trading_interface: TradingInterface,
+                 base_timeframe: Timeframe, timeframe: Timeframe,
+                 history: int = 1440):
+        """ history is the number of base candles aggregated at start, if there are so many. """
+        if timeframe.to_seconds() % base_timeframe.to_seconds() != 0:
+            raise ValueError(f'{timeframe} is not a multiple of {base_timeframe}')
+        self.ti = trading_interface
+        self.timeframe = timeframe
+        self._base_seconds = base_timeframe.to_seconds()
+        self._seconds = timeframe.to_seconds()
+        self._history = history
+        self._candles: tp.List[Candle] = []
+        self._partial: tp.List[Candle] = []
+        self._last_base_ts: tp.Optional[int] = None
+
+    def get_last_n_candles(self, n: int) -> tp.List[Candle]:
+        self._sync()
+        return self._candles[-n:]
+
+    def _sync(self) -> None:
+        last = self.ti.get_last_n_candles(1)
+        if not last or last[0].ts == self._last_base_ts:
+            return
+        if self._last_base_ts is None:
+            new_candles = self.ti.get_last_n_candles(self._history)
+            # A period which started before the history is incomplete
+            first = next((i for i, candle in enumerate(new_candles)
+                          if candle.ts % self._seconds == 0), len(new_candles))
+            new_candles = new_candles[first:]
+        elif last[0].ts - self._last_base_ts > self._base_seconds:
+            missed = (last[0].ts - self._last_base_ts) // self._base_seconds
+            new_candles = [candle for candle in self.ti.get_last_n_candles(missed)
+                           if candle.ts > self._last_base_ts]
+        else:
+            new_candles = last
+        for candle in new_candles:
+            self._add(candle)
+        self._last_base_ts = last[0].ts
+
+    def _add(self, candle: Candle) -> None:
+        start = candle.ts // self._seconds * self._seconds
+        if self._partial and self._partial[0].ts // self._seconds * self._seconds != start:
+            # Base candles of the period end are missing
+            self._close()
+        self._partial.append(candle)
+        if candle.ts + self._base_seconds >= start + self._seconds:
+            self._close()
+
+    def _close(self) -> None:
+        candles = self._partial
+        self._candles.append(Candle(
+            ts=candles[0].ts // self._seconds * self._seconds,
+            open=candles[0].open,
+            close=candles[-1].close,
+            low=min(candle.low for candle in candles),
+            high=max(candle.high for candle in candles),
+            volume=sum(candle.volume for candle in candles)))
+        self._partial = []
+
+    def is_alive(self) -> bool:
+        return self.ti.is_alive()
+
+    def stop_trading(self) -> None:
+        self.ti.stop_trading()
+
+    def get_timestamp(self) -> int:
+        return self.ti.get_timestamp()
+
+    def get_asset_pairs(self) -> tp.List[AssetPair]:
+        return self.ti.get_asset_pairs()[:1]
+
+    def buy(self, amount: float, price: float) -> tp.Optional[Order]:
+        return self.ti.buy(amount, price)
+
+    def sell(self, amount: float, price: float) -> tp.Optional[Order]:
+        return self.ti.sell(amount, price)
+
+    def cancel_order(self, order: Order) -> bool:
+        return self.ti.cancel_order(order)
+
+    def cancel_all(self) -> None:
+        self.ti.cancel_all()
+
+    def order_is_filled(self, order: Order) -> bool:
+        return self.ti.order_is_filled(order)
+
+    def get_buy_price(self) -> float:
+        return self.ti.get_buy_price()
+
+    def get_sell_price(self) -> float:
+        return self.ti.get_sell_price()
+
+    def get_orderbook(self):  # type: ignore
+        return self.ti.get_orderbook()
@@ -1,19 +1,17 @@
 import math
 import typing as tp
 from copy import copy
-from collections import Counter
 from io import StringIO
 
-import plotly.graph_objects as go
-from rich.box import Box
-from rich.console import Console
-from rich.table import Table
+import numpy as np
 
+from helpers.columns import Columns
+from helpers.profiler import Profiler
 from helpers.typing.utils import require
 from trading import Asset, Order, Timestamp
+from trading_system.equity_log import EquityLog
 
-TABLE_STYLE: Box = Box(
-    """\
+TABLE_STYLE = """\
 ┏━┳┓
 ┃ ┃┃
 ┡━╇┩
@@ -23,7 +21,6 @@ TABLE_STYLE: Box = Box(
 │ ││
 ╰─┴╯
 """
-)
 
 
 class TradingStatistics:
@@ -43,6 +40,12 @@ class TradingStatistics:
         self.start_timestamp = start_timestamp
         self.finish_timestamp: tp.Optional[int] = None
         self.filled_order_count = 0
+        # Why the run was stopped before the end of its time range
+        self.pruned_reason: tp.Optional[str] = None
+        # Not kept by merged statistics
+        self.equity_log: tp.Optional[EquityLog] = EquityLog()
+        # Time spent by components of the trading loop, if profiled
+        self.profile: tp.Optional[Profiler] = None
 
     def set_hodl_result(self, balance: float) -> None:
         self.hodl_result = balance
@@ -68,14 +71,48 @@ class TradingStatistics:
     def set_finish_timestamp(self, timestamp: int) -> None:
         self.finish_timestamp = timestamp
 
-    def add_filled_order(self, _order: Order) -> None:
+    def set_pruned(self, reason: str) -> None:
+        self.pruned_reason = reason
+
+    def is_pruned(self) -> bool:
+        return self.pruned_reason is not None
+
+    def add_filled_order(self, order: Order,
+                         timestamp: tp.Optional[int] = None,
+                         fee: float = 0.) -> None:
         self.filled_order_count += 1
+        if self.equity_log is not None:
+            self.equity_log.add_fill(order.timestamp if timestamp is None else timestamp,
+                                     order.direction, order.amount, order.price, fee)
+
+    def add_candle(self, timestamp: int, balance: float,
+                   position: float, price: float) -> None:
+        """ Records mark-to-market state of the run, called once per candle. """
+        if self.equity_log is not None:
+            self.equity_log.add_candle(timestamp, balance, position, price)
+
+    def get_risk_metrics(self) -> tp.Dict[str, float]:
+        """ Computed from the equity log, empty for merged statistics. """
+        if self.equity_log is None or len(self.equity_log.candles) < 2:
+            return {}
+        return {
+            'sharpe': self.equity_log.calc_sharpe_ratio(),
+            'sortino': self.equity_log.calc_sortino_ratio(),
+            'max_drawdown': self.equity_log.calc_max_drawdown(),
+            'exposure': self.equity_log.calc_exposure(),
+            'turnover': self.equity_log.calc_turnover(),
+            'win_rate': self.equity_log.calc_win_rate(),
+        }
 
     def pretty_print(self) -> None:
+        from rich.box import Box
+        from rich.console import Console
+        from rich.table import Table
+
         color = 'green' if self.calc_relative_delta() > 0 else 'red'
         hodl_color = 'green' if self._calc_relative_hodl_delta() > 0 else 'red'
         console = Console()
-        table = Table(show_footer=True, box=TABLE_STYLE, show_lines=True,
+        table = Table(show_footer=True, box=Box(TABLE_STYLE), show_lines=True,
             title=f'{Timestamp.to_iso_format(require(self.start_timestamp))} - '
                   f'{Timestamp.to_iso_format(require(self.finish_timestamp))}')
         table.add_column()
@@ -91,9 +128,33 @@ class TradingStatistics:
         table.add_row('Wallet',
             self._wallet_pretty_format(require(self.initial_wallet)),
             self._wallet_pretty_format(require(self.final_wallet)))
+        metrics = self.get_risk_metrics()
+        if metrics:
+            table.add_row('Risk', f'Sharpe: {metrics["sharpe"]:.2f}\n'
+                                  f'Sortino: {metrics["sortino"]:.2f}\n'
+                                  f'Max drawdown: {metrics["max_drawdown"]:.1f}%',
+                          f'Exposure: {metrics["exposure"]:.1f}%\n'
+                          f'Turnover: {metrics["turnover"]:.2f}\n'
+                          f'Win rate: {metrics["win_rate"]:.1f}%')
+        if self.is_pruned():
+            table.caption = f'[red]Pruned: {self.pruned_reason}[/]'
         console.print(table)
 
     def __str__(self) -> str:
+        metrics = self.get_risk_metrics()
+        risk = '' if not metrics else f"""\
+--------------------------------------------------------
+sharpe:                 {metrics['sharpe']:.2f}
+sortino:                {metrics['sortino']:.2f}
+max drawdown(%):        {metrics['max_drawdown']:.1f}%
+exposure(%):            {metrics['exposure']:.1f}%
+turnover:               {metrics['turnover']:.2f}
+win rate(%):            {metrics['win_rate']:.1f}%
+"""
+        pruned = '' if not self.is_pruned() else f"""\
+--------------------------------------------------------
+pruned:                 {self.pruned_reason}
+"""
         return f"""\
 {Timestamp.to_iso_format(require(self.start_timestamp))} - {Timestamp.to_iso_format(require(self.finish_timestamp))}
 initial wallet ({require(self.initial_balance):.2f} {require(self.price_asset)}):
@@ -107,7 +168,7 @@ filled orders:          {self.filled_order_count}
 hodl_result:            {require(self.hodl_result):.2f}
 delta hodl_result:      {require(self.hodl_result) - require(self.initial_balance):.2f}
 delta hodl_result(%):   {self._calc_relative_hodl_delta():.1f}%
-"""
+""" + risk + pruned
 
     def calc_absolute_delta(self) -> float:
         return require(self.final_balance) - require(self.initial_balance)
@@ -123,6 +184,9 @@ delta hodl_result(%):   {self._calc_relative_hodl_delta():.1f}%
         return (require(self.hodl_result) - require(self.initial_balance)) / require(self.initial_balance) * 100
 
     def _wallet_pretty_format(self, wallet: tp.Dict[Asset, float]) -> str:
+        from rich.console import Console
+        from rich.table import Table
+
         wallet_table = Table.grid(padding=(0, 1))
         wallet_table.add_column(justify='left')
         wallet_table.add_column(justify='right')
@@ -135,37 +199,195 @@ delta hodl_result(%):   {self._calc_relative_hodl_delta():.1f}%
         return str_io.getvalue().rstrip()
 
     @classmethod
-    def merge(cls, stats_array: tp.List['TradingStatistics']) -> 'TradingStatistics':
-        if not stats_array:
-            raise ValueError("empty stats array")
-
-        stats = cls()
-        stats.set_price_asset(require(stats_array[0].price_asset))
-        stats.set_initial_wallet(dict(sum([Counter(require(x.initial_wallet)) for x in stats_array], Counter())))
-        stats.set_initial_balance(sum([require(s.initial_balance) for s in stats_array]))
-        stats.set_hodl_result(sum([require(s.hodl_result) for s in stats_array]))
-        stats.set_final_wallet(dict(sum([Counter(require(x.final_wallet)) for x in stats_array], Counter())))
-        stats.set_final_balance(sum([require(s.final_balance) for s in stats_array]))
-        stats.set_start_timestamp(min([require(s.start_timestamp) for s in stats_array]))
-        stats.set_finish_timestamp(max([require(s.finish_timestamp) for s in stats_array]))
-        stats.filled_order_count = sum([s.filled_order_count for s in stats_array])
-        return stats
+    def merge(cls, stats_array: tp.Iterable['TradingStatistics']) -> 'TradingStatistics':
+        return StatisticsAccumulator.from_statistics(stats_array).get_statistics()
 
     @staticmethod
-    def get_absolute_delta(stats_array: tp.List['TradingStatistics']) -> tp.List[float]:
-        return [s.calc_absolute_delta() for s in stats_array]
+    def visualize(stats_array: tp.Iterable['TradingStatistics']) -> None:
+        ResultsTable.from_statistics(stats_array).visualize()
 
-    @staticmethod
-    def get_start_time(stats_array: tp.List['TradingStatistics']) -> tp.List[str]:
-        return [Timestamp.to_iso_format(require(s.start_timestamp)) for s in stats_array]
 
-    @staticmethod
-    def visualize(stats_array: tp.List['TradingStatistics']) -> None:
-        stats_array.sort(key=lambda r: r.start_timestamp)
+RISK_METRICS = ['sharpe', 'sortino', 'max_drawdown', 'exposure', 'turnover', 'win_rate']
+
+
+class ResultsTable:
+    """
+    One row of scalar results per run, kept in NumPy columns,
+    so thousands of periods or sweep points take little memory
+    and are summarized with vectorized operations.
+    Risk metrics are NaN for runs without an equity log.
+    """
+
+    def __init__(self) -> None:
+        self.columns = Columns({
+            'start_ts': np.int64,
+            'finish_ts': np.int64,
+            'initial_balance': np.float64,
+            'final_balance': np.float64,
+            'hodl_result': np.float64,
+            'filled_orders': np.int64,
+            'pruned': np.bool_,
+            **{metric: np.float64 for metric in RISK_METRICS},
+        }, capacity=16)
+
+    @classmethod
+    def from_statistics(cls, stats_array: tp.Iterable[TradingStatistics]) -> 'ResultsTable':
+        table = cls()
+        for stats in stats_array:
+            table.add(stats)
+        return table
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def add(self, stats: TradingStatistics) -> None:
+        metrics = stats.get_risk_metrics()
+        self.columns.append(
+            require(stats.start_timestamp), require(stats.finish_timestamp),
+            require(stats.initial_balance), require(stats.final_balance),
+            require(stats.hodl_result), stats.filled_order_count, stats.is_pruned(),
+            *[metrics.get(metric, math.nan) for metric in RISK_METRICS])
+
+    def extend(self, other: 'ResultsTable') -> None:
+        self.columns.extend(other.columns)
+
+    def get(self, name: str) -> np.ndarray:
+        return self.columns.get(name)
+
+    def calc_absolute_delta(self) -> np.ndarray:
+        return self.get('final_balance') - self.get('initial_balance')
+
+    def calc_relative_delta(self) -> np.ndarray:
+        return self._to_percent(self.calc_absolute_delta())
+
+    def calc_relative_hodl_delta(self) -> np.ndarray:
+        return self._to_percent(self.get('hodl_result') - self.get('initial_balance'))
+
+    def get_summary(self) -> tp.Dict[str, float]:
+        """ Distribution of results over runs, risk metrics are averaged over runs having them. """
+        if len(self) == 0:
+            return {}
+        deltas = self.calc_relative_delta()
+        summary = {
+            'runs': float(len(self)),
+            'profitable(%)': float(np.mean(deltas > 0) * 100),
+            'beat hodl(%)': float(np.mean(
+                self.get('final_balance') > self.get('hodl_result')) * 100),
+            'mean delta(%)': float(deltas.mean()),
+            'median delta(%)': float(np.median(deltas)),
+            'min delta(%)': float(deltas.min()),
+            'max delta(%)': float(deltas.max()),
+            'mean hodl delta(%)': float(self.calc_relative_hodl_delta().mean()),
+            'pruned(%)': float(np.mean(self.get('pruned')) * 100),
+        }
+        for metric in RISK_METRICS:
+            values = self.get(metric)
+            values = values[~np.isnan(values)]
+            if len(values) > 0:
+                summary[f'mean {metric}'] = float(values.mean())
+        return summary
+
+    def shrink(self) -> None:
+        self.columns.shrink()
+
+    def __str__(self) -> str:
+        return ''.join(f'{name + ":":<24}{value:.2f}\n'
+                       for name, value in self.get_summary().items())
+
+    def visualize(self) -> None:
+        import plotly.graph_objects as go
+
+        order = np.argsort(self.get('start_ts'), kind='stable')
+        deltas = self.calc_absolute_delta()[order]
         fig = go.Figure()
         fig.add_trace(go.Bar(
-            x=TradingStatistics.get_start_time(stats_array),
-            y=TradingStatistics.get_absolute_delta(stats_array),
-            marker_color=['green' if balance > 0 else 'red'
-                          for balance in TradingStatistics.get_absolute_delta(stats_array)]))
+            x=[Timestamp.to_iso_format(int(ts)) for ts in self.get('start_ts')[order]],
+            y=deltas,
+            marker_color=np.where(deltas > 0, 'green', 'red')))
         fig.show()
+
+    def _to_percent(self, deltas: np.ndarray) -> np.ndarray:
+        initial = self.get('initial_balance')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(np.isclose(initial, 0), 0., deltas / initial * 100)
+
+
+class StatisticsAccumulator:
+    """
+    Mergeable aggregate of runs: an empty accumulator is the identity,
+    merge is associative, so workers may combine partial results in any grouping.
+    Costs O(1) per run and O(assets) for wallets, scalar results go to a ResultsTable.
+    """
+
+    def __init__(self) -> None:
+        self.price_asset: tp.Optional[Asset] = None
+        self.initial_wallet: tp.Dict[Asset, float] = {}
+        self.final_wallet: tp.Dict[Asset, float] = {}
+        self.table = ResultsTable()
+        self.profile: tp.Optional[Profiler] = None
+
+    @classmethod
+    def from_statistics(cls, stats_array: tp.Iterable[TradingStatistics]) -> 'StatisticsAccumulator':
+        accumulator = cls()
+        for stats in stats_array:
+            accumulator.add(stats)
+        return accumulator
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def add(self, stats: TradingStatistics) -> None:
+        if self.price_asset is None:
+            self.price_asset = stats.price_asset
+        self._add_wallet(self.initial_wallet, require(stats.initial_wallet))
+        self._add_wallet(self.final_wallet, require(stats.final_wallet))
+        self.table.add(stats)
+        if stats.profile is not None:
+            self._add_profile(stats.profile)
+
+    def merge(self, other: 'StatisticsAccumulator') -> 'StatisticsAccumulator':
+        """ Adds runs of other in place and returns self. """
+        if self.price_asset is None:
+            self.price_asset = other.price_asset
+        self._add_wallet(self.initial_wallet, other.initial_wallet)
+        self._add_wallet(self.final_wallet, other.final_wallet)
+        self.table.extend(other.table)
+        if other.profile is not None:
+            self._add_profile(other.profile)
+        return self
+
+    def shrink(self) -> None:
+        """ Drops unused capacity before the accumulator is sent to another process. """
+        self.table.shrink()
+
+    def get_statistics(self) -> TradingStatistics:
+        """ Statistics of all runs as of a single run, without an equity log. """
+        if len(self) == 0:
+            raise ValueError("empty stats array")
+        table = self.table
+        stats = TradingStatistics()
+        stats.equity_log = None
+        stats.set_price_asset(require(self.price_asset))
+        stats.set_initial_wallet(self.initial_wallet)
+        stats.set_initial_balance(float(table.get('initial_balance').sum()))
+        stats.set_hodl_result(float(table.get('hodl_result').sum()))
+        stats.set_final_wallet(self.final_wallet)
+        stats.set_final_balance(float(table.get('final_balance').sum()))
+        stats.set_start_timestamp(int(table.get('start_ts').min()))
+        stats.set_finish_timestamp(int(table.get('finish_ts').max()))
+        stats.filled_order_count = int(table.get('filled_orders').sum())
+        pruned = int(table.get('pruned').sum())
+        if pruned > 0:
+            stats.set_pruned(f'{pruned} of {len(self)} runs')
+        stats.profile = self.profile
+        return stats
+
+    def _add_profile(self, profile: Profiler) -> None:
+        if self.profile is None:
+            self.profile = Profiler()
+        self.profile.merge(profile)
+
+    @staticmethod
+    def _add_wallet(total: tp.Dict[Asset, float], wallet: tp.Dict[Asset, float]) -> None:
+        for asset, amount in wallet.items():
+            total[asset] = total.get(asset, 0) + amount
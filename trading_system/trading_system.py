@@ -2,87 +2,176 @@ from __future__ import annotations
 
 import typing as tp
 
-from collections import OrderedDict
+from collections import OrderedDict, defaultdict
 from copy import copy
 import math
 
 from helpers.typing.common_types import Config
+from trading_interface.pair_view import PairView
 from trading_interface.trading_interface import TradingInterface
 
 from trading_system.candles_handler import CandlesHandler
 from trading_system.orders_handler import OrdersHandler
 from trading_system.indicators import *
 
+from trading_system.abort_rules import AbortRules
+from trading_system.timeframe_view import TimeframeView
 from trading_system.trading_statistics import TradingStatistics
 
 from logger.log_events import BuyEvent, SellEvent, CancelEvent
 from logger.logger import Logger
 
-from trading import Asset, AssetPair, Signal, Order, Direction, Candle
+from trading import Asset, AssetPair, Signal, Order, Direction, Candle, Timeframe
 
 from helpers.typing import TradingSystemHandlerT
 from helpers.typing.utils import require
 
 
 class Handlers(OrderedDict):  # type: ignore
+    """
+    Handlers by name, the name of a handler of another asset pair ends with [pair],
+    the one of a coarser timeframe with @timeframe.
+    """
+
+    @staticmethod
+    def get_key(handler: TradingSystemHandler) -> str:
+        key = handler.get_name()
+        ti = handler.ti
+        timeframe = None
+        if isinstance(ti, TimeframeView):
+            timeframe, ti = ti.timeframe, ti.ti
+        if isinstance(ti, PairView):
+            key = f'{key}[{ti.asset_pair}]'
+        if timeframe is not None:
+            key = f'{key}@{timeframe}'
+        return key
+
     def add(self, handler: TradingSystemHandler) -> Handlers:
-        if handler.get_name() in self.keys():
+        if self.get_key(handler) in self.keys():
             return self
 
         handlers = handler.get_required_handlers()
         for i, dependent_handler in enumerate(handlers):
-            if dependent_handler.get_name() in self.keys():
-                handlers[i] = self[dependent_handler.get_name()]
+            if self.get_key(dependent_handler) in self.keys():
+                handlers[i] = self[self.get_key(dependent_handler)]
             else:
                 self.add(dependent_handler)
 
         handler.link_required_handlers(handlers)
-        self[handler.get_name()] = handler
+        self[self.get_key(handler)] = handler
         return self
 
+    def update_handlers(self) -> None:
+        """ Required handlers are added before the ones requiring them, so they are updated first. """
+        for handler in self.values():
+            handler.update()
+
 
 class TradingSystem:
-    def __init__(self, trading_interface: TradingInterface, config: Config):
+    def __init__(self, trading_interface: TradingInterface, config: Config,
+                 timeframe: tp.Optional[Timeframe] = None,
+                 handlers: tp.Optional[Handlers] = None):
+        """
+        timeframe is the one of trading_interface candles, needed for handlers of other timeframes.
+        handlers are shared with other trading systems of the same interface: the owner of
+        them updates them, the trading system updates only its own orders.
+        """
         self.logger = Logger('TradingSystem')
         self.ti = trading_interface
         self.currency_asset = Asset(config['currency_asset'])
         self.wallet: tp.Dict[Asset, float] = {Asset(asset_name): amount
             for asset_name, amount in config['wallet'].items()}
+        # Assets valued at prices of their own pairs, others at the price of the main pair
+        self._pairs_by_asset: tp.Dict[Asset, AssetPair] = {
+            asset_pair.amount_asset: asset_pair for asset_pair in self.ti.get_asset_pairs()[1:]
+            if asset_pair.price_asset == self.currency_asset and
+            asset_pair.amount_asset != self.ti.get_asset_pairs()[0].amount_asset}
         self.stats = TradingStatistics(
             price_asset=self.currency_asset,
             initial_wallet=self.wallet,
             initial_balance=self.get_total_balance(),
             start_timestamp=self.ti.get_timestamp(),
             initial_coin_balance=self.get_total_coin_balance())
+        # Fee of a filled order in currency asset, accounted only in statistics
+        self.order_fee: float = config.get('order_fee', 0.)
+        self._paid_fees = 0.
+        self.abort_rules = AbortRules(config.get('abort_rules'))
+        # Amounts reserved by active orders
+        self.locked: tp.DefaultDict[Asset, float] = defaultdict(float)
         self.trading_signals: tp.List[Signal] = []
-        self.handlers = Handlers() \
-            .add(CandlesHandler(trading_interface)) \
-            .add(OrdersHandler(trading_interface))
+        self.timeframe = timeframe
+        # Candles of coarser timeframes by timeframe and asset pair, shared by their handlers
+        self._views: tp.Dict[tp.Tuple[str, tp.Optional[AssetPair]], TimeframeView] = {}
+        self._orders = OrdersHandler(trading_interface)
+        self._shares_handlers = handlers is not None
+        self.handlers = (handlers if handlers is not None else Handlers()) \
+            .add(CandlesHandler(trading_interface))
+        if not self._shares_handlers:
+            self.handlers.add(self._orders)
+        self._last_recorded_candle_ts = -1
+        self._record_equity(self.ti.get_timestamp())
         self.logger.info('Trading system initialized')
 
-    def add_handler(self, handler_type: tp.Any, params: tp.Dict[str, tp.Any]) -> TradingSystemHandlerT:
-        handler = handler_type(trading_interface=self.ti, **params)
+    def add_handler(self, handler_type: tp.Any, params: tp.Dict[str, tp.Any],
+                    timeframe: tp.Optional[str] = None,
+                    asset_pair: tp.Optional[AssetPair] = None) -> TradingSystemHandlerT:
+        """
+        With timeframe, a multiple of the trading system one, the handler sees
+        candles of it and is updated with a new candle only when one closes.
+        With asset_pair the handler sees candles and prices of that pair.
+        """
+        handler = handler_type(trading_interface=self._get_interface(timeframe, asset_pair), **params)
         self.handlers.add(handler)
-        return self.handlers[handler.get_name()]
+        return self.handlers[Handlers.get_key(handler)]
+
+    def _get_interface(self, timeframe: tp.Optional[str],
+                       asset_pair: tp.Optional[AssetPair] = None) -> TradingInterface:
+        ti = self._get_pair_interface(asset_pair)
+        if timeframe is None or self.timeframe is not None and \
+                Timeframe(timeframe).to_seconds() == self.timeframe.to_seconds():
+            return ti
+        if self.timeframe is None:
+            raise ValueError('Timeframe of the trading system is not set')
+        key = (timeframe, None if ti is self.ti else asset_pair)
+        view = self._views.get(key)
+        if view is None:
+            view = self._views[key] = TimeframeView(ti, self.timeframe, Timeframe(timeframe))
+        return view
+
+    def _get_pair_interface(self, asset_pair: tp.Optional[AssetPair]) -> TradingInterface:
+        return self.ti if asset_pair is None else self.ti.for_pair(asset_pair)
 
     def stop_trading(self) -> None:
         self.cancel_all()
         self.update()
 
     def get_trading_statistics(self) -> TradingStatistics:
+        require(self.stats.equity_log).shrink()
         stats = copy(self.stats)
         stats.set_hodl_result(require(self.stats.initial_coin_balance) * self.ti.get_sell_price())
         stats.set_final_wallet(self.get_wallet())
         stats.set_final_balance(self.get_total_balance())
         stats.set_finish_timestamp(self.get_timestamp())
+        if self.abort_rules.reason is not None:
+            stats.set_pruned(self.abort_rules.reason)
         return stats
 
     def update(self) -> None:
-        for handler in self.handlers.values():
-            handler.update()
-        for order in self.get_handler(OrdersHandler).get_new_filled_orders():
+        if self._shares_handlers:
+            self._orders.update()
+        else:
+            self.handlers.update_handlers()
+        for order in self._orders.get_new_filled_orders():
             self._handle_filled_order(order)
-            self.trading_signals.append(Signal('filled_order', copy(order)))
+            self.trading_signals.append(Signal('filled_order', order))
+        candle_ts = self.get_handler(CandlesHandler).get_last_candle_timestamp()
+        if candle_ts != self._last_recorded_candle_ts:
+            self._last_recorded_candle_ts = candle_ts
+            self._record_equity(candle_ts)
+
+    def is_aborted(self) -> bool:
+        """ Whether one of abort rules is broken and the run may be stopped. """
+        return self.abort_rules.reason is not None
 
     def get_trading_signals(self) -> tp.List[Signal]:
         signals = self.trading_signals
@@ -97,9 +186,9 @@ class TradingSystem:
 
     def create_order(self, asset_pair: AssetPair, amount: float) -> tp.Optional[Order]:
         if amount > 0:
-            return self.buy(asset_pair, amount, self.get_sell_price())
+            return self.buy(asset_pair, amount, self.get_sell_price(asset_pair))
         elif amount < 0:
-            return self.sell(asset_pair, -amount, self.get_buy_price())
+            return self.sell(asset_pair, -amount, self.get_buy_price(asset_pair))
         return None
 
     def buy(self, asset_pair: AssetPair, amount: float, price: float) -> tp.Optional[Order]:
@@ -109,14 +198,16 @@ class TradingSystem:
                 f"Order is not placed.")
             return None
         self.wallet[asset_pair.price_asset] -= price * amount
-        order = self.ti.buy(amount, price)
+        order = self._get_pair_interface(asset_pair).buy(amount, price)
         if not order:
             return None
-        self.logger.trading_event(BuyEvent(asset_pair,
-                                           amount,
-                                           price,
-                                           order.order_id))
-        self.get_handler(OrdersHandler).add_new_order(copy(order))
+        self.locked[asset_pair.price_asset] += price * amount
+        if self.logger.is_event_enabled(BuyEvent):
+            self.logger.trading_event(BuyEvent(asset_pair,
+                                               amount,
+                                               price,
+                                               order.order_id))
+        self._orders.add_new_order(order)
         return order
 
     def sell(self, asset_pair: AssetPair, amount: float, price: float) -> tp.Optional[Order]:
@@ -126,14 +217,16 @@ class TradingSystem:
                 f"Order is not placed.")
             return None
         self.wallet[asset_pair.amount_asset] -= amount
-        order = self.ti.sell(amount, price)
+        order = self._get_pair_interface(asset_pair).sell(amount, price)
         if not order:
             return None
-        self.logger.trading_event(SellEvent(asset_pair,
-                                            amount,
-                                            price,
-                                            order.order_id))
-        self.get_handler(OrdersHandler).add_new_order(copy(order))
+        self.locked[asset_pair.amount_asset] += amount
+        if self.logger.is_event_enabled(SellEvent):
+            self.logger.trading_event(SellEvent(asset_pair,
+                                                amount,
+                                                price,
+                                                order.order_id))
+        self._orders.add_new_order(order)
         return order
 
     def cancel_order(self, order: Order) -> None:
@@ -141,29 +234,38 @@ class TradingSystem:
         self._handle_canceled_order(order)
 
     def cancel_all(self) -> None:
-        self.ti.cancel_all()
-        active_orders = self.get_handler(OrdersHandler).get_active_orders()
+        active_orders = self._orders.get_active_orders()
+        if self._shares_handlers:
+            # Orders of other trading systems stay
+            for order in active_orders:
+                self.ti.cancel_order(order)
+        else:
+            self.ti.cancel_all()
         for order in active_orders:
             self._handle_canceled_order(order)
 
     def order_is_filled(self, order: Order) -> bool:
         return self.ti.order_is_filled(order)
 
-    def get_price_by_direction(self, direction: Direction) -> float:
-        return self.get_buy_price() if direction == Direction.BUY else self.get_sell_price()
+    def get_price_by_direction(self, direction: Direction,
+                               asset_pair: tp.Optional[AssetPair] = None) -> float:
+        return self.get_buy_price(asset_pair) if direction == Direction.BUY \
+            else self.get_sell_price(asset_pair)
 
-    def get_buy_price(self) -> float:
-        return self.ti.get_buy_price()
+    def get_buy_price(self, asset_pair: tp.Optional[AssetPair] = None) -> float:
+        """ Price of asset_pair, of the main pair by default. """
+        return self._get_pair_interface(asset_pair).get_buy_price()
 
-    def get_sell_price(self) -> float:
-        return self.ti.get_sell_price()
+    def get_sell_price(self, asset_pair: tp.Optional[AssetPair] = None) -> float:
+        """ Price of asset_pair, of the main pair by default. """
+        return self._get_pair_interface(asset_pair).get_sell_price()
 
     def get_active_orders(self) -> tp.Set[Order]:
-        return self.get_handler(OrdersHandler).get_active_orders()
+        return self._orders.get_active_orders()
 
     def get_balance(self) -> float:
         balance = self.wallet[self.currency_asset]
-        self.logger.info(f'Checking balance: {balance}')
+        self.logger.info('Checking balance: %s', balance)
         return balance
 
     def get_total_coin_balance(self) -> float:
@@ -183,31 +285,69 @@ class TradingSystem:
                 total_balance += amount
             else:
                 direction = Direction.from_value(-amount)
-                total_balance += amount * self.get_price_by_direction(direction)
+                total_balance += amount * self.get_price_by_direction(
+                    direction, self._pairs_by_asset.get(asset))
         return total_balance
 
     def get_wallet(self) -> tp.Dict[Asset, float]:
-        self.logger.info(f'Checking wallet: {self.wallet.items()}')
+        self.logger.info('Checking wallet: %s', self.wallet)
         return copy(self.wallet)
 
-    def get_last_n_candles(self, n: int) -> tp.List[Candle]:
-        return self.ti.get_last_n_candles(n)
+    def get_last_n_candles(self, n: int, asset_pair: tp.Optional[AssetPair] = None) -> tp.List[Candle]:
+        return self._get_pair_interface(asset_pair).get_last_n_candles(n)
 
     def get_handler(self, cls: tp.Type[TradingSystemHandlerT]) \
             -> TradingSystemHandlerT:
+        if cls is OrdersHandler:
+            return self._orders  # type: ignore
         return self.handlers[cls.__name__]
 
+    def _record_equity(self, timestamp: int) -> None:
+        """
+        Mark-to-market balance including amounts reserved by active orders.
+        Assets of other pairs are recorded in position as their value in the main pair asset.
+        """
+        currency = self.wallet.get(self.currency_asset, 0.) + self.locked[self.currency_asset]
+        position = 0.0
+        other_pairs_value = 0.0
+        for asset, amount in self.wallet.items():
+            if asset == self.currency_asset:
+                continue
+            amount += self.locked[asset]
+            asset_pair = self._pairs_by_asset.get(asset)
+            if asset_pair is None:
+                position += amount
+            else:
+                other_pairs_value += amount * self.get_price_by_direction(
+                    Direction.from_value(-amount), asset_pair)
+        price = self.get_price_by_direction(Direction.from_value(-position))
+        balance = currency + position * price + other_pairs_value
+        if other_pairs_value and not math.isclose(price, 0):
+            position += other_pairs_value / price
+        self.stats.add_candle(timestamp, balance, position, price)
+        if self.abort_rules.is_enabled() and not self.is_aborted():
+            hodl = require(self.stats.initial_coin_balance) * self.ti.get_sell_price()
+            reason = self.abort_rules.update(timestamp, balance - self._paid_fees, hodl)
+            if reason is not None:
+                self.logger.warning('Abort rule broken: %s', reason)
+
     def _handle_canceled_order(self, order: Order) -> None:
-        self.get_handler(OrdersHandler).cancel_order(order)
+        self._orders.cancel_order(order)
         if order.direction == Direction.BUY:
             self.wallet[order.asset_pair.price_asset] += order.price * order.amount
+            self.locked[order.asset_pair.price_asset] -= order.price * order.amount
         else:  # Direction.SELL
             self.wallet[order.asset_pair.amount_asset] += order.amount
-        self.logger.trading_event(CancelEvent(order))
+            self.locked[order.asset_pair.amount_asset] -= order.amount
+        if self.logger.is_event_enabled(CancelEvent):
+            self.logger.trading_event(CancelEvent(order))
 
     def _handle_filled_order(self, order: Order) -> None:
         if order.direction == Direction.BUY:
             self.wallet[order.asset_pair.amount_asset] += order.amount
+            self.locked[order.asset_pair.price_asset] -= order.price * order.amount
         else:  # Direction.SELL
             self.wallet[order.asset_pair.price_asset] += order.price * order.amount
-        self.stats.add_filled_order(copy(order))
+            self.locked[order.asset_pair.amount_asset] -= order.amount
+        self._paid_fees += self.order_fee
+        self.stats.add_filled_order(order, self.get_timestamp(), self.order_fee)
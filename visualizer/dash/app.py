@@ -4,16 +4,20 @@ import dash_html_components as html
 from dash.dependencies import Input, Output, State
 from dash.exceptions import PreventUpdate
 
+import numpy as np
 import plotly.graph_objects as go
 
 import sys
+from datetime import datetime
 
 sys.path.append('.')
 
 import visualizer.visualize_log as log
-from visualizer.visualizer import Visualizer
+from visualizer.visualizer import Visualizer, to_time
 from pathlib import Path
+from logger.event_log import EventLogReader, EventLogTailer
 from logger.logger import Logger
+from trading import TimeRange
 
 import typing as tp
 
@@ -23,6 +27,17 @@ log_path: tp.Optional[str] = None
 if log_path_opt is not None:
     log_path = log_path_opt.name
 load_last_log_clicks = 0
+# Zoomed range of the chart, candles and curves are re-queried for it
+time_range: tp.Optional[TimeRange] = None
+# Range of the events loaded into the visualizer, the whole log if None
+loaded_range: tp.Optional[TimeRange] = None
+# Follows the log of a running session
+tailer: tp.Optional[EventLogTailer] = None
+# Indices of traces that new points are appended to, by 'candles', 'buy', 'sell' and curve names
+live_trace_indices: tp.Dict[str, int] = {}
+# Candles kept on the chart while following a running session
+LIVE_WINDOW = 2000
+LIVE_UPDATE_INTERVAL_MS = 2000
 
 external_stylesheets = ['https://codepen.io/chriddyp/pen/bWLwgP.css']
 
@@ -41,7 +56,8 @@ app.layout = html.Div([
                     id='general-checklist',
                     options=[
                         {'label': 'Show future', 'value': 'FUT'},
-                        {'label': 'Buy/Sell Events', 'value': 'B/S'}
+                        {'label': 'Buy/Sell Events', 'value': 'B/S'},
+                        {'label': 'Follow run', 'value': 'LIVE'}
                     ],
                     value=['B/S']
                 )
@@ -110,6 +126,9 @@ app.layout = html.Div([
     html.Div([
         dcc.Graph(id='candlestick-chart', style={'height': '90%'}),
         dcc.Slider(id='timestamp-slider', updatemode='drag'),
+        dcc.Interval(id='live-interval', interval=LIVE_UPDATE_INTERVAL_MS),
+        dcc.Store(id='live-update'),
+        html.Div(id='live-update-applied', style={'display': 'none'}),
     ], style={'height': '100%'})
 ], style={'height': '80vh'})
 
@@ -119,6 +138,7 @@ CheckLst = tp.List[tp.Dict[str, str]]
 @app.callback(
     [Output('timestamp-slider', 'min'),
      Output('timestamp-slider', 'max'),
+     Output('timestamp-slider', 'step'),
      Output('timestamp-slider', 'value'),
      Output('log-filename-box', 'value'),
      Output('indicators-checklist-0', 'options'),
@@ -132,7 +152,7 @@ CheckLst = tp.List[tp.Dict[str, str]]
     [State('log-filename-box', 'value')])
 def update_log(n_log_clicks: tp.Optional[int],
                n_last_log_clicks: tp.Optional[int],
-               value: tp.Optional[str]) -> tp.Tuple[int, int, int, str,
+               value: tp.Optional[str]) -> tp.Tuple[int, int, int, int, str,
                                                     CheckLst, CheckLst,
                                                     CheckLst, CheckLst,
                                                     CheckLst]:
@@ -151,8 +171,16 @@ def update_log(n_log_clicks: tp.Optional[int],
     chks = generate_indicators_options(curves)
     if vis is None:
         raise PreventUpdate
-    layers = vis.get_layers()
-    return 0, len(layers), len(layers) // 2, value, chks[0], chks[1], chks[2], \
+    # The slider holds candle timestamps, so its position survives reloads of other ranges
+    layers_count = vis.get_layers_count()
+    if layers_count == 0:
+        first_ts = last_ts = middle_ts = 0
+        step = 1
+    else:
+        first_ts, last_ts = vis.get_layer_ts(0), vis.get_layer_ts(layers_count - 1)
+        middle_ts = vis.get_layer_ts(layers_count // 2)
+        step = vis.get_layer_ts(1) - first_ts if layers_count > 1 else 1
+    return first_ts, last_ts, step, middle_ts, value, chks[0], chks[1], chks[2], \
            chks[3], chks[4]
 
 
@@ -163,21 +191,47 @@ def update_log(n_log_clicks: tp.Optional[int],
                Input('indicators-checklist-2', 'value'),
                Input('indicators-checklist-3', 'value'),
                Input('indicators-checklist-4', 'value'),
-               Input('general-checklist', 'value')])
+               Input('general-checklist', 'value'),
+               Input('candlestick-chart', 'relayoutData'),
+               Input('live-update', 'data')])
 def update_candlestick_chart(timestamp: int, ind1: tp.List[str],
                              ind2: tp.List[str], ind3: tp.List[str],
                              ind4: tp.List[str], ind5: tp.List[str],
-                             general_info: tp.List[str]) -> go.Figure:
+                             general_info: tp.List[str],
+                             relayout_data: tp.Optional[tp.Dict[str, tp.Any]],
+                             live_update: tp.Optional[tp.Dict[str, tp.Any]]) -> go.Figure:
     indicators = [*ind1, *ind2, *ind3, *ind4, *ind5]
     global vis
     if vis is None or timestamp is None:
         raise PreventUpdate
-    layers = vis.get_layers()
-    timestamp = min(timestamp, len(layers) - 1)
-    layer = layers[timestamp]
+    triggers = [trigger['prop_id'] for trigger in dash.callback_context.triggered]
+    if triggers == ['live-update.data'] and 'candles' in live_trace_indices and \
+            not (live_update and live_update.get('rebuild')):
+        # New points are appended by the browser, the figure is built here only for the first candles
+        # and when normalized curves are scaled to a new price range
+        raise PreventUpdate
+    live = 'LIVE' in general_info and tailer is not None
+    update_time_range(relayout_data)
+    if tailer is None and log_path is not None and not covers(loaded_range, time_range):
+        # Zoomed out of the loaded events, they are loaded again for the visible range
+        reload_candlestick_from(log_path)
+    if vis.get_layers_count() == 0:
+        # The running session has not logged candles yet
+        return go.Figure(layout=vis.get_layout())
+    if live:
+        # New points are appended to the last frame
+        vis.trim(LIVE_WINDOW)
+        ind = vis.get_layers_count() - 1
+    else:
+        ind = vis.get_layer_index(timestamp)
+    # Only the frame of the current slider position is built
+    layer = vis.get_layer(ind, time_range)
     traces = layer.get_traces()
+    if live:
+        update_live_trace_indices(traces)
     visibility = layer.get_visibility_params(
-        candles_future='FUT' in general_info,
+        candles_future='FUT' in general_info and not live,
+        ts_line=not live,
         trends='T' in indicators,
         buy='B/S' in general_info,
         sell='B/S' in general_info,
@@ -188,9 +242,112 @@ def update_candlestick_chart(timestamp: int, ind1: tp.List[str],
         trace['visible'] = visible
     fig = go.Figure(data=traces, layout=layout)
     fig.update_yaxes(automargin=True)
+    if time_range is not None:
+        fig.update_xaxes(range=[to_time(time_range.from_ts),
+                                to_time(time_range.to_ts)])
+    elif live:
+        fig.update_xaxes(autorange=True)
+        fig.update_yaxes(autorange=True)
     return fig
 
 
+@app.callback(Output('live-update', 'data'),
+              [Input('live-interval', 'n_intervals')],
+              [State('general-checklist', 'value')])
+def tail_log(n_intervals: tp.Optional[int],
+             general_info: tp.List[str]) -> tp.Dict[str, tp.Any]:
+    """
+    Reads events flushed since the last call and sends only the new points
+    to the browser, the figure is not rebuilt.
+    """
+    if vis is None or tailer is None or 'LIVE' not in general_info:
+        raise PreventUpdate
+    events = tailer.read_new()
+    if not events:
+        raise PreventUpdate
+    had_candles = vis.get_layers_count() > 0
+    y_range = vis.get_y_range()
+    new_points = log.extend_visualizer_from_log(vis, log.decompose_log(events))
+    if not had_candles and vis.get_layers_count() > 0:
+        # The first candles of the session, the figure is built by update_candlestick_chart
+        return {'groups': [], 'max_points': LIVE_WINDOW}
+    vis.trim(LIVE_WINDOW)
+    if vis.get_y_range() != y_range:
+        # Points on the chart were scaled to the previous range, the figure is built again
+        return {'groups': [], 'max_points': LIVE_WINDOW, 'rebuild': True}
+    groups = []
+    if 'candles' in new_points and 'candles' in live_trace_indices:
+        groups.append({'data': to_extend_data([new_points.pop('candles')]),
+                       'indices': [live_trace_indices['candles']]})
+    names = [name for name in new_points
+             if name != 'candles' and name in live_trace_indices]
+    if names:
+        groups.append({'data': to_extend_data([new_points[name] for name in names]),
+                       'indices': [live_trace_indices[name] for name in names]})
+    if not groups:
+        raise PreventUpdate
+    return {'groups': groups, 'max_points': LIVE_WINDOW}
+
+
+# Plotly.extendTraces takes only keys present in all updated traces,
+# so candles and scatter traces are extended in separate calls
+app.clientside_callback(
+    """
+    function(update) {
+        if (!update) {
+            return window.dash_clientside.no_update;
+        }
+        var graph = document.querySelector('#candlestick-chart .js-plotly-plot');
+        update.groups.forEach(function(group) {
+            Plotly.extendTraces(graph, group.data, group.indices, update.max_points);
+        });
+        return '';
+    }
+    """,
+    Output('live-update-applied', 'children'),
+    [Input('live-update', 'data')])
+
+
+def update_live_trace_indices(traces: tp.List[tp.Any]) -> None:
+    global live_trace_indices
+    # Order of GraphicLayer.get_traces: ts line, history, future, sell, buy, trends, curves
+    live_trace_indices = {'candles': 1, 'sell': 3, 'buy': 4}
+    for i, trace in enumerate(traces[5:], start=5):
+        if trace.name is not None:
+            live_trace_indices[trace.name] = i
+
+
+def to_extend_data(traces_data: tp.List[tp.Dict[str, np.ndarray]]) \
+        -> tp.Dict[str, tp.List[tp.List[tp.Any]]]:
+    return {key: [np.datetime_as_string(data[key]).tolist() if key == 'x'
+                  else data[key].tolist() for data in traces_data]
+            for key in traces_data[0]}
+
+
+def update_time_range(relayout_data: tp.Optional[tp.Dict[str, tp.Any]]) -> None:
+    global time_range
+    if not relayout_data:
+        return
+    if relayout_data.get('xaxis.autorange'):
+        time_range = None
+    elif 'xaxis.range[0]' in relayout_data:
+        time_range = TimeRange(parse_axis_time(relayout_data['xaxis.range[0]']),
+                               parse_axis_time(relayout_data['xaxis.range[1]']))
+    elif 'xaxis.range' in relayout_data:
+        time_range = TimeRange(*map(parse_axis_time, relayout_data['xaxis.range']))
+
+
+def covers(outer: tp.Optional[TimeRange], inner: tp.Optional[TimeRange]) -> bool:
+    """ Whether inner is inside outer, None is the whole log. """
+    if outer is None:
+        return True
+    return inner is not None and outer.from_ts <= inner.from_ts and inner.to_ts <= outer.to_ts
+
+
+def parse_axis_time(value: str) -> int:
+    return int(datetime.fromisoformat(value).timestamp())
+
+
 def generate_indicators_options(labels: tp.List[str]) \
         -> tp.Tuple[
             CheckLst, CheckLst, CheckLst,
@@ -209,15 +366,29 @@ def generate_indicators_options(labels: tp.List[str]) \
 
 
 def reload_candlestick_from(new_log_path: str) -> tp.List[str]:
-    global vis, log_path
+    global vis, log_path, time_range, loaded_range, tailer, live_trace_indices
+    if new_log_path != log_path:
+        time_range = None
     log_path = new_log_path
-    decomposed_log = load_log(new_log_path)
+    loaded_range = None
+    live_trace_indices = {}
+    path = get_log_path(new_log_path)
+    if EventLogReader.is_event_log(path) and \
+            not EventLogReader(path).is_complete():
+        # The session is still running, its log is followed from here
+        tailer = EventLogTailer(path)
+        decomposed_log = log.decompose_log(tailer.read_new())
+    else:
+        tailer = None
+        # Only the visible range is decoded, the rest is loaded when the chart is zoomed out
+        decomposed_log = log.load_decomposed_log(path, time_range)
+        loaded_range = time_range
     current_curves = log.get_all_curve_names(decomposed_log)
     vis = log.create_visualizer_from_log(decomposed_log)
     return current_curves
 
 
-def load_log(filename: str) -> log.DecomposedLogType:
+def get_log_path(filename: str) -> Path:
     path = Path(Logger.get_logs_path('dump') / filename)
     if not path.is_file():
         path_opt = log.get_log_path()
@@ -227,8 +398,7 @@ def load_log(filename: str) -> log.DecomposedLogType:
     if path is None:
         raise RuntimeError('Incorrect path to log')
     print(path)
-    logs = log.load_log(path)
-    return log.decompose_log(logs)
+    return path
 
 
 if __name__ == '__main__':
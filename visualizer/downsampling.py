@@ -0,0 +1,57 @@
+import math
+
+import numpy as np
+import typing as tp
+
+
+def get_bucket_size(points: int, max_points: int) -> int:
+    return max(1, math.ceil(points / max_points))
+
+
+def aggregate_ohlc(candle_params: tp.Dict[str, np.ndarray],
+                   bucket_size: int) -> tp.Dict[str, np.ndarray]:
+    """
+    Merges every bucket_size consecutive candles into one.
+    Columns other than open, high, low and close take the value of the first candle.
+    """
+    if bucket_size == 1:
+        return candle_params
+    size = len(candle_params['open'])
+    if size == 0:
+        return candle_params
+    starts = np.arange(0, size, bucket_size)
+    ends = np.minimum(starts + bucket_size, size) - 1
+    aggregated = {param: column[starts] for param, column in candle_params.items()}
+    aggregated['close'] = candle_params['close'][ends]
+    aggregated['high'] = np.maximum.reduceat(candle_params['high'], starts)
+    aggregated['low'] = np.minimum.reduceat(candle_params['low'], starts)
+    return aggregated
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Indices of points kept by Largest-Triangle-Three-Buckets downsampling.
+    First and last points are always kept, from every bucket in between
+    the point forming the largest triangle with its neighbours is taken.
+    """
+    size = len(x)
+    if size <= max_points or max_points < 3:
+        return np.arange(size)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, size - 1, max_points - 1).astype(np.int64)
+    edges = np.append(edges, size)
+    indices = np.empty(max_points, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = size - 1
+    selected = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        areas = np.abs((x[selected] - avg_x) * (y[start:end] - y[selected]) -
+                       (x[selected] - x[start:end]) * (avg_y - y[selected]))
+        selected = start + int(np.argmax(areas))
+        indices[bucket + 1] = selected
+    return indices
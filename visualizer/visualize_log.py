@@ -9,9 +9,10 @@ from pathlib import Path
 from collections import defaultdict
 
 import logger.log_events as log_events
+from logger.event_log import EventLogReader
 from logger.logger import Logger
 from visualizer.visualizer import Visualizer
-from trading import Candle
+from trading import Candle, TimeRange
 
 LogEntryType = tp.Dict[str, tp.Any]
 DecomposedLogType = tp.Dict[tp.Type[log_events.LogEvent],
@@ -27,13 +28,16 @@ def get_log_path() -> tp.Optional[Path]:
     return max(logs, key=os.path.getctime)
 
 
-def load_log(filename: Path) -> tp.List[tp.Dict[str, tp.Any]]:
+def load_log(filename: Path) -> tp.Iterable[LogEntryType]:
+    """ Streams events of the log, dumps of older runs are unpickled whole. """
+    if EventLogReader.is_event_log(filename):
+        return EventLogReader(filename)
     with open(filename, 'rb') as f:
-        log = pickle.load(f)
+        log: tp.List[LogEntryType] = pickle.load(f)
     return log
 
 
-def decompose_log(log: tp.List[LogEntryType]) \
+def decompose_log(log: tp.Iterable[LogEntryType]) \
         -> DecomposedLogType:
     events = defaultdict(list)
     for event in log:
@@ -41,6 +45,27 @@ def decompose_log(log: tp.List[LogEntryType]) \
     return events
 
 
+def load_decomposed_log(filename: Path,
+                        time_range: tp.Optional[TimeRange] = None) \
+        -> DecomposedLogType:
+    """
+    Events of the log grouped by type, only of time_range if it is given.
+    Indexed event logs are read by their index, so only chunks of time_range are decoded.
+    """
+    from_ts, to_ts = (None, None) if time_range is None else \
+        (time_range.from_ts, time_range.to_ts)
+    reader = EventLogReader(filename) if EventLogReader.is_event_log(filename) else None
+    if reader is None or not reader.is_indexed():
+        return decompose_log(
+            event for event in load_log(filename)
+            if (from_ts is None or event['ts'] >= from_ts)
+            and (to_ts is None or event['ts'] <= to_ts))
+    events: DecomposedLogType = defaultdict(list)
+    for event_type in reader.get_event_types():
+        events[event_type] = list(reader.events(event_type, from_ts, to_ts))
+    return events
+
+
 def get_candles(candles_log: tp.List[LogEntryType]) \
         -> tp.List[Candle]:
     return [candle['candle'] for candle in candles_log]
@@ -107,14 +132,41 @@ def create_visualizer_from_log(
     return vis
 
 
+def extend_visualizer_from_log(
+        vis: Visualizer,
+        decomposed_log: DecomposedLogType) -> tp.Dict[str, tp.Dict[str, tp.Any]]:
+    """
+    Appends new events of a running session to vis.
+    Returns trace data of appended points by 'candles', 'buy', 'sell' and curve names.
+    """
+    new_points: tp.Dict[str, tp.Dict[str, tp.Any]] = {}
+    candles = get_candles(decomposed_log[log_events.NewCandleEvent])
+    if candles:
+        new_points['candles'] = vis.extend_candles(candles)
+    vis.add_trend_lines(decomposed_log[log_events.TrendLinesEvent])
+
+    for curve_type in extract_curve_events(decomposed_log):
+        for param, events in \
+                decompose_by_params(decomposed_log[curve_type]).items():
+            curve_name = ' '.join([curve_type.name, param])
+            new_points[curve_name] = vis.extend_curve(events, curve_name)
+
+    if decomposed_log[log_events.BuyEvent]:
+        new_points['buy'] = vis.extend_buy_events(
+            *process_buy_sell_events(decomposed_log[log_events.BuyEvent]))
+    if decomposed_log[log_events.SellEvent]:
+        new_points['sell'] = vis.extend_sell_events(
+            *process_buy_sell_events(decomposed_log[log_events.SellEvent]))
+    return new_points
+
+
 if __name__ == '__main__':
     path = get_log_path()
     if path is None:
         print('Log not found')
         exit(0)
     print(path)
-    log = load_log(path)
-    decomposed_log = decompose_log(log)
+    decomposed_log = load_decomposed_log(path)
     vis = create_visualizer_from_log(decomposed_log)
     fig = vis.plot()
     fig.show()
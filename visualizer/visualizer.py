@@ -5,12 +5,16 @@ import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime
 import typing as tp
-import bisect
 
-from trading import TrendLine, Candle
+from trading import TrendLine, Candle, TimeRange
+from visualizer.downsampling import aggregate_ohlc, get_bucket_size, lttb_indices
 
 # fix for Windows https://bugs.python.org/issue36439
 MIN_TIMESTAMP = 86400
+# Scatter traces with more points are drawn with WebGL
+WEBGL_THRESHOLD = 1000
+
+ScatterType = tp.Union[go.Scatter, go.Scattergl]
 
 
 def to_time(ts: int) -> datetime:
@@ -25,6 +29,15 @@ def timestamp_to_full(ts: int) -> str:
     return to_time(ts).strftime('%m-%d %H:%M:%S')
 
 
+def to_times(timestamps: tp.Iterable[int]) -> np.ndarray:
+    """ Local times as datetime64 column, plotly takes it without conversion. """
+    return np.array([to_time(ts) for ts in timestamps], dtype='datetime64[us]')
+
+
+def get_scatter_type(points: int) -> tp.Type[ScatterType]:
+    return go.Scattergl if points > WEBGL_THRESHOLD else go.Scatter
+
+
 class GraphicLayer:
     __red = '#EF4F41'
     __green = '#41EF4F'
@@ -39,7 +52,7 @@ class GraphicLayer:
         self.buy_trace = None
         self.sell_trace = None
         self.trend_traces: tp.List[go.Scatter] = []
-        self.curve_traces: tp.List[go.Scatter] = []
+        self.curve_traces: tp.List[ScatterType] = []
         self.ts_line = go.Scatter(visible=False,
                                   x=[to_time(ts), to_time(ts)],
                                   y=[visualizer._y_min, visualizer._y_max],
@@ -51,16 +64,22 @@ class GraphicLayer:
                                   ),
                                   name=f'Time: {timestamp_to_full(self.ts)}')
 
-    def add_candles(self, candle_params: tp.Dict[str, tp.List[tp.Any]],
-                    prefix_len: int) -> None:
-        self.left_candle_trace = go.Candlestick(
-            visible=prefix_len == 0,
-            x=[to_time(ts) for ts in
-               candle_params['ts'][:prefix_len]],
-            open=candle_params['open'][:prefix_len],
-            high=candle_params['high'][:prefix_len],
-            low=candle_params['low'][:prefix_len],
-            close=candle_params['close'][:prefix_len],
+    def add_candles(self, history: tp.Dict[str, np.ndarray],
+                    future: tp.Dict[str, np.ndarray]) -> None:
+        self.left_candle_trace = self.__get_candle_trace(
+            history, 'history WAVES/USDN')  # TODO: normal title
+        self.right_candle_trace = self.__get_candle_trace(
+            future, 'future WAVES/USDN')  # TODO: normal title
+
+    def __get_candle_trace(self, candle_params: tp.Dict[str, np.ndarray],
+                           name: str) -> go.Candlestick:
+        return go.Candlestick(
+            visible=False,
+            x=candle_params['time'],
+            open=candle_params['open'],
+            high=candle_params['high'],
+            low=candle_params['low'],
+            close=candle_params['close'],
             increasing=dict(
                 line=dict(
                     color=self.__green
@@ -72,28 +91,7 @@ class GraphicLayer:
                 )
             ),
             showlegend=True,
-            name='history WAVES/USDN'  # TODO: normal title
-        )
-        self.right_candle_trace = go.Candlestick(
-            visible=prefix_len == 0,
-            x=[to_time(ts) for ts in
-               candle_params['ts'][prefix_len:]],
-            open=candle_params['open'][prefix_len:],
-            high=candle_params['high'][prefix_len:],
-            low=candle_params['low'][prefix_len:],
-            close=candle_params['close'][prefix_len:],
-            increasing=dict(
-                line=dict(
-                    color=self.__green
-                )
-            ),
-            decreasing=dict(
-                line=dict(
-                    color=self.__red
-                )
-            ),
-            showlegend=True,
-            name='future WAVES/USDN'  # TODO: normal title
+            name=name
         )
 
     def add_trend_line(self, trend_line: TrendLine, trend_length: int = 30,
@@ -114,12 +112,12 @@ class GraphicLayer:
         self.trend_traces.append(trend_trace)
 
     def add_curve(self,
-                  curve: tp.List[float],
-                  timestamps: tp.List[datetime],
+                  curve: np.ndarray,
+                  timestamps: np.ndarray,
                   line_name: str,
-                  meta: tp.List[str]) -> None:
+                  meta: np.ndarray) -> None:
         color = px.colors.qualitative.Pastel[len(self.curve_traces)]
-        curve_trace = go.Scatter(visible=False,
+        curve_trace = get_scatter_type(len(curve))(visible=False,
                                  x=timestamps,
                                  y=curve,
                                  mode='lines',
@@ -129,10 +127,10 @@ class GraphicLayer:
                                  )
         self.curve_traces.append(curve_trace)
 
-    def add_buy_events(self, timestamps: tp.List[int], prices: tp.List[float],
-                       amount: tp.List[float], meta: tp.List[str]) -> None:
-        self.buy_trace = go.Scatter(visible=False,
-                                    x=[to_time(ts) for ts in timestamps],
+    def add_buy_events(self, times: np.ndarray, prices: np.ndarray,
+                       amount: np.ndarray, meta: np.ndarray) -> None:
+        self.buy_trace = get_scatter_type(len(times))(visible=False,
+                                    x=times,
                                     y=prices,
                                     mode='markers',
                                     name='buy',
@@ -143,10 +141,10 @@ class GraphicLayer:
                                         symbol='arrow-up'),
                                     text=meta)
 
-    def add_sell_events(self, timestamps: tp.List[int], prices: tp.List[float],
-                        amount: tp.List[float], meta: tp.List[str]) -> None:
-        self.sell_trace = go.Scatter(visible=False,
-                                     x=[to_time(ts) for ts in timestamps],
+    def add_sell_events(self, times: np.ndarray, prices: np.ndarray,
+                        amount: np.ndarray, meta: np.ndarray) -> None:
+        self.sell_trace = get_scatter_type(len(times))(visible=False,
+                                     x=times,
                                      y=prices,
                                      mode='markers',
                                      name='sell',
@@ -157,7 +155,7 @@ class GraphicLayer:
                                          symbol='arrow-down'),
                                      text=meta)
 
-    def get_traces(self) -> tp.List[tp.Union[go.Scatter, go.Candlestick]]:
+    def get_traces(self) -> tp.List[tp.Union[ScatterType, go.Candlestick]]:
         return [self.ts_line, self.left_candle_trace, self.right_candle_trace,
                 self.sell_trace, self.buy_trace,
                 *self.trend_traces,
@@ -190,27 +188,78 @@ class GraphicLayer:
 
 
 def _slice_candles_by_attrs(candles: tp.List[Candle]) \
-        -> tp.Dict[str, tp.List[tp.Any]]:
-    return {
-        param: [
-            float(candle.__getattribute__(param))
-            for candle in candles
-            if (float(candle.open) != 0 or float(candle.close) != 0)
-        ]
-        for param in ['ts', 'open', 'close', 'high', 'low']
+        -> tp.Dict[str, np.ndarray]:
+    candles = [candle for candle in candles
+               if float(candle.open) != 0 or float(candle.close) != 0]
+    params = {
+        param: np.array([float(candle.__getattribute__(param))
+                         for candle in candles])
+        for param in ['open', 'close', 'high', 'low']
     }
+    params['ts'] = np.array([candle.ts for candle in candles], dtype=np.int64)
+    params['time'] = to_times(params['ts'])
+    return params
+
+
+class _EventColumns(tp.NamedTuple):
+    timestamps: np.ndarray
+    times: np.ndarray
+    values: np.ndarray
+    amount: np.ndarray
+    meta: np.ndarray
+    # Values of curves with min and max value, normalized to [0, 1]
+    normalized: np.ndarray
+
+    def take(self, indices: tp.Union[slice, np.ndarray]) -> tp.Tuple[np.ndarray, ...]:
+        return (self.times[indices], self.values[indices],
+                self.amount[indices], self.meta[indices])
+
+    def concat(self, other: _EventColumns) -> _EventColumns:
+        return _EventColumns(*(np.concatenate((column, other_column))
+                               for column, other_column in zip(self, other)))
+
+    def since(self, ts: int) -> _EventColumns:
+        start = int(np.searchsorted(self.timestamps, ts, side='left'))
+        return _EventColumns(*(column[start:] for column in self))
+
+    def get_trace_data(self) -> tp.Dict[str, np.ndarray]:
+        return {'x': self.times, 'y': self.values, 'text': self.meta}
+
+
+def _get_event_columns(timestamps: tp.Sequence[int], values: tp.Sequence[float],
+                       amount: tp.Sequence[float], meta: tp.Sequence[str],
+                       normalized: tp.Optional[tp.Sequence[bool]] = None) -> _EventColumns:
+    ts_column = np.array(timestamps, dtype=np.int64)
+    return _EventColumns(ts_column, to_times(ts_column),
+                         np.array(values, dtype=np.float64),
+                         np.array(amount, dtype=np.float64),
+                         np.array(meta, dtype=object),
+                         np.zeros(len(ts_column), dtype=bool) if normalized is None
+                         else np.array(normalized, dtype=bool))
 
 
 class Visualizer:
+    """
+    Keeps one copy of candle, curve and event columns,
+    traces of a single time slider position are built by get_layer on demand.
+    Candles and curves of the shown time range are downsampled to max_points.
+    """
     __red = '#EF4F41'
     __green = '#41EF4F'
     __blue = '#4F41EF'
     __gray = '#787778'
 
-    def __init__(self) -> None:
-        self._candles: tp.List[Candle] = []
-        self._candle_params: tp.Dict[str, tp.List[tp.Any]] = {}
-        self._layers: tp.List[GraphicLayer] = []
+    def __init__(self, max_points: int = 2000) -> None:
+        self._max_points = max_points
+        self._candle_params: tp.Dict[str, np.ndarray] = {}
+        self._timestamps: np.ndarray = np.array([], dtype=np.int64)
+        # Trend lines by timestamp of the candle they are shown at
+        self._trend_lines: tp.Dict[int, tp.Tuple[tp.Optional[TrendLine],
+                                                 tp.Optional[TrendLine]]] = {}
+        self._trend_length = 30
+        self._curves: tp.Dict[str, _EventColumns] = {}
+        self._buy_events = _get_event_columns([], [], [], [])
+        self._sell_events = self._buy_events
         self._y_min: float = 0
         self._y_max: float = 0
         self._ts_min: datetime = to_time(MIN_TIMESTAMP + 1)
@@ -235,173 +284,258 @@ class Visualizer:
         })
 
     def add_candles(self, candles: tp.List[Candle]) -> None:
-        self._candles = candles
         self._candle_params = _slice_candles_by_attrs(candles)
         self.__init_params_from_candles()
-        for i, candle in enumerate(candles):
-            self.__add_layer(candle.ts)
-            self._layers[i].add_candles(self._candle_params, i)
 
     def add_trend_lines(self,
                         trend_lines: tp.List[tp.Dict[str, tp.Any]],
                         trend_length: int = 30) -> None:
+        self._trend_length = trend_length
         for event in trend_lines:
-            lower_trend_line = event['lower_trend_line']
-            upper_trend_line = event['upper_trend_line']
-            ts = event['ts']
-            ind = self.__get_ind_by_ts(ts)
-            if len(self._layers[ind].trend_traces) > 0:
-                self._layers[ind].trend_traces = []
-            if upper_trend_line is not None:
-                self._layers[ind].add_trend_line(upper_trend_line,
-                                                 trend_length,
-                                                 name_suffix="upper line")
-            if lower_trend_line is not None:
-                self._layers[ind].add_trend_line(lower_trend_line,
-                                                 trend_length,
-                                                 name_suffix="lower line")
+            ind = self.__get_ind_by_ts(event['ts'])
+            self._trend_lines[int(self._timestamps[ind])] = \
+                (event['lower_trend_line'], event['upper_trend_line'])
 
     def add_curve(self,
                   curve_events: tp.List[tp.Dict[str, tp.Any]],
                   curve_name: str) -> None:
+        self._curves[curve_name] = self.__get_curve(curve_events, curve_name)
+
+    def extend_candles(self, candles: tp.List[Candle]) -> tp.Dict[str, np.ndarray]:
+        """
+        Appends candles of a running session.
+        Returns the appended columns in the form of candlestick trace data.
+        """
+        new_params = _slice_candles_by_attrs(candles)
+        if len(new_params['ts']) == 0:
+            return {}
+        if not self._candle_params:
+            self._candle_params = new_params
+        else:
+            self._candle_params = {
+                param: np.concatenate((column, new_params[param]))
+                for param, column in self._candle_params.items()}
+        self.__init_params_from_candles()
+        return {'x': new_params['time'], 'open': new_params['open'],
+                'high': new_params['high'], 'low': new_params['low'],
+                'close': new_params['close']}
+
+    def extend_curve(self,
+                     curve_events: tp.List[tp.Dict[str, tp.Any]],
+                     curve_name: str) -> tp.Dict[str, np.ndarray]:
+        """
+        Appends points of a running session, returns them as scatter trace data
+        scaled to the current price range.
+        """
+        curve = self.__get_curve(curve_events, curve_name)
+        if curve_name in self._curves:
+            self._curves[curve_name] = self._curves[curve_name].concat(curve)
+        else:
+            self._curves[curve_name] = curve
+        return {**curve.get_trace_data(), 'y': self.__scale(curve.values, curve.normalized)}
+
+    def extend_buy_events(self, timestamps: tp.List[int], prices: tp.List[float],
+                          amount: tp.List[float], meta: tp.List[str]) -> tp.Dict[str, np.ndarray]:
+        events = self.__get_buy_sell_events(timestamps, prices, amount, meta, is_buy=True)
+        self._buy_events = self._buy_events.concat(events)
+        return events.get_trace_data()
+
+    def extend_sell_events(self, timestamps: tp.List[int], prices: tp.List[float],
+                           amount: tp.List[float], meta: tp.List[str]) -> tp.Dict[str, np.ndarray]:
+        events = self.__get_buy_sell_events(timestamps, prices, amount, meta, is_buy=False)
+        self._sell_events = self._sell_events.concat(events)
+        return events.get_trace_data()
+
+    def trim(self, max_candles: int) -> None:
+        """ Keeps only the last max_candles candles and events since the first of them. """
+        if len(self._timestamps) <= max_candles:
+            return
+        self._candle_params = {param: column[-max_candles:]
+                               for param, column in self._candle_params.items()}
+        self.__init_params_from_candles()
+        from_ts = int(self._timestamps[0])
+        self._trend_lines = {ts: trend_lines for ts, trend_lines in self._trend_lines.items()
+                             if ts >= from_ts}
+        self._curves = {name: curve.since(from_ts) for name, curve in self._curves.items()}
+        self._buy_events = self._buy_events.since(from_ts)
+        self._sell_events = self._sell_events.since(from_ts)
+
+    @staticmethod
+    def __get_curve(curve_events: tp.List[tp.Dict[str, tp.Any]],
+                    curve_name: str) -> _EventColumns:
+        """ Values with min and max value are kept normalized, they are scaled when a frame is built. """
         curve = []
-        timestamps = []
-        last_added = -1
         meta = []
+        normalized = []
         for event in curve_events:
             value = event['value']
             meta.append(f"{curve_name}<br>{event['value_fmt']}")
             min_val, max_val = event['min_value'], event['max_value']
             if min_val is not None:
-                value = self.__scale(value, min_val, max_val)
+                value = (value - min_val) / (max_val - min_val)
             curve.append(value)
-            ts = event['ts']
-            timestamps.append(to_time(ts))
-            ind = self.__get_ind_by_ts(ts)
-            if ind > last_added:
-                self._layers[ind].add_curve(curve, timestamps, curve_name,
-                                            meta)
-                last_added = ind
+            normalized.append(min_val is not None)
+        return _get_event_columns([event['ts'] for event in curve_events],
+                                  curve, [0] * len(curve), meta, normalized)
 
     def add_buy_events(self, timestamps: tp.List[int], prices: tp.List[float],
                        amount: tp.List[float], meta: tp.List[str]) -> None:
-        self.__add_buy_sell_events(timestamps, prices, amount, meta,
-                                   is_buy=True)
+        self._buy_events = self.__get_buy_sell_events(
+            timestamps, prices, amount, meta, is_buy=True)
 
     def add_sell_events(self, timestamps: tp.List[int], prices: tp.List[float],
                         amount: tp.List[float], meta: tp.List[str]) -> None:
-        self.__add_buy_sell_events(timestamps, prices, amount, meta,
-                                   is_buy=False)
-
-    def get_layers(self) -> tp.List[GraphicLayer]:
-        return self._layers
+        self._sell_events = self.__get_buy_sell_events(
+            timestamps, prices, amount, meta, is_buy=False)
+
+    def get_layers_count(self) -> int:
+        return len(self._timestamps)
+
+    def get_layer_index(self, ts: int) -> int:
+        """ Time slider position of the last candle not later than ts, the first one for earlier ts. """
+        return max(0, self.__get_ind_by_ts(ts))
+
+    def get_layer_ts(self, ind: int) -> int:
+        return int(self._timestamps[ind])
+
+    def get_layer(self, ind: int,
+                  time_range: tp.Optional[TimeRange] = None) -> GraphicLayer:
+        """
+        Builds traces of the time slider position ind.
+        Only points inside time_range are taken, the whole log by default.
+        """
+        frame_ts = int(self._timestamps[ind])
+        layer = GraphicLayer(self, frame_ts)
+        from_ind, to_ind = self.__get_range_slice(self._timestamps, time_range)
+        split_ind = min(max(ind, from_ind), to_ind)
+        bucket_size = get_bucket_size(to_ind - from_ind, self._max_points)
+        layer.add_candles(
+            aggregate_ohlc(self.__slice_candles(from_ind, split_ind), bucket_size),
+            aggregate_ohlc(self.__slice_candles(split_ind, to_ind), bucket_size))
+        if frame_ts in self._trend_lines:
+            lower_trend_line, upper_trend_line = self._trend_lines[frame_ts]
+            if upper_trend_line is not None:
+                layer.add_trend_line(upper_trend_line, self._trend_length,
+                                     name_suffix="upper line")
+            if lower_trend_line is not None:
+                layer.add_trend_line(lower_trend_line, self._trend_length,
+                                     name_suffix="lower line")
+        for curve_name, curve in self._curves.items():
+            from_ind, to_ind = self.__get_history_slice(curve, frame_ts, time_range)
+            indices = from_ind + lttb_indices(curve.timestamps[from_ind:to_ind],
+                                              curve.values[from_ind:to_ind],
+                                              self._max_points)
+            times, values, _, meta = curve.take(indices)
+            layer.add_curve(self.__scale(values, curve.normalized[indices]),
+                            times, curve_name, meta)
+        from_ind, to_ind = self.__get_history_slice(self._buy_events, frame_ts, time_range)
+        layer.add_buy_events(*self._buy_events.take(slice(from_ind, to_ind)))
+        from_ind, to_ind = self.__get_history_slice(self._sell_events, frame_ts, time_range)
+        layer.add_sell_events(*self._sell_events.take(slice(from_ind, to_ind)))
+        return layer
 
     def get_layout(self) -> go.Layout:
         return self._layout
 
-    def plot(self) -> go.Figure:
-        self.__add_ts_slider()
-        traces: tp.List[tp.Union[go.Scatter, go.Candlestick]] = []
-        for layer in self._layers:
+    def plot(self, max_frames: int = 100) -> go.Figure:
+        """
+        Figure with a time slider over at most max_frames positions spread evenly
+        over the candles, the last position is shown.
+        """
+        layout = go.Layout(self._layout)
+        count = self.get_layers_count()
+        if count == 0:
+            return go.Figure(layout=layout)
+        indices = np.unique(np.linspace(0, count - 1, min(count, max_frames)).astype(int))
+        layers = [self.get_layer(int(ind)) for ind in indices]
+        traces: tp.List[tp.Union[ScatterType, go.Candlestick]] = []
+        for layer in layers:
             traces.extend(layer.get_traces())
-        return go.Figure(data=traces, layout=self._layout)
 
-    def __scale(self, value: float, min_val: float, max_val: float) -> float:
-        value = (value - min_val) / (max_val - min_val)
+        steps = []
+        for i, layer in enumerate(layers):
+            visible: tp.List[bool] = []
+            for j, other in enumerate(layers):
+                visible.extend(other.get_visibility_params(default_visibility=(i == j)))
+            steps.append(dict(
+                method='update',
+                args=[{'visible': visible},
+                      {'title': 'Trends at moment ' + timestamp_to_full(layer.ts)}],
+                label=timestamp_to_hhmm(layer.ts)))
+        # The last position is shown
+        for trace, trace_visible in zip(traces, visible):
+            trace['visible'] = trace_visible
+        layout['sliders'] = [dict(
+            active=len(steps) - 1,
+            currentvalue={'prefix': 'Time: '},
+            pad={'t': 170},
+            steps=steps)]
+        return go.Figure(data=traces, layout=layout)
+
+    def get_y_range(self) -> tp.Tuple[float, float]:
+        """ Price range of the chart, normalized curves are scaled to it. """
+        return self._y_min, self._y_max
+
+    def __scale(self, values: np.ndarray, normalized: np.ndarray) -> np.ndarray:
         border = 0.05 * (self._y_max - self._y_min)
-        value = value * (self._y_max - self._y_min - 2 * border) + \
-                self._y_min + border
-        return value
-
-    def __adjust_timestamps_and_price(self, timestamps: tp.List[int],
-                                      prices: tp.List[float],
-                                      is_buy: bool = False) -> None:
-        for i, ts in enumerate(timestamps):
-            timestamps[i] = self._candles[self.__get_ind_by_ts(ts)].ts
-        amount: tp.Dict[int, int] = {}
-        shift = 0.05
-        for i, ts in enumerate(timestamps):
-            if ts not in amount:
-                amount[ts] = 0
-            else:
-                amount[ts] += 1
-            candle_id = self.__get_ind_by_ts(ts)
-            if is_buy:
-                prices[i] = self._candles[candle_id].get_lower_price() - \
-                            amount[ts] * shift
-            else:
-                prices[i] = self._candles[candle_id].get_upper_price() + \
-                            amount[ts] * shift
-
-    def __add_buy_sell_events(self, timestamps: tp.List[int],
+        scaled = values * (self._y_max - self._y_min - 2 * border) + self._y_min + border
+        return np.where(normalized, scaled, values)
+
+    @staticmethod
+    def __get_range_slice(timestamps: np.ndarray,
+                          time_range: tp.Optional[TimeRange]) -> tp.Tuple[int, int]:
+        if time_range is None:
+            return 0, len(timestamps)
+        return (int(np.searchsorted(timestamps, time_range.from_ts, side='left')),
+                int(np.searchsorted(timestamps, time_range.to_ts, side='right')))
+
+    def __get_history_slice(self, events: _EventColumns, ts: int,
+                            time_range: tp.Optional[TimeRange]) -> tp.Tuple[int, int]:
+        """ Events of time_range happened not later than ts. """
+        from_ind, to_ind = self.__get_range_slice(events.timestamps, time_range)
+        return from_ind, max(from_ind, min(
+            to_ind, int(np.searchsorted(events.timestamps, ts, side='right'))))
+
+    def __slice_candles(self, from_ind: int, to_ind: int) -> tp.Dict[str, np.ndarray]:
+        return {param: column[from_ind:to_ind]
+                for param, column in self._candle_params.items()}
+
+    def __get_buy_sell_events(self, timestamps: tp.List[int],
                               prices: tp.List[float], amount: tp.List[float],
                               meta: tp.List[str],
-                              is_buy: bool = False) -> None:
-        self.__adjust_timestamps_and_price(timestamps, prices, is_buy)
-        current_layer = 0
-        for i, ts in enumerate(timestamps):
-            while current_layer < len(self._layers) and \
-                    ts > self._layers[current_layer].ts:
-                if is_buy:
-                    self._layers[current_layer].add_buy_events(timestamps[:i],
-                                                               prices[:i],
-                                                               amount[:i],
-                                                               meta[:i])
-                else:
-                    self._layers[current_layer].add_sell_events(timestamps[:i],
-                                                                prices[:i],
-                                                                amount[:i],
-                                                                meta[:i])
-                current_layer += 1
-        for i in range(current_layer, len(self._layers)):
+                              is_buy: bool = False) -> _EventColumns:
+        """ Moves events to the candle they happened in, next to its body. """
+        shift = 0.05
+        inds = [self.__get_ind_by_ts(ts) for ts in timestamps]
+        candle_ts = [int(self._timestamps[ind]) for ind in inds]
+        counts: tp.Dict[int, int] = {}
+        adjusted_prices = []
+        for ind, ts in zip(inds, candle_ts):
+            counts[ts] = counts[ts] + 1 if ts in counts else 0
             if is_buy:
-                self._layers[i].add_buy_events(timestamps,
-                                               prices,
-                                               amount,
-                                               meta)
+                adjusted_prices.append(
+                    min(self._candle_params['open'][ind],
+                        self._candle_params['close'][ind]) - counts[ts] * shift)
             else:
-                self._layers[i].add_sell_events(timestamps,
-                                                prices,
-                                                amount,
-                                                meta)
-
-    def __add_layer(self, ts: int) -> None:
-        self._layers.append(GraphicLayer(self, ts))
-
-    def __add_ts_slider(self) -> None:
-        steps = []
-        for i, candle in enumerate(self._candles):
-            step = dict(
-                method="update",
-                args=[{"visible": []},
-                      {"title": "Trends at moment " + timestamp_to_full(
-                          candle.ts)}],
-                label=timestamp_to_hhmm(candle.ts)
-            )
-            for j, layer in enumerate(self._layers):
-                step["args"][0]["visible"].extend(  # type: ignore
-                    layer.get_visibility_params(default_visibility=(i == j)))
-            steps.append(step)
-
-        sliders = [dict(
-            active=0,
-            currentvalue={"prefix": "Time: "},
-            pad={"t": 170},
-            steps=steps
-        )]
-        self._layout['sliders'] = sliders
+                adjusted_prices.append(
+                    max(self._candle_params['open'][ind],
+                        self._candle_params['close'][ind]) + counts[ts] * shift)
+        return _get_event_columns(candle_ts, adjusted_prices, amount, meta)
 
     def __get_ind_by_ts(self, ts: int) -> int:
-        return bisect.bisect_right(self._timestamps, ts) - 1
+        return int(np.searchsorted(self._timestamps, ts, side='right')) - 1
 
     def __init_params_from_candles(self) -> None:
         self._timestamps = self._candle_params['ts']
-        self._y_min = min(self._candle_params['low'])
-        self._y_max = max(self._candle_params['high'])
+        if not len(self._timestamps):
+            # A running session has not logged candles yet
+            return
+        self._y_min = float(self._candle_params['low'].min())
+        self._y_max = float(self._candle_params['high'].max())
         height = self._y_max - self._y_min
         self._y_min -= min(0.5 * height, 0.3)
         self._y_max += min(0.5 * height, 0.3)
-        self._ts_min = to_time(self._candles[0].ts)
-        self._ts_max = to_time(self._candles[-1].ts)
+        self._ts_min = to_time(self._timestamps[0])
+        self._ts_max = to_time(self._timestamps[-1])
         self._layout.yaxis.range = (self._y_min, self._y_max)
         self._layout.xaxis.range = (self._ts_min, self._ts_max)